@@ -0,0 +1,224 @@
+"""
+Admission Control and Load Shedding
+Bounded in-flight slots with a priority wait queue, per-request deadlines and fast rejection with Retry-After
+"""
+
+import math
+import threading
+import time
+from collections import deque
+
+
+PRIORITIES = ('interactive', 'batch')
+
+
+class DeadlineExceeded(Exception):
+    """The request's deadline passed before the named stage started"""
+
+    def __init__(self, stage):
+        super().__init__(f"Deadline exceeded before {stage}")
+        self.stage = stage
+
+
+class Overloaded(Exception):
+    """The request was not admitted; status is 429 or 503 and retry_after is in whole seconds"""
+
+    def __init__(self, status, reason, retry_after):
+        super().__init__(f"Server overloaded ({reason})")
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Deadline:
+    """Absolute time.perf_counter() expiry for one request"""
+
+    def __init__(self, seconds, start=None):
+        self.seconds = seconds
+        self.expires_at = (time.perf_counter() if start is None else start) + seconds
+
+    def remaining(self):
+        return self.expires_at - time.perf_counter()
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def check(self, stage):
+        """Raise DeadlineExceeded instead of starting a stage whose answer would arrive too late"""
+        if self.expired():
+            raise DeadlineExceeded(stage)
+
+
+def parse_deadline_ms(value, default_ms, max_ms):
+    """Deadline budget in seconds from a header value in milliseconds (server default when missing or invalid)"""
+    try:
+        budget_ms = float(value) if value not in (None, '') else default_ms
+    except ValueError:
+        budget_ms = default_ms
+    if not budget_ms > 0:
+        budget_ms = default_ms
+    return min(budget_ms, max_ms) / 1000.0
+
+
+class _Waiter:
+    __slots__ = ('event', 'granted')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.granted = False
+
+
+class AdmissionController:
+    """
+    Per-process gate in front of the expensive pipeline stages
+
+    At most max_in_flight requests hold a slot; batch requests may use at most
+    batch_max_in_flight of them, so single predictions always find capacity.
+    Requests that cannot start wait in FIFO queues, interactive before batch,
+    bounded by max_queue and batch_max_queue. A request is rejected at once
+    (never queued) when its queue is full or when the estimated wait, from
+    an EWMA of slot hold times, already exceeds its deadline. Waiters whose
+    deadline passes leave the queue without ever running.
+    """
+
+    def __init__(self, max_in_flight=4, max_queue=32, batch_max_in_flight=1, batch_max_queue=4,
+                 max_retry_after=30, smoothing=0.2):
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.max_queue = max(0, int(max_queue))
+        self.batch_max_in_flight = min(self.max_in_flight, max(1, int(batch_max_in_flight)))
+        self.batch_max_queue = max(0, int(batch_max_queue))
+        self.max_retry_after = max_retry_after
+        self.smoothing = smoothing
+
+        self._lock = threading.Lock()
+        self._running = {priority: 0 for priority in PRIORITIES}
+        self._waiting = {priority: deque() for priority in PRIORITIES}
+        # No estimate (and no deadline-based rejection) until a request of that priority has completed
+        self._service_seconds = {priority: None for priority in PRIORITIES}
+        self._counts = {(priority, outcome): 0
+                        for priority in PRIORITIES
+                        for outcome in ('admitted', 'queued', 'rejected_queue_full', 'rejected_deadline',
+                                        'expired_in_queue', 'completed')}
+
+    # --- Internal state (called with the lock held) --------------------------------
+
+    def _has_capacity(self, priority):
+        if sum(self._running.values()) >= self.max_in_flight:
+            return False
+        return priority != 'batch' or self._running['batch'] < self.batch_max_in_flight
+
+    def _estimated_wait(self, priority):
+        """Seconds until a request joining the back of this priority's queue would start (0 if unknown)"""
+        if self._service_seconds[priority] is None:
+            return 0.0
+        ahead = len(self._waiting['interactive']) + 1
+        if priority == 'batch':
+            ahead += len(self._waiting['batch'])
+            return ahead * self._service_seconds['batch'] / self.batch_max_in_flight
+        # Slots free up at roughly max_in_flight per service time
+        return ahead * self._service_seconds['interactive'] / self.max_in_flight
+
+    def _retry_after(self, priority):
+        backlog = len(self._waiting['interactive']) + len(self._waiting['batch']) + sum(self._running.values())
+        drain = backlog * (self._service_seconds[priority] or 1.0) / self.max_in_flight
+        return int(min(self.max_retry_after, max(1, math.ceil(drain))))
+
+    def _dispatch(self):
+        """Hand free slots to queued waiters: interactive first, then batch within its share"""
+        for priority in PRIORITIES:
+            queue = self._waiting[priority]
+            while queue and self._has_capacity(priority):
+                waiter = queue.popleft()
+                waiter.granted = True
+                self._running[priority] += 1
+                waiter.event.set()
+            if queue and priority == 'interactive':
+                # Batch work never overtakes waiting single predictions
+                return
+
+    # --- Public API --------------------------------------------------------------------
+
+    def admit(self, priority='interactive', deadline=None):
+        """
+        Wait for a slot and return a ticket to release() when the request finishes
+        Raises Overloaded when rejected outright, DeadlineExceeded when the deadline passes in the queue
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"priority must be one of: {', '.join(PRIORITIES)}")
+        with self._lock:
+            if deadline is not None and deadline.expired():
+                self._counts[(priority, 'rejected_deadline')] += 1
+                raise DeadlineExceeded('admission')
+            queued_ahead = self._waiting['interactive'] or (priority == 'batch' and self._waiting['batch'])
+            if not queued_ahead and self._has_capacity(priority):
+                self._running[priority] += 1
+                self._counts[(priority, 'admitted')] += 1
+                return priority, time.perf_counter()
+
+            limit = self.batch_max_queue if priority == 'batch' else self.max_queue
+            if len(self._waiting[priority]) >= limit:
+                self._counts[(priority, 'rejected_queue_full')] += 1
+                # Batch clients are asked to slow down; a full interactive queue means the server is saturated
+                raise Overloaded(429 if priority == 'batch' else 503, 'queue_full', self._retry_after(priority))
+            if deadline is not None and self._estimated_wait(priority) > deadline.remaining():
+                self._counts[(priority, 'rejected_deadline')] += 1
+                raise Overloaded(503, 'deadline_unreachable', self._retry_after(priority))
+
+            waiter = _Waiter()
+            self._waiting[priority].append(waiter)
+            self._counts[(priority, 'queued')] += 1
+
+        waiter.event.wait(deadline.remaining() if deadline is not None else None)
+        with self._lock:
+            if not waiter.granted:
+                self._waiting[priority].remove(waiter)
+                self._counts[(priority, 'expired_in_queue')] += 1
+                raise DeadlineExceeded('admission')
+            self._counts[(priority, 'admitted')] += 1
+        return priority, time.perf_counter()
+
+    def release(self, ticket):
+        """Free the ticket's slot, update the service time estimate and start the next waiter"""
+        priority, started = ticket
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._running[priority] -= 1
+            self._counts[(priority, 'completed')] += 1
+            estimate = self._service_seconds[priority]
+            if estimate is None:
+                self._service_seconds[priority] = elapsed
+            else:
+                self._service_seconds[priority] = estimate + self.smoothing * (elapsed - estimate)
+            self._dispatch()
+
+    def queue_depth(self):
+        """{priority: waiting requests}"""
+        with self._lock:
+            return {priority: len(queue) for priority, queue in self._waiting.items()}
+
+    def in_flight(self):
+        """{priority: requests holding a slot}"""
+        with self._lock:
+            return dict(self._running)
+
+    def counts(self):
+        """{(priority, outcome): total}"""
+        with self._lock:
+            return dict(self._counts)
+
+    def stats(self):
+        """Limits, current occupancy, service time estimates and outcome counts"""
+        with self._lock:
+            return {
+                'max_in_flight': self.max_in_flight,
+                'max_queue': self.max_queue,
+                'batch_max_in_flight': self.batch_max_in_flight,
+                'batch_max_queue': self.batch_max_queue,
+                'in_flight': dict(self._running),
+                'queue_depth': {priority: len(queue) for priority, queue in self._waiting.items()},
+                'service_seconds': dict(self._service_seconds),
+                'outcomes': {
+                    priority: {outcome: count for (p, outcome), count in self._counts.items() if p == priority}
+                    for priority in PRIORITIES
+                }
+            }
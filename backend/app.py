@@ -3,23 +3,66 @@ Deepfake Detection Backend API
 Flask-based REST API for image upload, face detection, and deepfake classification
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Request, Response, current_app, g, request, jsonify, send_file, stream_with_context
 from flask_cors import CORS
+from functools import wraps
 import os
+import sys
 import numpy as np
 import cv2
 from PIL import Image
-import io
+import json
 import base64
+import tempfile
+from werkzeug.datastructures import CombinedMultiDict, MultiDict
 from werkzeug.utils import secure_filename
-import tensorflow as tf
-from tensorflow import keras
-from mtcnn import MTCNN
 import logging
+import threading
+import time
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from admission import AdmissionController, Deadline, DeadlineExceeded, Overloaded, parse_deadline_ms
+from batching import MicroBatcher
+from cache import PredictionCache, content_key
+from multipart_stream import UploadPart, iter_multipart
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, SIZE_BUCKETS, Registry
+from responses import (CROP_MODES, CropStore, ResponseStats, encode_crop_jpeg, negotiate_format,
+                       serialize)
+from phash_index import PerceptualHashIndex, perceptual_hash
+
+# Shared inference code lives next to the model
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'model'))
+from backends import default_model_path, load_backend
+from cascade import CascadeSession
+from preprocessing import BufferPool, as_float_input, resize_into
+from image_decode import decode_image
+from archive_input import ArchiveReader
+from video_analysis import VIDEO_EXTENSIONS, analyze_video, video_info
+from worker_pool import InferenceWorkerPool, parse_core_list
+from jobs import JobRunner, JobStore
+
+def max_content_length_for(path, config):
+    """Upload size limit for a request path: larger bodies are allowed on the video and job endpoints"""
+    if path == '/api/predict-video':
+        return config['VIDEO_MAX_CONTENT_LENGTH']
+    if path == '/api/jobs':
+        return config['JOBS_MAX_CONTENT_LENGTH']
+    if path == '/api/archive-predict':
+        return config['ARCHIVE_MAX_CONTENT_LENGTH']
+    return config['MAX_CONTENT_LENGTH']
+
+
+class UploadRequest(Request):
+    """Request class that applies the per-endpoint upload limit"""
+    
+    @property
+    def max_content_length(self):
+        return max_content_length_for(self.path, current_app.config)
+
 
 # Initialize Flask app
 app = Flask(__name__)
+app.request_class = UploadRequest
 CORS(app)  # Enable CORS for React frontend
 
 # Configuration
@@ -27,6 +70,130 @@ app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['ALLOWED_EXTENSIONS'] = {'png', 'jpg', 'jpeg'}
 
+# Video analysis configuration (/api/predict-video)
+app.config['VIDEO_MAX_CONTENT_LENGTH'] = int(os.environ.get('VIDEO_MAX_CONTENT_LENGTH', 256 * 1024 * 1024))
+app.config['VIDEO_ALLOWED_EXTENSIONS'] = VIDEO_EXTENSIONS
+app.config['VIDEO_SAMPLE_FPS'] = float(os.environ.get('VIDEO_SAMPLE_FPS', 2))
+app.config['VIDEO_MAX_SAMPLE_FPS'] = float(os.environ.get('VIDEO_MAX_SAMPLE_FPS', 10))
+app.config['VIDEO_KEYFRAME_INTERVAL'] = int(os.environ.get('VIDEO_KEYFRAME_INTERVAL', 5))
+app.config['VIDEO_BATCH_SIZE'] = int(os.environ.get('VIDEO_BATCH_SIZE', 16))
+app.config['VIDEO_SEGMENT_SECONDS'] = float(os.environ.get('VIDEO_SEGMENT_SECONDS', 2))
+app.config['VIDEO_MAX_FRAMES'] = int(os.environ.get('VIDEO_MAX_FRAMES', 1800))
+
+# Inference backend: keras (compiled session), tflite or onnx (artifacts from model/export_model.py)
+app.config['INFERENCE_BACKEND'] = os.environ.get('INFERENCE_BACKEND', 'keras').lower()
+app.config['INFERENCE_MODEL_PATH'] = os.environ.get('INFERENCE_MODEL_PATH', '')
+
+# Compiled inference session (padded batch-size buckets traced and warmed up at startup)
+app.config['INFERENCE_BUCKETS'] = [int(b) for b in os.environ.get('INFERENCE_BUCKETS', '1,4,8,16,32').split(',')]
+
+# Multi-process inference: INFERENCE_WORKERS model-holding processes (0 = run the model in this process), each pinned
+# to an equal share of INFERENCE_WORKER_CORES (e.g. "0-15"; empty = every core this process may use) and fed face
+# tensors through INFERENCE_WORKER_SLOTS shared-memory slots of BATCH_MAX_SIZE faces
+app.config['INFERENCE_WORKERS'] = int(os.environ.get('INFERENCE_WORKERS', 0))
+app.config['INFERENCE_WORKER_CORES'] = os.environ.get('INFERENCE_WORKER_CORES', '')
+app.config['INFERENCE_WORKER_SLOTS'] = int(os.environ.get('INFERENCE_WORKER_SLOTS', 4))
+
+# Feed uint8 crops to the Keras graph and apply /255 inside it (no float32 copy on the host)
+app.config['FOLD_NORMALIZATION'] = os.environ.get('FOLD_NORMALIZATION', 'true').lower() == 'true'
+
+# Early-exit cascade: a cheap model scores every face and only scores inside [CASCADE_BAND_LOW, CASCADE_BAND_HIGH]
+# are re-scored by the main model in one batch (pick the band with model/calibrate_cascade.py)
+app.config['CASCADE'] = os.environ.get('CASCADE', 'false').lower() == 'true'
+app.config['CASCADE_CHEAP_BACKEND'] = os.environ.get('CASCADE_CHEAP_BACKEND', 'keras').lower()
+app.config['CASCADE_CHEAP_MODEL_PATH'] = os.environ.get('CASCADE_CHEAP_MODEL_PATH', '')
+app.config['CASCADE_BAND_LOW'] = float(os.environ.get('CASCADE_BAND_LOW', 0.3))
+app.config['CASCADE_BAND_HIGH'] = float(os.environ.get('CASCADE_BAND_HIGH', 0.7))
+
+# Face detection runs on a copy whose long edge is capped at this size (0 = full resolution)
+app.config['DETECTION_MAX_SIDE'] = int(os.environ.get('DETECTION_MAX_SIDE', 1024))
+
+# JPEGs are decoded at 1/2, 1/4 or 1/8 scale while the long edge stays >= this (0 = full resolution)
+# 768 keeps a 224px crop for any face covering 30% of the frame
+app.config['DECODE_MIN_SIDE'] = int(os.environ.get('DECODE_MIN_SIDE', 768))
+
+# Multi-face mode (opt-in per request with multi_face=true)
+app.config['MULTI_FACE_MIN_CONFIDENCE'] = float(os.environ.get('MULTI_FACE_MIN_CONFIDENCE', 0.9))
+app.config['MULTI_FACE_MAX_FACES'] = int(os.environ.get('MULTI_FACE_MAX_FACES', 16))
+
+# Asynchronous job API (/api/jobs): durable SQLite queue + background process pool
+app.config['JOBS_DB_PATH'] = os.environ.get('JOBS_DB_PATH', 'jobs/jobs.db')
+app.config['JOBS_FILES_DIR'] = os.environ.get('JOBS_FILES_DIR', 'jobs/files')
+app.config['JOBS_WORKERS'] = int(os.environ.get('JOBS_WORKERS', 1))
+app.config['JOBS_CHUNK_SIZE'] = int(os.environ.get('JOBS_CHUNK_SIZE', 16))
+app.config['JOBS_LEASE_SECONDS'] = float(os.environ.get('JOBS_LEASE_SECONDS', 300))
+app.config['JOBS_MAX_FILES'] = int(os.environ.get('JOBS_MAX_FILES', 10000))
+app.config['JOBS_MAX_CONTENT_LENGTH'] = int(os.environ.get('JOBS_MAX_CONTENT_LENGTH', 1024 * 1024 * 1024))
+app.config['JOBS_RESULTS_PAGE_SIZE'] = int(os.environ.get('JOBS_RESULTS_PAGE_SIZE', 100))
+# 'inline' starts the dispatcher in the serving process on first use (single-process servers);
+# gunicorn.conf.py sets 'external' and runs one dispatcher process shared by all workers
+app.config['JOBS_DISPATCHER'] = os.environ.get('JOBS_DISPATCHER', 'inline').lower()
+
+# Archive ingestion (/api/archive-predict): ZIP or TAR members are read one by one without extracting, cropped and
+# classified ARCHIVE_CHUNK_SIZE at a time and streamed back as NDJSON; a TAR request body is processed while it uploads
+app.config['ARCHIVE_MAX_CONTENT_LENGTH'] = int(os.environ.get('ARCHIVE_MAX_CONTENT_LENGTH', 1024 * 1024 * 1024))
+app.config['ARCHIVE_MAX_MEMBERS'] = int(os.environ.get('ARCHIVE_MAX_MEMBERS', 10000))
+app.config['ARCHIVE_MAX_MEMBER_SIZE'] = int(os.environ.get('ARCHIVE_MAX_MEMBER_SIZE', 16 * 1024 * 1024))
+app.config['ARCHIVE_CHUNK_SIZE'] = int(os.environ.get('ARCHIVE_CHUNK_SIZE', 16))
+
+# Micro-batching configuration (concurrent /api/predict calls share one forward pass)
+app.config['MICRO_BATCHING'] = os.environ.get('MICRO_BATCHING', 'true').lower() == 'true'
+app.config['BATCH_MAX_SIZE'] = int(os.environ.get('BATCH_MAX_SIZE', 16))
+app.config['BATCH_MAX_WAIT_MS'] = float(os.environ.get('BATCH_MAX_WAIT_MS', 5))
+
+# Admission control: bounded pipeline slots and wait queues per process, single predictions before batch work,
+# and per-request deadlines (X-Request-Timeout-Ms, clamped to MAX_DEADLINE_MS) checked before every expensive stage
+app.config['ADMISSION_CONTROL'] = os.environ.get('ADMISSION_CONTROL', 'true').lower() == 'true'
+app.config['ADMISSION_MAX_IN_FLIGHT'] = int(os.environ.get('ADMISSION_MAX_IN_FLIGHT', 8))
+app.config['ADMISSION_MAX_QUEUE'] = int(os.environ.get('ADMISSION_MAX_QUEUE', 32))
+app.config['ADMISSION_BATCH_MAX_IN_FLIGHT'] = int(os.environ.get('ADMISSION_BATCH_MAX_IN_FLIGHT', 1))
+app.config['ADMISSION_BATCH_MAX_QUEUE'] = int(os.environ.get('ADMISSION_BATCH_MAX_QUEUE', 4))
+app.config['DEFAULT_DEADLINE_MS'] = float(os.environ.get('DEFAULT_DEADLINE_MS', 30000))
+app.config['MAX_DEADLINE_MS'] = float(os.environ.get('MAX_DEADLINE_MS', 120000))
+
+# /api/batch-predict configuration (decode + detection run in a worker pool, one forward pass)
+app.config['BATCH_PREDICT_MAX_FILES'] = int(os.environ.get('BATCH_PREDICT_MAX_FILES', 32))
+app.config['BATCH_PREDICT_WORKERS'] = int(os.environ.get('BATCH_PREDICT_WORKERS', min(8, os.cpu_count() or 1)))
+
+# Streamed /api/batch-predict uploads: parts are parsed while the body arrives (UPLOAD_CHUNK_SIZE bytes per read),
+# spooled to disk past UPLOAD_SPOOL_MAX_MEMORY bytes, cropped as soon as complete and freed right after; reading
+# pauses while BATCH_PREDICT_WORKERS parts are waiting, so peak memory does not grow with the number of files
+app.config['BATCH_STREAMING'] = os.environ.get('BATCH_STREAMING', 'true').lower() == 'true'
+app.config['UPLOAD_SPOOL_MAX_MEMORY'] = int(os.environ.get('UPLOAD_SPOOL_MAX_MEMORY', 1024 * 1024))
+app.config['UPLOAD_CHUNK_SIZE'] = int(os.environ.get('UPLOAD_CHUNK_SIZE', 64 * 1024))
+
+# Prediction cache configuration (keyed by upload hash + model version)
+app.config['PREDICTION_CACHE'] = os.environ.get('PREDICTION_CACHE', 'true').lower() == 'true'
+app.config['CACHE_MAX_ENTRIES'] = int(os.environ.get('CACHE_MAX_ENTRIES', 2048))
+app.config['CACHE_TTL_SECONDS'] = float(os.environ.get('CACHE_TTL_SECONDS', 24 * 3600))
+app.config['CACHE_DB_PATH'] = os.environ.get('CACHE_DB_PATH', '')
+
+# Prometheus scrape endpoint (/api/metrics)
+app.config['METRICS'] = os.environ.get('METRICS', 'true').lower() == 'true'
+
+# Face-crop response modes (override per request with crop=inline|url|none, crop_size, crop_quality)
+app.config['RESPONSE_CROP_MODE'] = os.environ.get('RESPONSE_CROP_MODE', 'inline').lower()
+app.config['BATCH_CROP_MODE'] = os.environ.get('BATCH_CROP_MODE', 'none').lower()
+app.config['CROP_MAX_SIZE'] = int(os.environ.get('CROP_MAX_SIZE', 0))  # long edge in px, 0 = native
+app.config['CROP_JPEG_QUALITY'] = int(os.environ.get('CROP_JPEG_QUALITY', 75))
+app.config['CROP_STORE_DIR'] = os.environ.get('CROP_STORE_DIR', 'crops')
+app.config['CROP_STORE_MAX_FILES'] = int(os.environ.get('CROP_STORE_MAX_FILES', 10000))
+
+# Near-duplicate lookup on face crops (perceptual hash, Hamming distance in bits)
+# Off by default: a deepfake made from an already classified face hashes close to the original.
+# Only Fake verdicts are stored, so a near-duplicate can never skip inference into a Real verdict
+app.config['PHASH_INDEX'] = os.environ.get('PHASH_INDEX', 'false').lower() == 'true'
+app.config['PHASH_MAX_DISTANCE'] = int(os.environ.get('PHASH_MAX_DISTANCE', 6))
+app.config['PHASH_MAX_ENTRIES'] = int(os.environ.get('PHASH_MAX_ENTRIES', 100000))
+
+# Multi-worker serving (wsgi.py + gunicorn.conf.py): worker count and per-worker inference threads
+app.config['WEB_CONCURRENCY'] = int(os.environ.get('WEB_CONCURRENCY', 1))
+app.config['INFERENCE_THREADS'] = int(os.environ.get('INFERENCE_THREADS', 0))  # 0 = CPU cores / workers
+
+# Async serving (asgi.py): threads running the blocking pipeline, and upload bytes kept in memory before spooling to disk
+app.config['ASGI_THREADS'] = int(os.environ.get('ASGI_THREADS', 0))  # 0 = max(4, CPU cores)
+app.config['ASGI_SPOOL_MAX_MEMORY'] = int(os.environ.get('ASGI_SPOOL_MAX_MEMORY', 1024 * 1024))
+
 # Create upload directory
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
@@ -36,102 +203,463 @@ logger = logging.getLogger(__name__)
 
 # Global variables for model and face detector
 model = None
+inference_session = None
 face_detector = None
+face_cascade = None
+batcher = None
+_batcher_lock = threading.Lock()
+admission = None
+batch_pool = None
+prediction_cache = None
+phash_index = None
+crop_store = None
+response_stats = ResponseStats()
+job_store = None
+job_runner = None
+model_version = 'dummy'
+model_initialized = False
+detector_initialized = False
+_init_lock = threading.Lock()
+startup_timings = {}
+
+# Prometheus metrics (/api/metrics); values are per process, so scrape every gunicorn worker
+metrics_registry = Registry()
+stage_seconds = metrics_registry.histogram(
+    'deepfake_stage_seconds', 'Time spent in each pipeline stage', ('stage',))
+request_seconds = metrics_registry.histogram(
+    'deepfake_request_seconds', 'End-to-end request latency', ('endpoint',))
+requests_total = metrics_registry.counter(
+    'deepfake_requests_total', 'HTTP requests by endpoint and status code', ('endpoint', 'status'))
+errors_total = metrics_registry.counter(
+    'deepfake_errors_total', 'Requests answered with a 5xx status', ('endpoint',))
+no_face_total = metrics_registry.counter(
+    'deepfake_no_face_total', 'Images rejected because no face was detected')
+dummy_predictions_total = metrics_registry.counter(
+    'deepfake_dummy_predictions_total', 'Random scores served because no model is loaded')
+cache_results_total = metrics_registry.counter(
+    'deepfake_cache_results_total', 'Prediction cache outcomes on /api/predict', ('result',))
+in_flight_requests = metrics_registry.gauge(
+    'deepfake_in_flight_requests', 'Requests currently being processed', ('endpoint',))
+inference_batch_size = metrics_registry.histogram(
+    'deepfake_inference_batch_size', 'Samples per model forward pass', buckets=SIZE_BUCKETS)
+metrics_registry.gauge(
+    'deepfake_startup_seconds', 'Duration of each startup step (imports, model load, warmup, detector)', ('step',),
+    callback=lambda: {(step,): seconds for step, seconds in startup_timings.items()})
+metrics_registry.gauge(
+    'deepfake_model_loaded', '1 if a model is loaded, 0 if predictions are dummies',
+    callback=lambda: int(model is not None))
+metrics_registry.gauge(
+    'deepfake_face_detector_loaded', '1 if MTCNN is loaded, 0 if the Haar fallback is used',
+    callback=lambda: int(face_detector is not None))
+shed_total = metrics_registry.counter(
+    'deepfake_shed_total', 'Requests shed by admission control or an expired deadline', ('priority', 'reason'))
+metrics_registry.gauge(
+    'deepfake_admission_queue_depth', 'Requests waiting for a pipeline slot', ('priority',),
+    callback=lambda: {(p,): depth for p, depth in admission.queue_depth().items()} if admission is not None else None)
+metrics_registry.gauge(
+    'deepfake_admission_in_flight', 'Requests holding a pipeline slot', ('priority',),
+    callback=lambda: {(p,): count for p, count in admission.in_flight().items()} if admission is not None else None)
+metrics_registry.gauge(
+    'deepfake_cascade_faces', 'Faces scored by each cascade stage (expensive = escalated)', ('stage',),
+    callback=lambda: {('cheap',): (cascade_stats() or {}).get('faces'),
+                      ('expensive',): (cascade_stats() or {}).get('escalated')})
+metrics_registry.gauge(
+    'deepfake_cascade_escalation_rate', 'Share of faces the cheap model passed on to the expensive one',
+    callback=lambda: (cascade_stats() or {}).get('escalation_rate'))
+metrics_registry.gauge(
+    'deepfake_cascade_ms_per_face', 'Average model milliseconds per face across both cascade stages',
+    callback=lambda: (cascade_stats() or {}).get('avg_ms_per_face'))
+metrics_registry.gauge(
+    'deepfake_worker_faces', 'Faces scored by each inference worker process', ('worker',),
+    callback=lambda: {(str(w['index']),): w['faces'] for w in worker_pool_stats()['per_worker']}
+    if worker_pool_stats() is not None else None)
+metrics_registry.gauge(
+    'deepfake_worker_busy_seconds', 'Model seconds spent by each inference worker process', ('worker',),
+    callback=lambda: {(str(w['index']),): w['busy_seconds'] for w in worker_pool_stats()['per_worker']}
+    if worker_pool_stats() is not None else None)
+upload_parts_total = metrics_registry.counter(
+    'deepfake_upload_parts_total', 'Streamed batch upload files by where they were held until cropped', ('storage',))
+metrics_registry.gauge(
+    'deepfake_process_memory_bytes', 'Resident memory of this process: current and peak (high-water mark)', ('kind',),
+    callback=lambda: {(kind.replace('_mb', ''),): mb * 1024 * 1024 for kind, mb in process_memory().items()})
+metrics_registry.gauge(
+    'deepfake_batcher_queue_depth', 'Samples waiting for the micro-batcher',
+    callback=lambda: batcher.stats()['queue_depth'] if batcher is not None else None)
 
 # Model configuration
 IMG_SIZE = 224
 MODEL_PATH = '../model/saved_models/deepfake_detector_efficientnet.h5'
+CHEAP_MODEL_PATH = '../model/saved_models/deepfake_detector_cheap.h5'
+
+# Per-thread uint8 batch buffers reused across requests (and float32 ones for un-folded models)
+tensor_buffers = BufferPool((IMG_SIZE, IMG_SIZE, 3), np.uint8)
+float_buffers = BufferPool((IMG_SIZE, IMG_SIZE, 3), np.float32)
 
 
-def allowed_file(filename):
+def allowed_file(filename, extensions=None):
     """Check if file extension is allowed"""
+    extensions = app.config['ALLOWED_EXTENSIONS'] if extensions is None else extensions
     return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
+           filename.rsplit('.', 1)[1].lower() in extensions
+
+
+def process_memory():
+    """{'rss_mb', 'peak_rss_mb'} of this process (Linux /proc; empty elsewhere)"""
+    usage = {}
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    usage['rss_mb'] = int(line.split()[1]) / 1024.0
+                elif line.startswith('VmHWM:'):
+                    usage['peak_rss_mb'] = int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return usage
+
+
+def inference_threads():
+    """Intra-op threads per worker so that WEB_CONCURRENCY workers don't oversubscribe the cores"""
+    if app.config['INFERENCE_THREADS'] > 0:
+        return app.config['INFERENCE_THREADS']
+    return max(1, (os.cpu_count() or 1) // max(1, app.config['WEB_CONCURRENCY']))
+
+
+def import_tensorflow():
+    """Import TensorFlow and cap its thread pools (only effective before the TF runtime starts)"""
+    start = time.perf_counter()
+    import tensorflow as tf
+    startup_timings.setdefault('import_tensorflow', round(time.perf_counter() - start, 3))
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(inference_threads())
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+    except RuntimeError:
+        # The runtime is already initialized in this process; keep its settings
+        pass
+    return tf
 
 
 def load_model():
-    """Load the trained deepfake detection model"""
-    global model
+    """Load the trained deepfake detection model with the configured inference backend"""
+    global model, model_version, inference_session
+    backend_name = app.config['INFERENCE_BACKEND']
+    model_path = app.config['INFERENCE_MODEL_PATH'] or (
+        MODEL_PATH if backend_name == 'keras' else default_model_path(backend_name)
+    )
     try:
-        if os.path.exists(MODEL_PATH):
-            model = keras.models.load_model(MODEL_PATH)
-            logger.info(f"✅ Model loaded successfully from {MODEL_PATH}")
+        if os.path.exists(model_path):
+            start = time.perf_counter()
+            if app.config['INFERENCE_WORKERS'] > 0:
+                # The model lives only in the worker processes; this process keeps the pool handle
+                inference_session = load_worker_pool(backend_name, model_path)
+                model = inference_session
+            elif backend_name == 'keras':
+                keras = import_tensorflow().keras
+                from inference_session import InferenceSession
+
+                model = keras.models.load_model(model_path)
+                inference_session = InferenceSession(
+                    model,
+                    img_size=IMG_SIZE,
+                    buckets=app.config['INFERENCE_BUCKETS'],
+                    fold_normalization=app.config['FOLD_NORMALIZATION']
+                )
+                startup_timings['model_warmup'] = round(inference_session.warmup_seconds, 3)
+                logger.info(f"✅ Inference session warmed up in {inference_session.warmup_seconds:.2f}s "
+                            f"(buckets {list(inference_session.buckets)})")
+            else:
+                # TFLite / ONNX predictors expose the same predict() and stand in for the Keras model
+                inference_session = load_backend(backend_name, model_path, num_threads=inference_threads())
+                model = inference_session
+            startup_timings['model_load'] = round(time.perf_counter() - start, 3)
+            stat = os.stat(model_path)
+            model_version = os.environ.get(
+                'MODEL_VERSION',
+                f"{os.path.basename(model_path)}-{stat.st_size}-{int(stat.st_mtime)}"
+            )
+            logger.info(f"✅ Model loaded successfully from {model_path} ({backend_name} backend)")
+            if app.config['CASCADE']:
+                # Cascade scores differ from the main model's, so cached predictions must not be shared
+                model_version += load_cascade()
         else:
-            logger.warning(f"⚠️ Model not found at {MODEL_PATH}. Using dummy predictions.")
+            logger.warning(f"⚠️ Model not found at {model_path}. Using dummy predictions.")
             model = None
+            inference_session = None
     except Exception as e:
         logger.error(f"❌ Error loading model: {str(e)}")
         model = None
+        inference_session = None
+
+
+def load_worker_pool(backend_name, model_path):
+    """Start INFERENCE_WORKERS pinned model processes and wait until every one has loaded the model"""
+    pool = InferenceWorkerPool(
+        backend_name,
+        model_path,
+        workers=app.config['INFERENCE_WORKERS'],
+        cores=parse_core_list(app.config['INFERENCE_WORKER_CORES']),
+        slots=app.config['INFERENCE_WORKER_SLOTS'],
+        max_batch=max([app.config['BATCH_MAX_SIZE'], app.config['BATCH_PREDICT_MAX_FILES'],
+                       app.config['VIDEO_BATCH_SIZE']] + app.config['INFERENCE_BUCKETS']),
+        img_size=IMG_SIZE,
+        buckets=app.config['INFERENCE_BUCKETS'],
+        fold_normalization=app.config['FOLD_NORMALIZATION']
+    ).start()
+    startup_timings['worker_pool_start'] = round(pool.warmup_seconds, 3)
+    logger.info(f"✅ {pool.workers} inference workers ready in {pool.warmup_seconds:.2f}s "
+                f"(cores {pool.core_sets})")
+    return pool
+
+
+def worker_pool_stats():
+    """Per-worker statistics of the inference worker pool, or None when inference runs in this process"""
+    session = inference_session.expensive if isinstance(inference_session, CascadeSession) else inference_session
+    if isinstance(session, InferenceWorkerPool):
+        return session.stats()
+    return None
+
+
+def load_cascade():
+    """
+    Put the cheap first-stage model in front of the loaded one (CASCADE=true)
+    Returns a model_version suffix; on failure the main model keeps serving alone and the suffix is empty
+    """
+    global inference_session
+    backend_name = app.config['CASCADE_CHEAP_BACKEND']
+    cheap_path = app.config['CASCADE_CHEAP_MODEL_PATH'] or CHEAP_MODEL_PATH
+    band = (app.config['CASCADE_BAND_LOW'], app.config['CASCADE_BAND_HIGH'])
+    try:
+        start = time.perf_counter()
+        if backend_name == 'keras':
+            import_tensorflow()
+        cheap = load_backend(backend_name, cheap_path, img_size=IMG_SIZE, buckets=app.config['INFERENCE_BUCKETS'],
+                             num_threads=inference_threads(), fold_normalization=app.config['FOLD_NORMALIZATION'])
+        inference_session = CascadeSession(cheap, inference_session, band=band)
+        startup_timings['cascade_load'] = round(time.perf_counter() - start, 3)
+    except Exception as e:
+        logger.error(f"❌ Error loading cascade model from {cheap_path}: {str(e)}. Serving without the cascade.")
+        return ''
+    
+    stat = os.stat(cheap_path)
+    logger.info(f"✅ Cascade enabled: {cheap_path} ({backend_name}) escalates scores in {band[0]:.2f}-{band[1]:.2f}")
+    return f"+cascade-{os.path.basename(cheap_path)}-{stat.st_size}-{int(stat.st_mtime)}-{band[0]:.2f}-{band[1]:.2f}"
+
+
+def cascade_stats():
+    """Escalation statistics of the serving cascade, or None when it is off"""
+    if isinstance(inference_session, CascadeSession):
+        return inference_session.stats()
+    return None
 
 
 def load_face_detector():
     """Initialize MTCNN face detector"""
     global face_detector
     try:
+        import_tensorflow()
+        from mtcnn import MTCNN
+
+        start = time.perf_counter()
         face_detector = MTCNN()
+        startup_timings['face_detector_load'] = round(time.perf_counter() - start, 3)
         logger.info("✅ MTCNN face detector initialized")
     except Exception as e:
         logger.error(f"❌ Error initializing face detector: {str(e)}")
         face_detector = None
 
 
+def model_is_fork_safe():
+    """TFLite / ONNX sessions survive fork(); a TensorFlow runtime started in the parent deadlocks the children"""
+    if app.config['INFERENCE_WORKERS'] > 0:
+        # Worker processes, pipes and reply threads belong to the process that started them
+        return False
+    if app.config['CASCADE'] and app.config['CASCADE_CHEAP_BACKEND'] == 'keras':
+        return False
+    return app.config['INFERENCE_BACKEND'] != 'keras'
+
+
+def init_models():
+    """Load the model and face detector once per process (no-op after the first call)"""
+    global model_initialized, detector_initialized
+    if model_initialized and detector_initialized:
+        return
+    with _init_lock:
+        if not model_initialized:
+            load_model()
+            model_initialized = True
+        if not detector_initialized:
+            load_face_detector()
+            detector_initialized = True
+        logger.info(f"⏱️ Startup timings (pid {os.getpid()}): {startup_timings}")
+
+
+def create_app(preload=True):
+    """
+    Application factory for WSGI servers (see wsgi.py and gunicorn.conf.py)
+
+    With gunicorn --preload this runs once in the master. Python modules,
+    TensorFlow's import and a TFLite/ONNX model are then shared copy-on-write
+    by every worker. Anything that starts the TensorFlow runtime (the Keras
+    model, MTCNN) is left to init_models() in each worker after fork.
+    """
+    global model_initialized
+    if preload:
+        start = time.perf_counter()
+        import_tensorflow()
+        import mtcnn  # noqa: F401  (module import only, no TF graph yet)
+        startup_timings['preload_imports'] = round(time.perf_counter() - start, 3)
+        if model_is_fork_safe() and not model_initialized:
+            with _init_lock:
+                load_model()
+                model_initialized = True
+    return app
+
+
+@app.before_request
+def ensure_models_loaded():
+    """Servers without a post-fork hook load the models on the first request instead of serving dummy scores"""
+    init_models()
+
+
+@app.before_request
+def start_request_metrics():
+    """Track in-flight requests and start the latency clock"""
+    g.metrics_endpoint = request.endpoint or 'unmatched'
+    g.metrics_start = time.perf_counter()
+    in_flight_requests.inc(g.metrics_endpoint)
+
+
+@app.after_request
+def record_response_size(response):
+    """Count bytes sent per endpoint (streamed responses such as crop files and NDJSON are skipped)"""
+    # Measuring a generator body would buffer all of it before the first byte is sent
+    if not response.direct_passthrough and not response.is_streamed and request.endpoint:
+        response_stats.record_response(request.endpoint, response.calculate_content_length() or 0)
+    return response
+
+
+@app.after_request
+def record_request_metrics(response):
+    """Request counters by status, 5xx errors and cache outcomes"""
+    endpoint = g.get('metrics_endpoint', request.endpoint or 'unmatched')
+    requests_total.inc(endpoint, response.status_code)
+    if response.status_code >= 500:
+        errors_total.inc(endpoint)
+    if 'X-Cache' in response.headers:
+        cache_results_total.inc(response.headers['X-Cache'].lower())
+    return response
+
+
+@app.teardown_request
+def finish_request_metrics(exc):
+    """Runs even when a view raised, so the in-flight gauge never leaks"""
+    if 'metrics_start' in g:
+        request_seconds.observe(time.perf_counter() - g.metrics_start, g.metrics_endpoint)
+        in_flight_requests.dec(g.metrics_endpoint)
+
+
+def get_face_cascade():
+    """Load the Haar cascade fallback once and reuse it"""
+    global face_cascade
+    if face_cascade is None:
+        face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    return face_cascade
+
+
+def find_faces(img_array):
+    """Run MTCNN (or the Haar fallback) on an RGB array and return detections"""
+    with stage_seconds.time('detect'):
+        if face_detector:
+            return face_detector.detect_faces(img_array)
+        
+        # Fallback to OpenCV Haar Cascade if MTCNN fails
+        gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
+        faces = get_face_cascade().detectMultiScale(gray, 1.3, 5)
+    
+    return [{'box': [x, y, w, h], 'confidence': 0.99} for x, y, w, h in faces]
+
+
+def detection_scale(width, height):
+    """Scale factor that caps the long edge of the detection copy at DETECTION_MAX_SIDE"""
+    max_side = app.config['DETECTION_MAX_SIDE']
+    long_edge = max(width, height)
+    if max_side <= 0 or long_edge <= max_side:
+        return 1.0
+    return max_side / long_edge
+
+
+def detect_faces_downscaled(image):
+    """
+    Run face detection on a copy capped at DETECTION_MAX_SIDE on the long edge
+    Returns the RGB image, the raw detections and the detection scale
+    """
+    # Convert grayscale / RGBA input to RGB
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    
+    full_width, full_height = image.size
+    scale = detection_scale(full_width, full_height)
+    
+    if scale < 1.0:
+        with stage_seconds.time('detect_downscale'):
+            small = image.resize(
+                (max(1, round(full_width * scale)), max(1, round(full_height * scale))),
+                Image.BILINEAR,
+                reducing_gap=2.0
+            )
+    else:
+        small = image
+    
+    return image, find_faces(np.asarray(small)), scale
+
+
+def crop_detection(image, face, scale, num_faces):
+    """Map a detection back to full resolution, pad it and crop it from the original image"""
+    full_width, full_height = image.size
+    
+    # Map the box back to full-resolution coordinates
+    x, y, width, height = [int(round(v / scale)) for v in face['box']]
+    
+    # Add 20 original-resolution pixels of padding around the face, whatever the decode reduction
+    reduction = image.info.get('decode_reduction', 1)
+    padding = max(1, round(20 / reduction))
+    x = max(0, x - padding)
+    y = max(0, y - padding)
+    width = min(full_width - x, width + 2 * padding)
+    height = min(full_height - y, height + 2 * padding)
+    
+    # Crop face from the original image
+    with stage_seconds.time('crop'):
+        face_pil = image.crop((x, y, x + width, y + height))
+    
+    # Boxes are reported in original-resolution pixels even when the JPEG was decoded reduced
+    detection_info = {
+        'box': [int(round(v * reduction)) for v in (x, y, width, height)],
+        'confidence': float(face['confidence']),
+        'num_faces': num_faces
+    }
+    
+    return face_pil, detection_info
+
+
 def detect_and_crop_face(image):
     """
     Detect face in image using MTCNN and crop it
+    Faces are found on a downscaled copy and cropped from the full-resolution original
     Returns cropped face image and detection info
     """
     try:
-        # Convert PIL to numpy array
-        img_array = np.array(image)
-        
-        # Convert RGB to BGR for OpenCV
-        if len(img_array.shape) == 2:  # Grayscale
-            img_array = cv2.cvtColor(img_array, cv2.COLOR_GRAY2RGB)
-        elif img_array.shape[2] == 4:  # RGBA
-            img_array = cv2.cvtColor(img_array, cv2.COLOR_RGBA2RGB)
-        
-        # Detect faces
-        if face_detector:
-            detections = face_detector.detect_faces(img_array)
-        else:
-            # Fallback to OpenCV Haar Cascade if MTCNN fails
-            face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-            gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-            faces = face_cascade.detectMultiScale(gray, 1.3, 5)
-            
-            if len(faces) > 0:
-                x, y, w, h = faces[0]
-                detections = [{'box': [x, y, w, h], 'confidence': 0.99}]
-            else:
-                detections = []
+        image, detections, scale = detect_faces_downscaled(image)
         
+        # No-face images are rejected before any full-resolution work
         if len(detections) == 0:
             logger.warning("No face detected in image")
+            no_face_total.inc()
             return None, None, "No face detected"
         
         # Get the face with highest confidence
         face = max(detections, key=lambda x: x['confidence'])
-        x, y, width, height = face['box']
-        confidence = face['confidence']
-        
-        # Add padding around face
-        padding = 20
-        x = max(0, x - padding)
-        y = max(0, y - padding)
-        width = min(img_array.shape[1] - x, width + 2 * padding)
-        height = min(img_array.shape[0] - y, height + 2 * padding)
-        
-        # Crop face
-        face_img = img_array[y:y+height, x:x+width]
-        
-        # Convert back to PIL Image
-        face_pil = Image.fromarray(face_img)
-        
-        detection_info = {
-            'box': [int(x), int(y), int(width), int(height)],
-            'confidence': float(confidence),
-            'num_faces': len(detections)
-        }
+        face_pil, detection_info = crop_detection(image, face, scale, len(detections))
         
         return face_pil, detection_info, None
         
@@ -140,68 +668,634 @@ def detect_and_crop_face(image):
         return None, None, str(e)
 
 
-def preprocess_image(image):
-    """Preprocess image for model input"""
-    # Resize to model input size
-    image = image.resize((IMG_SIZE, IMG_SIZE))
-    
-    # Convert to array and normalize
-    img_array = np.array(image)
-    img_array = img_array.astype('float32') / 255.0
+def detect_and_crop_all_faces(image, min_confidence=None, max_faces=None):
+    """
+    Detect every face above min_confidence and crop each one
+    Returns a list of (face image, detection info) sorted by confidence, and an error message
+    """
+    min_confidence = app.config['MULTI_FACE_MIN_CONFIDENCE'] if min_confidence is None else min_confidence
+    max_faces = app.config['MULTI_FACE_MAX_FACES'] if max_faces is None else max_faces
+    try:
+        image, detections, scale = detect_faces_downscaled(image)
+        
+        faces = sorted(
+            (face for face in detections if face['confidence'] >= min_confidence),
+            key=lambda x: x['confidence'],
+            reverse=True
+        )[:max_faces]
+        
+        if len(faces) == 0:
+            logger.warning("No face detected in image")
+            no_face_total.inc()
+            return [], "No face detected"
+        
+        return [crop_detection(image, face, scale, len(detections)) for face in faces], None
+        
+    except Exception as e:
+        logger.error(f"Error in face detection: {str(e)}")
+        return [], str(e)
+
+
+def detect_video_faces(frame):
+    """Face detections for one RGB video frame, in full-frame coordinates"""
+    _, detections, scale = detect_faces_downscaled(Image.fromarray(frame))
+    return [
+        {'box': [v / scale for v in face['box']], 'confidence': face['confidence']}
+        for face in detections
+    ]
+
+
+def preprocess_image(image, out=None):
+    """
+    Resize a face crop to the model input as uint8 (normalization happens at the model boundary)
+    Writes into `out` when given, so batch callers fill preallocated buffers in place
+    """
+    if out is None:
+        out = np.empty((IMG_SIZE, IMG_SIZE, 3), dtype=np.uint8)
+    with stage_seconds.time('preprocess'):
+        return resize_into(np.asarray(image), out)
+
+
+def run_model(batch):
+    """Run the model on a uint8 or float32 batch and return one raw score per sample"""
+    inference_batch_size.observe(len(batch))
+    with stage_seconds.time('inference'):
+        if inference_session is not None:
+            return inference_session.predict(batch)
+        if model is not None:
+            return model.predict(as_float_input(batch, float_buffers), verbose=0)[:, 0]
+
+    # Dummy prediction if model not loaded
+    logger.warning("Using dummy prediction (model not loaded)")
+    dummy_predictions_total.inc(amount=len(batch))
+    return np.random.random(len(batch))
+
+
+def get_batcher():
+    """Return the shared micro-batcher, starting it on first use"""
+    global batcher
+    if not app.config['MICRO_BATCHING']:
+        return None
+    if batcher is None:
+        with _batcher_lock:
+            if batcher is None:
+                batcher = MicroBatcher(
+                    run_model,
+                    max_batch_size=app.config['BATCH_MAX_SIZE'],
+                    max_wait_ms=app.config['BATCH_MAX_WAIT_MS'],
+                    # One batch in flight per inference worker process
+                    concurrency=max(1, app.config['INFERENCE_WORKERS'])
+                ).start()
+                logger.info(f"✅ Micro-batcher started (max batch {batcher.max_batch_size}, "
+                            f"max wait {app.config['BATCH_MAX_WAIT_MS']}ms, {batcher.concurrency} dispatch threads)")
+    return batcher
+
+
+def get_admission_controller():
+    """Return the shared admission controller, or None when admission control is disabled"""
+    global admission
+    if not app.config['ADMISSION_CONTROL']:
+        return None
+    if admission is None:
+        with _batcher_lock:
+            if admission is None:
+                admission = AdmissionController(
+                    max_in_flight=app.config['ADMISSION_MAX_IN_FLIGHT'],
+                    max_queue=app.config['ADMISSION_MAX_QUEUE'],
+                    batch_max_in_flight=app.config['ADMISSION_BATCH_MAX_IN_FLIGHT'],
+                    batch_max_queue=app.config['ADMISSION_BATCH_MAX_QUEUE']
+                )
+    return admission
+
+
+def request_deadline():
+    """
+    Deadline of the current request from its X-Request-Timeout-Ms header (or DEFAULT_DEADLINE_MS)
+    Counted from when the server received the request; asgi.py records that before the body upload
+    """
+    seconds = parse_deadline_ms(request.headers.get('X-Request-Timeout-Ms'),
+                                app.config['DEFAULT_DEADLINE_MS'], app.config['MAX_DEADLINE_MS'])
+    return Deadline(seconds, start=request.environ.get('deepfake.received_at', g.get('metrics_start')))
+
+
+def check_deadline(deadline, stage):
+    """Raise DeadlineExceeded rather than start an expensive stage for a client that has given up"""
+    if deadline is not None:
+        deadline.check(stage)
+
+
+def shed_response(priority, error):
+    """429/503 with Retry-After for an Overloaded rejection, 504 for a DeadlineExceeded"""
+    if isinstance(error, Overloaded):
+        shed_total.inc(priority, error.reason)
+        response = jsonify({'error': 'Server is busy, retry later', 'reason': error.reason,
+                            'retry_after': error.retry_after})
+        response.headers['Retry-After'] = str(error.retry_after)
+        return response, error.status
     
-    # Add batch dimension
-    img_array = np.expand_dims(img_array, axis=0)
+    shed_total.inc(priority, f"expired_before_{error.stage}")
+    return jsonify({'error': str(error), 'reason': 'deadline_exceeded', 'stage': error.stage}), 504
+
+
+def admitted(priority):
+    """
+    Decorator: run the view only once admission control grants it a pipeline slot
+    The request's deadline is available to the view as g.deadline
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            g.deadline = request_deadline()
+            controller = get_admission_controller()
+            try:
+                ticket = controller.admit(priority, g.deadline) if controller is not None else None
+            except (Overloaded, DeadlineExceeded) as e:
+                return shed_response(priority, e)
+            try:
+                response = view(*args, **kwargs)
+            except BaseException:
+                if ticket is not None:
+                    controller.release(ticket)
+                raise
+            if ticket is not None:
+                if isinstance(response, Response) and response.is_streamed:
+                    # A streamed body is produced after the view returns; keep the slot until it has been sent
+                    response.call_on_close(lambda: controller.release(ticket))
+                else:
+                    controller.release(ticket)
+            return response
+        return wrapper
+    return decorator
+
+
+def interpret_prediction(prediction):
+    """Turn a raw model score into the API prediction object"""
+    # Interpret result
+    # Assuming: 0 = FAKE, 1 = REAL
+    if prediction < 0.5:
+        result = "Fake"
+        confidence = (1 - prediction) * 100
+    else:
+        result = "Real"
+        confidence = prediction * 100
     
-    return img_array
+    return {
+        'result': result,
+        'confidence': float(confidence),
+        'raw_score': float(prediction),
+        'fake_probability': float((1 - prediction) * 100),
+        'real_probability': float(prediction * 100)
+    }
 
 
-def predict_deepfake(image):
+def predict_deepfake(image, deadline=None):
     """
     Run deepfake detection on preprocessed image
-    Returns prediction result and confidence
+    Returns prediction result and confidence; raises DeadlineExceeded if the deadline passes first
     """
     try:
-        # Preprocess image
-        processed_img = preprocess_image(image)
+        # Preprocess into this thread's reusable buffer (consumed before the next request on it)
+        processed_img = tensor_buffers.get(1)
+        preprocess_image(image, out=processed_img[0])
         
-        if model is not None:
-            # Get prediction
-            prediction = model.predict(processed_img, verbose=0)[0][0]
+        # Concurrent requests are coalesced into one model call by the batcher
+        shared_batcher = get_batcher()
+        if shared_batcher is not None:
+            # Queue wait plus the shared forward pass
+            with stage_seconds.time('batch_submit'):
+                prediction = shared_batcher.submit(
+                    processed_img[0], expires_at=deadline.expires_at if deadline is not None else None)
         else:
-            # Dummy prediction if model not loaded
-            logger.warning("Using dummy prediction (model not loaded)")
-            prediction = np.random.random()
-        
-        # Interpret result
-        # Assuming: 0 = FAKE, 1 = REAL
-        if prediction < 0.5:
-            result = "Fake"
-            confidence = (1 - prediction) * 100
+            check_deadline(deadline, 'inference')
+            prediction = run_model(processed_img)[0]
+        
+        return interpret_prediction(prediction)
+        
+    except DeadlineExceeded:
+        raise
+    except TimeoutError:
+        # The micro-batcher dropped the sample because its deadline passed in the queue
+        raise DeadlineExceeded('inference')
+    except Exception as e:
+        logger.error(f"Error in prediction: {str(e)}")
+        return None
+
+
+def predict_deepfake_batch(images):
+    """
+    Run deepfake detection on a list of face images in a single forward pass
+    Returns one prediction result per image (None for all if the model call fails)
+    """
+    if not images:
+        return []
+    try:
+        batch = tensor_buffers.get(len(images))
+        for slot, image in zip(batch, images):
+            preprocess_image(image, out=slot)
+        predictions = run_model(batch)
+        return [interpret_prediction(prediction) for prediction in predictions]
+    except Exception as e:
+        logger.error(f"Error in batch prediction: {str(e)}")
+        return [None] * len(images)
+
+
+def get_prediction_cache():
+    """Return the shared prediction cache, or None when caching is disabled"""
+    global prediction_cache
+    if not app.config['PREDICTION_CACHE']:
+        return None
+    if prediction_cache is None:
+        with _batcher_lock:
+            if prediction_cache is None:
+                prediction_cache = PredictionCache(
+                    max_entries=app.config['CACHE_MAX_ENTRIES'],
+                    ttl_seconds=app.config['CACHE_TTL_SECONDS'],
+                    db_path=app.config['CACHE_DB_PATH'] or None
+                )
+    return prediction_cache
+
+
+def get_phash_index():
+    """Return the shared near-duplicate index, or None when disabled or no model is loaded"""
+    global phash_index
+    if not app.config['PHASH_INDEX'] or model is None:
+        return None
+    if phash_index is None:
+        with _batcher_lock:
+            if phash_index is None:
+                phash_index = PerceptualHashIndex(
+                    max_distance=app.config['PHASH_MAX_DISTANCE'],
+                    max_entries=app.config['PHASH_MAX_ENTRIES']
+                )
+    return phash_index
+
+
+def lookup_near_duplicate(face_image):
+    """
+    Check the face crop against previously classified crops
+    Returns (hash, stored prediction or None); hash is None when the index is disabled
+    """
+    index = get_phash_index()
+    if index is None:
+        return None, None
+    with stage_seconds.time('phash_lookup'):
+        face_hash = perceptual_hash(face_image)
+        if face_hash is None:
+            return None, None
+        return face_hash, index.lookup(face_hash)
+
+
+def remember_prediction(face_hash, prediction_result):
+    """Record a fresh Fake prediction so re-encoded copies of the crop can skip inference"""
+    if face_hash is None or prediction_result is None or phash_index is None:
+        return
+    # A manipulated copy of a real face is itself a near-duplicate, so Real verdicts are never reused
+    if prediction_result.get('result') == 'Fake':
+        phash_index.add(face_hash, prediction_result)
+
+
+def classify_faces(face_images):
+    """
+    Classify face crops, reusing stored predictions for near-duplicates
+    All remaining crops go through the model in one forward pass
+    """
+    predictions = []
+    misses = []
+    for face_image in face_images:
+        face_hash, prediction_result = lookup_near_duplicate(face_image)
+        predictions.append(prediction_result)
+        if prediction_result is None:
+            misses.append((len(predictions) - 1, face_hash, face_image))
+    
+    fresh = predict_deepfake_batch([face_image for _, _, face_image in misses])
+    for (position, face_hash, _), prediction_result in zip(misses, fresh):
+        predictions[position] = prediction_result
+        remember_prediction(face_hash, prediction_result)
+    
+    return predictions
+
+
+def aggregate_predictions(predictions):
+    """
+    Image-level verdict over several faces
+    The image is Fake if any face is Fake, so the verdict follows the lowest raw score
+    """
+    scores = [p['raw_score'] for p in predictions]
+    verdict = interpret_prediction(min(scores))
+    verdict.update({
+        'policy': 'any_fake',
+        'faces_classified': len(predictions),
+        'fake_faces': sum(1 for p in predictions if p['result'] == 'Fake'),
+        'real_faces': sum(1 for p in predictions if p['result'] == 'Real'),
+        'mean_raw_score': float(np.mean(scores))
+    })
+    return verdict
+
+
+def complete_batch_results(results, crop=None):
+    """
+    Classify every prepared batch item in place (see prepare_batch_item)
+    Items with a face crop get 'prediction' and 'face_detection' (plus the crop if requested), or an error
+    """
+    ready = [item for item in results if 'face_image' in item]
+    predictions = classify_faces([item['face_image'] for item in ready])
+    
+    for item, prediction_result in zip(ready, predictions):
+        face_image = item.pop('face_image')
+        face_detection = item.pop('face_detection')
+        if prediction_result:
+            item['prediction'] = prediction_result
+            item['face_detection'] = face_detection
+            if crop is not None:
+                item.update(render_crop(face_image, crop))
         else:
-            result = "Real"
-            confidence = prediction * 100
+            item['error'] = 'Prediction failed'
+    
+    return results
+
+
+def job_store_options():
+    """JobStore arguments from the config"""
+    return {'db_path': app.config['JOBS_DB_PATH'], 'files_dir': app.config['JOBS_FILES_DIR']}
+
+
+def job_runner_options():
+    """JobRunner arguments from the config"""
+    return {
+        'workers': app.config['JOBS_WORKERS'],
+        'chunk_size': app.config['JOBS_CHUNK_SIZE'],
+        'lease_seconds': app.config['JOBS_LEASE_SECONDS']
+    }
+
+
+def get_job_store():
+    """Return this process's connection to the durable job queue"""
+    global job_store
+    if job_store is None:
+        with _batcher_lock:
+            if job_store is None:
+                job_store = JobStore(**job_store_options())
+    return job_store
+
+
+def get_job_runner():
+    """
+    Return the job store and its dispatcher, starting the worker pool on first use
+    The dispatcher is None when a dedicated process runs it (JOBS_DISPATCHER=external, see gunicorn.conf.py)
+    """
+    global job_runner
+    store = get_job_store()
+    if app.config['JOBS_DISPATCHER'] == 'external':
+        return store, None
+    if job_runner is None:
+        with _batcher_lock:
+            if job_runner is None:
+                job_runner = JobRunner(store, **job_runner_options()).start()
+                pending = store.pending_count()
+                if pending:
+                    logger.info(f"🔄 Resuming {pending} unfinished job items")
+    return store, job_runner
+
+
+def load_image(image_source):
+    """
+    Decode uploaded bytes or a binary stream into an upright RGB PIL image
+    Large JPEGs are decoded at reduced resolution (see DECODE_MIN_SIDE)
+    """
+    with stage_seconds.time('decode'):
+        return decode_image(image_source, min_side=app.config['DECODE_MIN_SIDE'])
+
+
+def get_batch_pool():
+    """Return the worker pool used to decode and detect faces for batch requests"""
+    global batch_pool
+    if batch_pool is None:
+        with _batcher_lock:
+            if batch_pool is None:
+                batch_pool = ThreadPoolExecutor(
+                    max_workers=app.config['BATCH_PREDICT_WORKERS'],
+                    thread_name_prefix='batch-decode'
+                )
+    return batch_pool
+
+
+def prepare_batch_item(filename, image_source, deadline=None):
+    """
+    Decode one batch upload (bytes or stream) and crop its face; returns a partial result dict
+    Raises DeadlineExceeded instead of starting a stage after the request's deadline
+    """
+    try:
+        check_deadline(deadline, 'decode')
+        image = load_image(image_source)
+        check_deadline(deadline, 'detection')
+        face_image, detection_info, error = detect_and_crop_face(image)
+        
+        if error or face_image is None:
+            return {
+                'filename': filename,
+                'error': error or 'Face detection failed'
+            }
         
         return {
-            'result': result,
-            'confidence': float(confidence),
-            'raw_score': float(prediction),
-            'fake_probability': float((1 - prediction) * 100),
-            'real_probability': float(prediction * 100)
+            'filename': filename,
+            'face_image': face_image,
+            'face_detection': detection_info
         }
         
+    except DeadlineExceeded:
+        raise
     except Exception as e:
-        logger.error(f"Error in prediction: {str(e)}")
-        return None
+        return {
+            'filename': filename,
+            'error': str(e)
+        }
 
 
-def image_to_base64(image):
+def image_to_base64(image, max_size=0, quality=75):
     """Convert PIL Image to base64 string"""
-    buffered = io.BytesIO()
-    image.save(buffered, format="JPEG")
-    img_str = base64.b64encode(buffered.getvalue()).decode()
+    img_str = base64.b64encode(encode_crop_jpeg(image, max_size, quality)).decode()
     return f"data:image/jpeg;base64,{img_str}"
 
 
+def get_crop_store():
+    """Return the content-addressed crop store, creating it on first use"""
+    global crop_store
+    if crop_store is None:
+        with _batcher_lock:
+            if crop_store is None:
+                crop_store = CropStore(app.config['CROP_STORE_DIR'], max_files=app.config['CROP_STORE_MAX_FILES'])
+    return crop_store
+
+
+def crop_options(default_mode=None, values=None):
+    """
+    (mode, max_size, quality) for the face crop, from request parameters (or `values`) or config defaults
+    Raises ValueError for unknown modes or non-integer sizes
+    """
+    values = request.values if values is None else values
+    mode = values.get('crop', default_mode or app.config['RESPONSE_CROP_MODE']).lower()
+    if mode not in CROP_MODES:
+        raise ValueError(f"crop must be one of: {', '.join(CROP_MODES)}")
+    max_size = max(0, int(values.get('crop_size', app.config['CROP_MAX_SIZE'])))
+    quality = min(95, max(1, int(values.get('crop_quality', app.config['CROP_JPEG_QUALITY']))))
+    return mode, max_size, quality
+
+
+def render_crop(face_image, options):
+    """Response fields for a face crop: inline base64, a crop store URL, or nothing"""
+    mode, max_size, quality = options
+    if mode == 'none':
+        return {}
+    
+    start = time.perf_counter()
+    jpeg_bytes = encode_crop_jpeg(face_image, max_size, quality)
+    if mode == 'url':
+        fields = {'face_crop_url': f"/api/crops/{get_crop_store().put(jpeg_bytes)}.jpg"}
+    else:
+        fields = {'face_crop': f"data:image/jpeg;base64,{base64.b64encode(jpeg_bytes).decode()}"}
+    elapsed = time.perf_counter() - start
+    stage_seconds.observe(elapsed, 'crop_encode')
+    response_stats.record_crop(mode, elapsed, len(jpeg_bytes))
+    
+    return fields
+
+
+def crop_url_live(payload):
+    """
+    Refresh the stored crop behind a cached payload's face_crop_url so pruning keeps it
+    False when the crop has already been pruned and the URL would 404
+    """
+    url = payload.get('face_crop_url')
+    if url is None:
+        return True
+    return get_crop_store().touch(url.rsplit('/', 1)[-1][:-len('.jpg')])
+
+
+def batch_response(payload, status=200, values=None):
+    """JSON by default; MessagePack or CBOR when requested with format= or the Accept header"""
+    values = request.values if values is None else values
+    fmt = negotiate_format(values.get('format'), request.headers.get('Accept', ''))
+    if fmt == 'json':
+        return jsonify(payload), status
+    
+    try:
+        start = time.perf_counter()
+        body = serialize(payload, fmt)
+    except ImportError:
+        return jsonify({'error': f'{fmt} encoding is not available on this server'}), 406
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    elapsed = time.perf_counter() - start
+    stage_seconds.observe(elapsed, 'serialize')
+    response_stats.record_body(fmt, elapsed, len(body))
+    
+    return app.response_class(body, status=status, mimetype=f"application/{fmt}")
+
+
+# Errors that depend only on the uploaded bytes; any other 400 (e.g. a detector failure under load) may not recur
+DETERMINISTIC_ERRORS = ('No face detected', 'Invalid image file')
+
+
+def cacheable_result(result):
+    """True for (payload, status) results that hold for the same content on every run: 200s and deterministic 400s"""
+    payload, status = result
+    return status == 200 or (status == 400 and payload.get('error') in DETERMINISTIC_ERRORS)
+
+
+def process_single_image(image_source, multi_face=False, crop=('inline', 0, 75), deadline=None):
+    """
+    Run the full single-image pipeline on uploaded bytes or a binary stream
+    crop is (mode, max_size, quality) as returned by crop_options()
+    Returns (response payload without timestamp, HTTP status); raises DeadlineExceeded between stages
+    """
+    # Decode straight from the upload
+    check_deadline(deadline, 'decode')
+    try:
+        image = load_image(image_source)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    
+    if multi_face:
+        return process_all_faces(image, crop, deadline)
+    
+    # Detect and crop face
+    check_deadline(deadline, 'detection')
+    face_image, detection_info, error = detect_and_crop_face(image)
+    
+    if error or face_image is None:
+        return {
+            'error': error or 'Face detection failed',
+            'detected_faces': 0
+        }, 400
+    
+    logger.info(f"Face detected with confidence: {detection_info['confidence']:.2f}")
+    
+    # Re-encoded copies of a known crop reuse the stored prediction
+    face_hash, prediction_result = lookup_near_duplicate(face_image)
+    
+    if prediction_result is None:
+        # Run deepfake prediction
+        prediction_result = predict_deepfake(face_image, deadline)
+        remember_prediction(face_hash, prediction_result)
+    
+    if prediction_result is None:
+        return {'error': 'Prediction failed'}, 500
+    
+    logger.info(f"Prediction: {prediction_result['result']} ({prediction_result['confidence']:.2f}%)")
+    
+    return {
+        'success': True,
+        'prediction': prediction_result,
+        'face_detection': detection_info,
+        **render_crop(face_image, crop)
+    }, 200
+
+
+def process_all_faces(image, crop=('inline', 0, 75), deadline=None):
+    """
+    Multi-face pipeline: classify every detected face in one batched model call
+    Returns (response payload without timestamp, HTTP status)
+    """
+    check_deadline(deadline, 'detection')
+    crops, error = detect_and_crop_all_faces(image)
+    
+    if error or not crops:
+        return {
+            'error': error or 'Face detection failed',
+            'detected_faces': 0
+        }, 400
+    
+    check_deadline(deadline, 'inference')
+    predictions = classify_faces([face_image for face_image, _ in crops])
+    
+    if any(prediction_result is None for prediction_result in predictions):
+        return {'error': 'Prediction failed'}, 500
+    
+    faces = [
+        {
+            'box': detection_info['box'],
+            'confidence': detection_info['confidence'],
+            'prediction': prediction_result
+        }
+        for (_, detection_info), prediction_result in zip(crops, predictions)
+    ]
+    aggregate = aggregate_predictions(predictions)
+    
+    logger.info(f"Multi-face prediction: {aggregate['result']} "
+                f"({aggregate['fake_faces']}/{len(faces)} faces fake)")
+    
+    # The highest-confidence face keeps the single-face fields populated
+    primary_face, primary_detection = crops[0]
+    
+    return {
+        'success': True,
+        'prediction': aggregate,
+        'face_detection': primary_detection,
+        'faces': faces,
+        **render_crop(primary_face, crop)
+    }, 200
+
+
 @app.route('/')
 def home():
     """API home endpoint"""
@@ -211,7 +1305,11 @@ def home():
         'status': 'running',
         'endpoints': {
             '/api/predict': 'POST - Upload image for deepfake detection',
-            '/api/health': 'GET - Check API health status'
+            '/api/predict-video': 'POST - Upload video for per-segment deepfake analysis',
+            '/api/jobs': 'POST - Submit a large batch as an asynchronous job',
+            '/api/archive-predict': 'POST - Upload a ZIP/TAR archive of images, results streamed as NDJSON',
+            '/api/health': 'GET - Check API health status',
+            '/api/metrics': 'GET - Prometheus metrics'
         }
     })
 
@@ -222,11 +1320,32 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'model_loaded': model is not None,
+        'inference_backend': app.config['INFERENCE_BACKEND'],
         'face_detector_loaded': face_detector is not None,
+        'batching': batcher.stats() if batcher is not None else None,
+        'admission': admission.stats() if admission is not None else None,
+        'cascade': cascade_stats(),
+        'worker_pool': worker_pool_stats(),
+        'cache': prediction_cache.stats() if prediction_cache is not None else None,
+        'phash_index': phash_index.stats() if phash_index is not None else None,
+        'responses': response_stats.stats(),
+        'model_version': model_version,
+        'worker_pid': os.getpid(),
+        'inference_threads': inference_threads(),
+        'memory': process_memory(),
+        'startup_timings': startup_timings,
         'timestamp': datetime.now().isoformat()
     })
 
 
+@app.route('/api/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus scrape endpoint: per-stage latency histograms, request counters and gauges"""
+    if not app.config['METRICS']:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    return app.response_class(metrics_registry.render(), content_type=METRICS_CONTENT_TYPE)
+
+
 @app.route('/api/docs', methods=['GET'])
 def api_docs():
     """API documentation endpoint"""
@@ -254,7 +1373,20 @@ def api_docs():
                 'response': {
                     'status': 'string',
                     'model_loaded': 'boolean',
+                    'inference_backend': 'string (keras, tflite or onnx)',
                     'face_detector_loaded': 'boolean',
+                    'batching': 'object (micro-batch fill statistics) or null',
+                    'admission': 'object (pipeline slots, queue depth and shed counts per priority) or null',
+                    'cascade': 'object (band, escalation rate, model ms per face per stage) or null',
+                    'worker_pool': 'object (per inference worker process: pid, cores, faces, busy seconds) or null',
+                    'cache': 'object (prediction cache hit/miss/eviction counters) or null',
+                    'phash_index': 'object (near-duplicate index size, lookup latency, hit rate) or null',
+                    'responses': 'object (crop encode time and bytes per mode, binary body sizes, bytes sent per endpoint)',
+                    'model_version': 'string',
+                    'worker_pid': 'integer (serving process)',
+                    'inference_threads': 'integer (intra-op threads per worker)',
+                    'memory': 'object (rss_mb and peak_rss_mb of the serving process)',
+                    'startup_timings': 'object (seconds per startup step: imports, model load, warmup, detector)',
                     'timestamp': 'string'
                 }
             },
@@ -268,6 +1400,31 @@ def api_docs():
                         'required': True,
                         'description': 'Image file (PNG, JPG, JPEG)',
                         'max_size': '16MB'
+                    },
+                    {
+                        'name': 'multi_face',
+                        'type': 'boolean',
+                        'required': False,
+                        'description': 'Classify every detected face in one batched call and return an image-level verdict'
+                    },
+                    {
+                        'name': 'crop',
+                        'type': 'string',
+                        'required': False,
+                        'description': 'Face crop in the response: inline (base64), url (/api/crops/...) or none '
+                                       f"(default {app.config['RESPONSE_CROP_MODE']})"
+                    },
+                    {
+                        'name': 'crop_size',
+                        'type': 'number',
+                        'required': False,
+                        'description': 'Maximum long edge of the returned crop in pixels (0 = native)'
+                    },
+                    {
+                        'name': 'crop_quality',
+                        'type': 'number',
+                        'required': False,
+                        'description': 'JPEG quality of the returned crop (1-95)'
                     }
                 ],
                 'response': {
@@ -284,12 +1441,16 @@ def api_docs():
                         'confidence': 'number',
                         'num_faces': 'number'
                     },
-                    'face_crop': 'string (base64)',
+                    'faces': 'array of {box, confidence, prediction} (multi_face only)',
+                    'face_crop': 'string (base64, crop=inline)',
+                    'face_crop_url': 'string (crop=url)',
                     'timestamp': 'string'
                 },
                 'error_responses': {
                     '400': 'No file provided, invalid file type, or face detection failed',
-                    '500': 'Internal server error'
+                    '500': 'Internal server error',
+                    '503': 'Server saturated or deadline unreachable (see Retry-After)',
+                    '504': 'X-Request-Timeout-Ms deadline passed before the pipeline finished'
                 }
             },
             '/api/batch-predict': {
@@ -300,9 +1461,36 @@ def api_docs():
                         'name': 'files',
                         'type': 'files',
                         'required': True,
-                        'description': 'Multiple image files (PNG, JPG, JPEG)',
-                        'max_files': 10,
+                        'description': 'Multiple image files (PNG, JPG, JPEG); each is decoded and cropped as soon as '
+                                       'it has been received',
+                        'max_files': app.config['BATCH_PREDICT_MAX_FILES'],
                         'max_size_per_file': '16MB'
+                    },
+                    {
+                        'name': 'crop',
+                        'type': 'string',
+                        'required': False,
+                        'description': 'Face crop in the response: inline (base64), url (/api/crops/...) or none '
+                                       f"(default {app.config['BATCH_CROP_MODE']})"
+                    },
+                    {
+                        'name': 'crop_size',
+                        'type': 'number',
+                        'required': False,
+                        'description': 'Maximum long edge of the returned crop in pixels (0 = native)'
+                    },
+                    {
+                        'name': 'crop_quality',
+                        'type': 'number',
+                        'required': False,
+                        'description': 'JPEG quality of the returned crop (1-95)'
+                    },
+                    {
+                        'name': 'format',
+                        'type': 'string',
+                        'required': False,
+                        'description': 'json (default), msgpack or cbor; also selected by an Accept: application/msgpack '
+                                       'or application/cbor header'
                     }
                 ],
                 'response': {
@@ -311,11 +1499,152 @@ def api_docs():
                     'results': 'array of prediction objects',
                     'timestamp': 'string'
                 },
+                'error_responses': {
+                    '400': 'No files provided or too many files',
+                    '429': 'Batch queue full, single predictions take priority (see Retry-After)',
+                    '500': 'Internal server error',
+                    '503': 'Server saturated or deadline unreachable (see Retry-After)',
+                    '504': 'X-Request-Timeout-Ms deadline passed before the pipeline finished'
+                }
+            },
+            '/api/archive-predict': {
+                'method': 'POST',
+                'description': 'Upload a ZIP or TAR (optionally gzip/bz2/xz) archive of images; members are read one by '
+                               'one without extraction, batched through face detection and inference, and one '
+                               'NDJSON line is streamed back per image while the archive is still being processed',
+                'parameters': [
+                    {
+                        'name': 'archive',
+                        'type': 'file or request body',
+                        'required': True,
+                        'description': 'The archive as a multipart field, or as the raw request body (a raw TAR body '
+                                       'is processed while it uploads; ZIP is buffered first because its index is at '
+                                       'the end)',
+                        'max_size': app.config['ARCHIVE_MAX_CONTENT_LENGTH'],
+                        'max_images': app.config['ARCHIVE_MAX_MEMBERS'],
+                        'max_size_per_image': app.config['ARCHIVE_MAX_MEMBER_SIZE']
+                    },
+                    {
+                        'name': 'crop',
+                        'type': 'string',
+                        'required': False,
+                        'description': 'Face crop in each line: inline (base64), url (/api/crops/...) or none '
+                                       f"(default {app.config['BATCH_CROP_MODE']})"
+                    }
+                ],
+                'response': {
+                    'content_type': 'application/x-ndjson',
+                    'lines': 'one object per image (filename plus prediction and face_detection, or error) in '
+                             'archive order, then {"summary": {images, classified, errors, real, fake, skipped}} or '
+                             '{"error": ...} if the archive turns out to be corrupt part way through'
+                },
+                'error_responses': {
+                    '400': 'No archive provided, or not a readable ZIP/TAR archive',
+                    '413': 'Archive larger than ARCHIVE_MAX_CONTENT_LENGTH',
+                    '429': 'Batch queue full, single predictions take priority (see Retry-After)',
+                    '503': 'Server saturated (see Retry-After)'
+                }
+            },
+            '/api/predict-video': {
+                'method': 'POST',
+                'description': 'Upload a video; sampled frames are face-tracked and scored in batches',
+                'parameters': [
+                    {
+                        'name': 'file',
+                        'type': 'file',
+                        'required': True,
+                        'description': 'Video file (' + ', '.join(sorted(VIDEO_EXTENSIONS)).upper() + ')',
+                        'max_size': f"{app.config['VIDEO_MAX_CONTENT_LENGTH'] // (1024 * 1024)}MB"
+                    },
+                    {
+                        'name': 'sample_fps',
+                        'type': 'number',
+                        'required': False,
+                        'description': f"Frames sampled per second (default {app.config['VIDEO_SAMPLE_FPS']})"
+                    }
+                ],
+                'response': {
+                    'success': 'boolean',
+                    'video': 'object (fps, frame_count, duration_seconds, width, height)',
+                    'frames_sampled': 'number',
+                    'frames_with_face': 'number',
+                    'detector_runs': 'number',
+                    'segments': 'array of per-segment scores with result',
+                    'prediction': 'object (video-level verdict)',
+                    'timestamp': 'string'
+                },
+                'error_responses': {
+                    '400': 'No file provided, invalid file type, unreadable video or no face found',
+                    '413': 'Video too large',
+                    '429': 'Batch queue full, single predictions take priority (see Retry-After)',
+                    '500': 'Internal server error',
+                    '503': 'Server saturated or deadline unreachable (see Retry-After)',
+                    '504': 'X-Request-Timeout-Ms deadline passed before every sampled frame was scored'
+                }
+            },
+            '/api/jobs': {
+                'method': 'POST',
+                'description': 'Submit a large batch as an asynchronous job processed by background workers',
+                'parameters': [
+                    {
+                        'name': 'files',
+                        'type': 'files',
+                        'required': True,
+                        'description': 'Image files (PNG, JPG, JPEG)',
+                        'max_files': app.config['JOBS_MAX_FILES']
+                    }
+                ],
+                'response': {
+                    'job_id': 'string',
+                    'status': 'string (queued/running/completed)',
+                    'progress': 'object (total, completed, failed, percent)',
+                    'status_url': 'string',
+                    'results_url': 'string'
+                },
                 'error_responses': {
                     '400': 'No files provided or too many files',
                     '500': 'Internal server error'
                 }
             },
+            '/api/jobs/<job_id>': {
+                'method': 'GET',
+                'description': 'Job status and progress',
+                'parameters': [],
+                'response': 'Same object as job submission'
+            },
+            '/api/jobs/<job_id>/results': {
+                'method': 'GET',
+                'description': 'Paginated per-file results in upload order',
+                'parameters': [
+                    {'name': 'offset', 'type': 'number', 'required': False},
+                    {'name': 'limit', 'type': 'number', 'required': False},
+                    {
+                        'name': 'format',
+                        'type': 'string',
+                        'required': False,
+                        'description': 'json (default), msgpack or cbor; also selected by an Accept: application/msgpack '
+                                       'or application/cbor header'
+                    }
+                ],
+                'response': {
+                    'results': 'array of batch-predict result objects',
+                    'next_offset': 'number or null'
+                }
+            },
+            '/api/metrics': {
+                'method': 'GET',
+                'description': 'Prometheus metrics: per-stage latency histograms (decode, detect, crop, preprocess, '
+                               'inference, crop_encode, ...), request/error/no-face/dummy counters, in-flight '
+                               'gauges and startup durations',
+                'parameters': [],
+                'response': 'text/plain (Prometheus exposition format)'
+            },
+            '/api/crops/<digest>.jpg': {
+                'method': 'GET',
+                'description': 'Face crop referenced by face_crop_url (content-addressed, cacheable forever)',
+                'parameters': [],
+                'response': 'image/jpeg'
+            },
             '/api/docs': {
                 'method': 'GET',
                 'description': 'API documentation',
@@ -323,6 +1652,11 @@ def api_docs():
                 'response': 'This documentation object'
             }
         },
+        'request_headers': {
+            'X-Request-Timeout-Ms': f"Deadline in ms for /api/predict, /api/batch-predict and /api/predict-video "
+                                    f"(default {app.config['DEFAULT_DEADLINE_MS']:.0f}, max "
+                                    f"{app.config['MAX_DEADLINE_MS']:.0f}); work is dropped once it passes"
+        },
         'supported_formats': ['PNG', 'JPG', 'JPEG'],
         'max_file_size': '16MB',
         'face_detection': 'MTCNN with OpenCV fallback',
@@ -332,6 +1666,7 @@ def api_docs():
 
 
 @app.route('/api/predict', methods=['POST'])
+@admitted('interactive')
 def predict():
     """
     Main prediction endpoint
@@ -352,59 +1687,156 @@ def predict():
         if not allowed_file(file.filename):
             return jsonify({'error': 'Invalid file type. Allowed: PNG, JPG, JPEG'}), 400
         
-        # Read and open image
-        image_bytes = file.read()
-        image = Image.open(io.BytesIO(image_bytes))
+        # Opt-in: classify every detected face instead of only the most confident one
+        multi_face = request.values.get('multi_face', 'false').lower() in ('1', 'true', 'yes')
         
-        # Convert to RGB if necessary
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
+        try:
+            crop = crop_options()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
+        # The upload is hashed and decoded from the request stream, never copied into one bytes object
+        image_stream = file.stream
         logger.info(f"Processing image: {file.filename}")
         
-        # Detect and crop face
-        face_image, detection_info, error = detect_and_crop_face(image)
+        # Identical uploads are answered from the cache or wait on the in-flight computation
+        cache = get_prediction_cache()
+        if cache is not None and model is not None:
+            key = content_key(image_stream, f"{model_version}:{'multi' if multi_face else 'single'}:"
+                                            f"{':'.join(str(option) for option in crop)}")
+            try:
+                # Waiting on another request's computation stays within this request's deadline,
+                # and a leader that ran out of its own time leaves this request to compute
+                (payload, status), source = cache.get_or_compute(
+                    key,
+                    lambda: process_single_image(image_stream, multi_face, crop, g.deadline),
+                    should_store=cacheable_result,
+                    timeout=max(g.deadline.remaining(), 0),
+                    retry_on=(DeadlineExceeded,)
+                )
+            except TimeoutError:
+                raise DeadlineExceeded('coalesced_prediction')
+            
+            # A cached crop URL outlives its file only if pruning got there first; recompute to store it again
+            if source != 'computed' and not crop_url_live(payload):
+                result = process_single_image(image_stream, multi_face, crop, g.deadline)
+                if cacheable_result(result):
+                    cache.set(key, result)
+                (payload, status), source = result, 'computed'
+        else:
+            (payload, status), source = process_single_image(image_stream, multi_face, crop, g.deadline), 'computed'
         
-        if error or face_image is None:
+        response = dict(payload)
+        if status == 200:
+            response['timestamp'] = datetime.now().isoformat()
+        
+        http_response = jsonify(response)
+        http_response.headers['X-Cache'] = 'MISS' if source == 'computed' else 'HIT'
+        return http_response, status
+        
+    except DeadlineExceeded as e:
+        return shed_response('interactive', e)
+    except Exception as e:
+        logger.error(f"Error in prediction endpoint: {str(e)}")
+        return jsonify({'error': f'Internal server error: {str(e)}'}), 500
+
+
+@app.route('/api/predict-video', methods=['POST'])
+@admitted('batch')
+def predict_video():
+    """
+    Video prediction endpoint
+    Streams the upload to disk, samples frames, tracks the face and scores crops in batches
+    """
+    video_path = None
+    try:
+        if 'file' not in request.files:
+            return jsonify({'error': 'No file provided'}), 400
+        
+        file = request.files['file']
+        
+        if file.filename == '':
+            return jsonify({'error': 'No file selected'}), 400
+        
+        if not allowed_file(file.filename, app.config['VIDEO_ALLOWED_EXTENSIONS']):
+            allowed = ', '.join(sorted(app.config['VIDEO_ALLOWED_EXTENSIONS'])).upper()
+            return jsonify({'error': f'Invalid file type. Allowed: {allowed}'}), 400
+        
+        try:
+            sample_fps = float(request.values.get('sample_fps', app.config['VIDEO_SAMPLE_FPS']))
+        except ValueError:
+            return jsonify({'error': 'sample_fps must be a number'}), 400
+        sample_fps = min(max(sample_fps, 0.1), app.config['VIDEO_MAX_SAMPLE_FPS'])
+        
+        # OpenCV needs a path; the upload is copied to disk in chunks, never held in memory
+        suffix = '.' + file.filename.rsplit('.', 1)[1].lower()
+        fd, video_path = tempfile.mkstemp(suffix=suffix, dir=app.config['UPLOAD_FOLDER'])
+        with os.fdopen(fd, 'wb') as out:
+            file.save(out)
+        
+        info = video_info(video_path)
+        deadline = g.deadline
+        logger.info(f"Processing video: {file.filename} ({info['frame_count']} frames @ {info['fps']:.1f} fps)")
+        
+        with stage_seconds.time('video_analysis'):
+            analysis = analyze_video(
+                video_path,
+                detect_fn=detect_video_faces,
+                predict_fn=run_model,
+                sample_fps=sample_fps,
+                keyframe_interval=app.config['VIDEO_KEYFRAME_INTERVAL'],
+                batch_size=app.config['VIDEO_BATCH_SIZE'],
+                segment_seconds=app.config['VIDEO_SEGMENT_SECONDS'],
+                max_frames=app.config['VIDEO_MAX_FRAMES'],
+                # Checked per sampled frame and per batch, so an expired request stops mid-video
+                check=lambda stage: check_deadline(deadline, stage)
+            )
+        
+        if analysis['aggregate'] is None:
             return jsonify({
-                'error': error or 'Face detection failed',
+                'error': 'No face detected in sampled frames',
+                'frames_sampled': analysis['frames_sampled'],
                 'detected_faces': 0
             }), 400
         
-        logger.info(f"Face detected with confidence: {detection_info['confidence']:.2f}")
+        for segment in analysis['segments']:
+            segment['result'] = interpret_prediction(segment['mean_raw_score'])['result']
         
-        # Run deepfake prediction
-        prediction_result = predict_deepfake(face_image)
-        
-        if prediction_result is None:
-            return jsonify({'error': 'Prediction failed'}), 500
+        aggregate = analysis.pop('aggregate')
+        prediction = interpret_prediction(aggregate['mean_raw_score'])
+        prediction.update(aggregate)
         
-        # Convert face crop to base64 for response
-        face_base64 = image_to_base64(face_image)
+        logger.info(f"Video prediction: {prediction['result']} ({prediction['confidence']:.2f}%) "
+                    f"over {analysis['frames_with_face']} frames, {analysis['detector_runs']} detector runs")
         
-        # Prepare response
-        response = {
+        return jsonify({
             'success': True,
-            'prediction': prediction_result,
-            'face_detection': detection_info,
-            'face_crop': face_base64,
+            'video': info,
+            **analysis,
+            'prediction': prediction,
             'timestamp': datetime.now().isoformat()
-        }
+        }), 200
         
-        logger.info(f"Prediction: {prediction_result['result']} ({prediction_result['confidence']:.2f}%)")
+    except DeadlineExceeded as e:
+        return shed_response('batch', e)
         
-        return jsonify(response), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
         
     except Exception as e:
-        logger.error(f"Error in prediction endpoint: {str(e)}")
+        logger.error(f"Error in video prediction: {str(e)}")
         return jsonify({'error': f'Internal server error: {str(e)}'}), 500
+        
+    finally:
+        if video_path and os.path.exists(video_path):
+            os.remove(video_path)
 
 
-@app.route('/api/batch-predict', methods=['POST'])
-def batch_predict():
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
     """
-    Batch prediction endpoint
-    Accepts multiple images and returns predictions for each
+    Submit an asynchronous batch job
+    Files are spooled to disk and processed by the background worker pool
     """
     try:
         if 'files' not in request.files:
@@ -415,75 +1847,302 @@ def batch_predict():
         if len(files) == 0:
             return jsonify({'error': 'No files selected'}), 400
         
-        if len(files) > 10:
-            return jsonify({'error': 'Maximum 10 files allowed per batch'}), 400
+        max_files = app.config['JOBS_MAX_FILES']
+        if len(files) > max_files:
+            return jsonify({'error': f'Maximum {max_files} files allowed per job'}), 400
         
-        results = []
+        store, runner = get_job_runner()
+        job_id = store.create_job(
+            (file.filename, file.stream, None if allowed_file(file.filename) else 'Invalid file type')
+            for file in files
+        )
+        if runner is not None:
+            runner.notify()
         
-        for file in files:
-            try:
-                if not allowed_file(file.filename):
-                    results.append({
-                        'filename': file.filename,
+        logger.info(f"Queued job {job_id} with {len(files)} files")
+        
+        return jsonify({
+            'success': True,
+            **store.get_job(job_id),
+            'status_url': f'/api/jobs/{job_id}',
+            'results_url': f'/api/jobs/{job_id}/results',
+            'timestamp': datetime.now().isoformat()
+        }), 202
+        
+    except Exception as e:
+        logger.error(f"Error submitting job: {str(e)}")
+        return jsonify({'error': f'Internal server error: {str(e)}'}), 500
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Job status and progress"""
+    store = get_job_store()
+    job = store.get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job), 200
+
+
+@app.route('/api/jobs/<job_id>/results', methods=['GET'])
+def job_results(job_id):
+    """Paginated per-file results of a job, in upload order"""
+    store = get_job_store()
+    job = store.get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    try:
+        offset = max(0, int(request.args.get('offset', 0)))
+        limit = min(max(1, int(request.args.get('limit', app.config['JOBS_RESULTS_PAGE_SIZE']))), 1000)
+    except ValueError:
+        return jsonify({'error': 'offset and limit must be integers'}), 400
+    
+    results = store.get_results(job_id, offset, limit)
+    next_offset = offset + len(results)
+    
+    return batch_response({
+        'job_id': job_id,
+        'status': job['status'],
+        'offset': offset,
+        'limit': limit,
+        'results': results,
+        'next_offset': next_offset if next_offset < job['progress']['completed'] else None
+    })
+
+
+@app.route('/api/crops/<digest>.jpg', methods=['GET'])
+def get_crop(digest):
+    """Serve a stored face crop; URLs are content-addressed and never change"""
+    path = get_crop_store().path_for(digest)
+    if path is None or not os.path.exists(path):
+        return jsonify({'error': 'Crop not found'}), 404
+    
+    response = send_file(path, mimetype='image/jpeg', conditional=True)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+
+def batch_uploads(fields):
+    """
+    Yield (filename, stream) for each 'files' part of a batch upload, in body order
+    With BATCH_STREAMING the multipart body is parsed while it is read, so each part is yielded as soon as it
+    has arrived; other form fields are added to `fields`. The caller closes every stream it receives.
+    """
+    boundary = request.mimetype_params.get('boundary')
+    if not app.config['BATCH_STREAMING'] or request.mimetype != 'multipart/form-data' or not boundary:
+        fields.update(request.form)
+        for file in request.files.getlist('files'):
+            yield file.filename, file.stream
+        return
+    
+    for part in iter_multipart(request.stream, boundary, chunk_size=app.config['UPLOAD_CHUNK_SIZE'],
+                               spool_max_memory=app.config['UPLOAD_SPOOL_MAX_MEMORY'],
+                               max_field_size=app.config.get('MAX_FORM_MEMORY_SIZE') or 500 * 1024):
+        if not isinstance(part, UploadPart):
+            fields.add(*part)
+        elif part.name != 'files':
+            part.close()
+        else:
+            upload_parts_total.inc('memory' if part.in_memory else 'disk')
+            yield part.filename, part.stream
+
+
+@app.route('/api/batch-predict', methods=['POST'])
+@admitted('batch')
+def batch_predict():
+    """
+    Batch prediction endpoint
+    Accepts multiple images and returns predictions for each
+    """
+    pending = []
+    try:
+        max_files = app.config['BATCH_PREDICT_MAX_FILES']
+        # Uploads received but not yet cropped; reading the body waits while all decode slots are taken
+        waiting = threading.BoundedSemaphore(app.config['BATCH_PREDICT_WORKERS'])
+        fields = MultiDict()
+        
+        def release(future, stream):
+            stream.close()
+            waiting.release()
+        
+        # Decode and detect faces in parallel as files arrive, keeping results in upload order
+        try:
+            for filename, stream in batch_uploads(fields):
+                if len(pending) >= max_files:
+                    stream.close()
+                    return jsonify({'error': f'Maximum {max_files} files allowed per batch'}), 400
+                
+                if not allowed_file(filename):
+                    stream.close()
+                    pending.append({
+                        'filename': filename,
                         'error': 'Invalid file type'
                     })
                     continue
                 
-                # Process image
-                image_bytes = file.read()
-                image = Image.open(io.BytesIO(image_bytes))
-                
-                if image.mode != 'RGB':
-                    image = image.convert('RGB')
-                
-                # Detect face
-                face_image, detection_info, error = detect_and_crop_face(image)
-                
-                if error or face_image is None:
-                    results.append({
-                        'filename': file.filename,
-                        'error': error or 'Face detection failed'
+                waiting.acquire()
+                try:
+                    future = get_batch_pool().submit(prepare_batch_item, filename, stream, g.deadline)
+                except Exception as e:
+                    release(None, stream)
+                    pending.append({
+                        'filename': filename,
+                        'error': str(e)
                     })
                     continue
-                
-                # Predict
-                prediction_result = predict_deepfake(face_image)
-                
-                if prediction_result:
-                    results.append({
-                        'filename': file.filename,
-                        'prediction': prediction_result,
-                        'face_detection': detection_info
-                    })
-                else:
-                    results.append({
-                        'filename': file.filename,
-                        'error': 'Prediction failed'
-                    })
-                    
-            except Exception as e:
-                results.append({
-                    'filename': file.filename,
-                    'error': str(e)
-                })
+                future.add_done_callback(lambda done, stream=stream: release(done, stream))
+                pending.append(future)
+        except ValueError as e:
+            return jsonify({'error': f'Malformed upload: {str(e)}'}), 400
         
-        return jsonify({
+        if len(pending) == 0:
+            return jsonify({'error': 'No files provided'}), 400
+        
+        values = CombinedMultiDict([request.args, fields])
+        try:
+            crop = crop_options(app.config['BATCH_CROP_MODE'], values)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Each upload is closed as soon as its face is cropped; only the crops are kept
+        results = [item if isinstance(item, dict) else item.result() for item in pending]
+        
+        # Reuse stored predictions for near-duplicate crops, classify the rest in one forward pass
+        check_deadline(g.deadline, 'inference')
+        complete_batch_results(results, crop)
+        
+        return batch_response({
             'success': True,
-            'total_files': len(files),
+            'total_files': len(results),
             'results': results,
             'timestamp': datetime.now().isoformat()
-        }), 200
+        }, values=values)
         
+    except DeadlineExceeded as e:
+        return shed_response('batch', e)
     except Exception as e:
         logger.error(f"Error in batch prediction: {str(e)}")
         return jsonify({'error': f'Internal server error: {str(e)}'}), 500
+    finally:
+        # Work for an aborted request finishes in the background and frees its upload when done
+        for item in pending:
+            if not isinstance(item, dict):
+                item.cancel()
+
+
+def archive_upload(fields):
+    """
+    (stream, part) for an uploaded archive: the 'archive' file of a multipart form, else the raw request body
+    Multipart fields sent before the archive are added to `fields`; part is the UploadPart to close, or None
+    """
+    boundary = request.mimetype_params.get('boundary')
+    if request.mimetype != 'multipart/form-data' or not boundary:
+        return request.stream, None
+    
+    for part in iter_multipart(request.stream, boundary, chunk_size=app.config['UPLOAD_CHUNK_SIZE'],
+                               spool_max_memory=app.config['UPLOAD_SPOOL_MAX_MEMORY']):
+        if not isinstance(part, UploadPart):
+            fields.add(*part)
+        elif part.name == 'archive':
+            return part.stream, part
+        else:
+            part.close()
+    return None, None
+
+
+def archive_result_lines(reader, crop):
+    """
+    Crop and classify archive members in chunks and yield one NDJSON line per member, then a summary line
+    Members are decoded on the batch pool while the previous chunk is being classified
+    """
+    chunk_size = max(1, app.config['ARCHIVE_CHUNK_SIZE'])
+    summary = {'images': 0, 'classified': 0, 'errors': 0, 'real': 0, 'fake': 0}
+    pending = []
+    
+    def finish(chunk):
+        results = [item if isinstance(item, dict) else item.result() for item in chunk]
+        complete_batch_results(results, crop)
+        lines = []
+        for item in results:
+            summary['images'] += 1
+            if 'prediction' in item:
+                summary['classified'] += 1
+                summary['real' if item['prediction']['result'] == 'Real' else 'fake'] += 1
+            else:
+                summary['errors'] += 1
+            lines.append(json.dumps(item, separators=(',', ':')) + '\n')
+        return ''.join(lines)
+    
+    try:
+        for name, data, error in reader:
+            if error:
+                pending.append({'filename': name, 'error': error})
+            else:
+                pending.append(get_batch_pool().submit(prepare_batch_item, name, data))
+            # One chunk is classified while the next one decodes
+            if len(pending) >= 2 * chunk_size:
+                yield finish(pending[:chunk_size])
+                pending = pending[chunk_size:]
+        while pending:
+            yield finish(pending[:chunk_size])
+            pending = pending[chunk_size:]
+        summary['skipped'] = reader.skipped
+        yield json.dumps({'summary': summary}, separators=(',', ':')) + '\n'
+    except ValueError as e:
+        # The archive is corrupt or over its limits part way through; the lines already sent stand
+        yield json.dumps({'error': str(e), 'summary': summary}, separators=(',', ':')) + '\n'
+    finally:
+        for item in pending:
+            if not isinstance(item, dict):
+                item.cancel()
+
+
+@app.route('/api/archive-predict', methods=['POST'])
+@admitted('batch')
+def archive_predict():
+    """
+    Archive prediction endpoint
+    Accepts a ZIP or TAR archive and streams back one NDJSON line per image, so thousands of images need one request
+    """
+    fields = MultiDict()
+    try:
+        stream, part = archive_upload(fields)
+    except ValueError as e:
+        return jsonify({'error': f'Malformed upload: {str(e)}'}), 400
+    if stream is None:
+        return jsonify({'error': 'No archive provided'}), 400
+    
+    try:
+        crop = crop_options(app.config['BATCH_CROP_MODE'], CombinedMultiDict([request.args, fields]))
+        reader = ArchiveReader(stream, max_member_size=app.config['ARCHIVE_MAX_MEMBER_SIZE'],
+                               max_members=app.config['ARCHIVE_MAX_MEMBERS'],
+                               spool_max_memory=app.config['UPLOAD_SPOOL_MAX_MEMORY'])
+    except ValueError as e:
+        if part is not None:
+            part.close()
+        return jsonify({'error': str(e)}), 400
+    
+    def close_upload():
+        reader.close()
+        if part is not None:
+            part.close()
+    
+    # The admission slot is held until the last line has been sent (see admitted)
+    response = Response(stream_with_context(archive_result_lines(reader, crop)), mimetype='application/x-ndjson')
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.call_on_close(close_upload)
+    return response
 
 
 if __name__ == '__main__':
     # Load model and face detector on startup
     logger.info("🚀 Starting Deepfake Detection API...")
-    load_model()
-    load_face_detector()
+    create_app(preload=False)
+    init_models()
+    
+    # Resume unfinished jobs from the durable queue
+    get_job_runner()
     
     # Run Flask app
     app.run(
@@ -0,0 +1,261 @@
+"""
+ASGI Entry Point for Async Serving
+Reads uploads on the asyncio event loop and runs the unchanged Flask endpoints on a bounded thread pool
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import app as pipeline
+
+logger = logging.getLogger(__name__)
+
+# Response bodies of at most this size are drained in one executor hop when their length is known
+DRAIN_LIMIT = 4 * 1024 * 1024
+
+
+class AsyncServer:
+    """
+    ASGI application wrapping the Flask app
+
+    Every request body is read by the event loop into a spooled temporary file
+    (memory up to ASGI_SPOOL_MAX_MEMORY, then disk) before any thread is
+    involved, so slow uploads and idle keep-alive connections cost a coroutine,
+    not a worker thread. Clients that disconnect mid-upload are dropped without
+    running the pipeline. The buffered request is then dispatched to the Flask
+    app on a fixed-size executor, which bounds CPU use no matter how many
+    connections are open. Endpoints, status codes and response bodies are the
+    Flask ones, unchanged.
+    """
+
+    def __init__(self, flask_app, threads=None, spool_max_memory=None):
+        self.flask_app = flask_app
+        config = flask_app.config
+        self.threads = threads or config['ASGI_THREADS'] or max(4, os.cpu_count() or 1)
+        self.spool_max_memory = spool_max_memory or config['ASGI_SPOOL_MAX_MEMORY']
+        self.executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='asgi-pipeline')
+        self.open_connections = 0
+        self.reading_bodies = 0
+        self.queued = 0
+        self.running = 0
+        # queued / running change on pipeline threads as well as on the event loop
+        self._counter_lock = threading.Lock()
+
+        registry = pipeline.metrics_registry
+        self.queue_wait_seconds = registry.histogram(
+            'deepfake_asgi_queue_wait_seconds', 'Time a buffered request waited for a pipeline thread')
+        self.body_read_seconds = registry.histogram(
+            'deepfake_asgi_body_read_seconds', 'Time spent receiving request bodies on the event loop')
+        self.disconnects_total = registry.counter(
+            'deepfake_asgi_client_disconnects_total', 'Requests abandoned by the client before dispatch')
+        registry.gauge('deepfake_asgi_open_connections', 'HTTP requests open on the event loop',
+                       callback=lambda: self.open_connections)
+        registry.gauge('deepfake_asgi_reading_bodies', 'Requests whose body is still being uploaded',
+                       callback=lambda: self.reading_bodies)
+        registry.gauge('deepfake_asgi_queued', 'Buffered requests waiting for a pipeline thread',
+                       callback=lambda: self.queued)
+        registry.gauge('deepfake_asgi_running', 'Requests running on pipeline threads',
+                       callback=lambda: self.running)
+        registry.gauge('deepfake_asgi_threads', 'Size of the pipeline thread pool',
+                       callback=lambda: self.threads)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        """Load the model and face detector before accepting traffic; stop the pool on shutdown"""
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await asyncio.get_running_loop().run_in_executor(self.executor, pipeline.init_models)
+                except Exception as e:
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                logger.info(f"🚀 Async server ready with {self.threads} pipeline threads (pid {os.getpid()})")
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, scope, receive, limit):
+        """
+        Spool the request body; returns (file, size) or None if the client went away
+        Reading stops once the body exceeds the endpoint's limit; Flask then rejects it as it does under gunicorn
+        """
+        body = tempfile.SpooledTemporaryFile(max_size=self.spool_max_memory)
+        size = 0
+        start = time.perf_counter()
+        self.reading_bodies += 1
+        try:
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    body.close()
+                    return None
+                chunk = message.get('body', b'')
+                if chunk:
+                    size += len(chunk)
+                    if limit is not None and size > limit:
+                        break
+                    body.write(chunk)
+                if not message.get('more_body', False):
+                    break
+        finally:
+            self.reading_bodies -= 1
+            self.body_read_seconds.observe(time.perf_counter() - start)
+        body.seek(0)
+        return body, size
+
+    def environ(self, scope, body, content_length, received_at):
+        """PEP 3333 environ for a buffered request; received_at lets request deadlines include the upload"""
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': str(server[0]),
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': client[0],
+            'CONTENT_LENGTH': str(content_length),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+            'deepfake.received_at': received_at
+        }
+        for name, value in scope.get('headers', []):
+            name = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if name == 'CONTENT_TYPE':
+                environ['CONTENT_TYPE'] = value
+            elif name != 'CONTENT_LENGTH':
+                key = f"HTTP_{name}"
+                environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+    def start_wsgi(self, environ, queued_at):
+        """
+        Run the Flask request on a pipeline thread
+        Returns (status, headers, first chunks, (iterator, iterable) still to drain or None when the body is complete)
+        """
+        self.queue_wait_seconds.observe(time.perf_counter() - queued_at)
+        with self._counter_lock:
+            self.queued -= 1
+            self.running += 1
+        try:
+            started = {}
+
+            def start_response(status, headers, exc_info=None):
+                started['status'] = int(status.split(' ', 1)[0])
+                started['headers'] = headers
+
+            iterable = self.flask_app.wsgi_app(environ, start_response)
+            iterator = iter(iterable)
+            headers = dict((name.lower(), value) for name, value in started['headers'])
+            length = headers.get('content-length')
+            if length is not None and int(length) <= DRAIN_LIMIT:
+                # Ordinary JSON / image responses finish in this hop
+                chunks = list(iterator)
+                if hasattr(iterable, 'close'):
+                    iterable.close()
+                return started['status'], started['headers'], chunks, None
+            # Streamed bodies are produced chunk by chunk so the first bytes go out early
+            first = next(iterator, None)
+            return started['status'], started['headers'], [first] if first is not None else [], (iterator, iterable)
+        finally:
+            with self._counter_lock:
+                self.running -= 1
+
+    @staticmethod
+    def next_chunk(iterator):
+        return next(iterator, None)
+
+    async def http(self, scope, receive, send):
+        loop = asyncio.get_running_loop()
+        received_at = time.perf_counter()
+        self.open_connections += 1
+        try:
+            limit = pipeline.max_content_length_for(scope['path'], self.flask_app.config)
+            declared = None
+            for name, value in scope.get('headers', []):
+                if name == b'content-length':
+                    try:
+                        declared = int(value)
+                    except ValueError:
+                        declared = None
+            if declared is not None and limit is not None and declared > limit:
+                # Oversized upload: let Flask reject it without reading a byte
+                body, size = tempfile.SpooledTemporaryFile(), declared
+            else:
+                received = await self.read_body(scope, receive, limit)
+                if received is None:
+                    self.disconnects_total.inc()
+                    return
+                body, size = received
+
+            with self._counter_lock:
+                self.queued += 1
+            try:
+                status, headers, chunks, remaining = await loop.run_in_executor(
+                    self.executor, self.start_wsgi, self.environ(scope, body, size, received_at), time.perf_counter()
+                )
+            except BaseException:
+                body.close()
+                raise
+
+            try:
+                await send({
+                    'type': 'http.response.start',
+                    'status': status,
+                    'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+                })
+                for chunk in chunks:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                if remaining is not None:
+                    iterator = remaining[0]
+                    while True:
+                        chunk = await loop.run_in_executor(self.executor, self.next_chunk, iterator)
+                        if chunk is None:
+                            break
+                        await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+            finally:
+                if remaining is not None and hasattr(remaining[1], 'close'):
+                    await loop.run_in_executor(self.executor, remaining[1].close)
+                body.close()
+        finally:
+            self.open_connections -= 1
+
+
+# create_app() imports TensorFlow / mtcnn and loads fork-safe models; the lifespan
+# startup finishes loading (Keras model, MTCNN) before the first request
+app = AsyncServer(pipeline.create_app())
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run(
+        app,
+        host=os.environ.get('HOST', '0.0.0.0'),
+        port=int(os.environ.get('PORT', 5000)),
+        # HTTP keep-alive connections are cheap on the event loop
+        timeout_keep_alive=int(os.environ.get('ASGI_KEEP_ALIVE', 30))
+    )
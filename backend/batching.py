@@ -0,0 +1,186 @@
+"""
+Dynamic Micro-Batching for Deepfake Inference
+Collects face tensors from concurrent requests and runs them through the model as one batch
+"""
+
+import threading
+import queue
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    Server-side batching engine in front of the model
+
+    Requests call submit() with a single preprocessed face tensor and block
+    until their score is ready. A background thread drains the queue, waiting
+    at most max_wait_ms for more work, and runs up to max_batch_size tensors
+    in one forward pass. Samples submitted with an expires_at (time.perf_counter())
+    that has passed by the time their batch forms are dropped with TimeoutError
+    instead of being run. With concurrency > 1, that many threads form and run
+    batches side by side (for a predict_fn backed by several worker processes).
+    """
+
+    def __init__(self, predict_fn, max_batch_size=16, max_wait_ms=5.0, name='micro-batcher', concurrency=1):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.name = name
+        self.concurrency = max(1, int(concurrency))
+
+        self._queue = queue.Queue()
+        # One batch arena per dispatch thread
+        self._local = threading.local()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._running = False
+
+        # Batch-fill statistics
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._errors = 0
+        self._expired = 0
+        self._max_seen = 0
+        self._size_histogram = {}
+        self._total_wait = 0.0
+
+    def start(self):
+        """Start the batching threads (idempotent)"""
+        with self._lock:
+            if self._running:
+                return self
+            self._running = True
+            self._threads = [
+                threading.Thread(target=self._run, name=self.name if self.concurrency == 1 else f"{self.name}-{i}",
+                                 daemon=True)
+                for i in range(self.concurrency)
+            ]
+            for thread in self._threads:
+                thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        """Stop the batching threads after the queue drains"""
+        with self._lock:
+            if not self._running:
+                return
+            self._running = False
+            # One sentinel per thread; each thread exits on the first it takes
+            for _ in self._threads:
+                self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def submit_async(self, tensor, expires_at=None):
+        """Queue one sample of shape (H, W, C) and return a Future for its score"""
+        if not self._running:
+            self.start()
+        future = Future()
+        self._queue.put((np.asarray(tensor), future, time.perf_counter(), expires_at))
+        return future
+
+    def submit(self, tensor, timeout=None, expires_at=None):
+        """Queue one sample and block until its raw score is available"""
+        return self.submit_async(tensor, expires_at).result(timeout)
+
+    def _collect(self):
+        """Block for the first item, then gather more until the batch is full or the wait expires"""
+        first = self._queue.get()
+        if first is None:
+            return None
+
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Re-queue the sentinel so the loop exits after this batch
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                break
+
+            # Nobody is waiting for samples whose deadline has passed, so they never reach the model
+            now = time.perf_counter()
+            live = [item for item in batch if item[3] is None or item[3] > now]
+            if len(live) < len(batch):
+                for item in batch:
+                    if item[3] is not None and item[3] <= now:
+                        item[1].set_exception(TimeoutError('Deadline passed while queued for inference'))
+                with self._stats_lock:
+                    self._expired += len(batch) - len(live)
+                batch = live
+                if not batch:
+                    continue
+
+            tensors = self._assemble([item[0] for item in batch])
+            futures = [item[1] for item in batch]
+            now = time.perf_counter()
+
+            try:
+                scores = np.asarray(self.predict_fn(tensors)).reshape(-1)
+                if len(scores) != len(futures):
+                    # zip() would silently leave the extra waiters hanging
+                    raise ValueError(f"Model returned {len(scores)} scores for a batch of {len(futures)}")
+                for future, score in zip(futures, scores):
+                    future.set_result(float(score))
+                failed = False
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                failed = True
+
+            self._record(len(batch), sum(now - item[2] for item in batch), failed)
+
+    def _assemble(self, samples):
+        """Copy samples into the preallocated batch arena (reallocated only if the sample shape changes)"""
+        first = samples[0]
+        arena = getattr(self._local, 'arena', None)
+        if arena is None or arena.shape[1:] != first.shape or arena.dtype != first.dtype:
+            arena = self._local.arena = np.empty((self.max_batch_size,) + first.shape, dtype=first.dtype)
+        return np.stack(samples, out=arena[:len(samples)])
+
+    def _record(self, size, waited, failed):
+        with self._stats_lock:
+            self._batches += 1
+            self._items += size
+            self._total_wait += waited
+            self._max_seen = max(self._max_seen, size)
+            self._size_histogram[size] = self._size_histogram.get(size, 0) + 1
+            if failed:
+                self._errors += 1
+
+    def stats(self):
+        """Return batch-fill statistics"""
+        with self._stats_lock:
+            avg_size = self._items / self._batches if self._batches else 0.0
+            return {
+                'running': self._running,
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0,
+                'concurrency': self.concurrency,
+                'queue_depth': self._queue.qsize(),
+                'batches': self._batches,
+                'items': self._items,
+                'failed_batches': self._errors,
+                'expired_items': self._expired,
+                'avg_batch_size': avg_size,
+                'avg_fill_ratio': avg_size / self.max_batch_size,
+                'max_batch_seen': self._max_seen,
+                'avg_queue_wait_ms': (self._total_wait / self._items * 1000.0) if self._items else 0.0,
+                'batch_size_histogram': {str(k): v for k, v in sorted(self._size_histogram.items())}
+            }
@@ -0,0 +1,238 @@
+"""
+Content-Addressed Prediction Cache
+In-memory LRU/TTL tier, optional SQLite tier and single-flight deduplication of identical uploads
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+
+def content_key(data, model_version):
+    """Hash uploaded bytes (or a seekable stream, read in chunks and rewound) together with the model version"""
+    if hasattr(data, 'read'):
+        digest = hashlib.sha256()
+        data.seek(0)
+        for chunk in iter(lambda: data.read(1024 * 1024), b''):
+            digest.update(chunk)
+        data.seek(0)
+        return f"{model_version}:{digest.hexdigest()}"
+    digest = hashlib.sha256(data).hexdigest()
+    return f"{model_version}:{digest}"
+
+
+class SQLiteTier:
+    """Persistent cache tier backed by a single SQLite file"""
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS predictions ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)'
+        )
+        self._conn.commit()
+
+    def get(self, key, ttl):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value, created FROM predictions WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None, None
+            value, created = row
+            if ttl and time.time() - created > ttl:
+                self._conn.execute('DELETE FROM predictions WHERE key = ?', (key,))
+                self._conn.commit()
+                return None, None
+            return json.loads(value), created
+
+    def set(self, key, value, created):
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO predictions (key, value, created) VALUES (?, ?, ?)',
+                (key, json.dumps(value), created)
+            )
+            self._conn.commit()
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM predictions').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class PredictionCache:
+    """
+    Two-tier result cache with single-flight coalescing
+
+    get_or_compute() returns a cached value when present; otherwise the first
+    caller for a key runs compute() while concurrent callers with the same key
+    wait on its result instead of repeating the work.
+    """
+
+    def __init__(self, max_entries=1024, ttl_seconds=3600, db_path=None):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = float(ttl_seconds) if ttl_seconds else 0.0
+        self.disk = SQLiteTier(db_path) if db_path else None
+
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+        self._counters = {
+            'hits': 0,
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'stores': 0
+        }
+
+    def _count(self, name, amount=1):
+        self._counters[name] += amount
+
+    def _lookup_memory(self, key):
+        """Return a live in-memory value (caller holds the lock)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, created = entry
+        if self.ttl and time.time() - created > self.ttl:
+            del self._entries[key]
+            self._count('expirations')
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _store_memory(self, key, value, created):
+        """Insert into the LRU tier, evicting the oldest entries (caller holds the lock)"""
+        self._entries[key] = (value, created)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._count('evictions')
+
+    def get(self, key):
+        """Return the cached value for key or None"""
+        with self._lock:
+            value = self._lookup_memory(key)
+            if value is not None:
+                self._count('hits')
+                self._count('memory_hits')
+                return value
+
+        if self.disk is not None:
+            value, created = self.disk.get(key, self.ttl)
+            if value is not None:
+                with self._lock:
+                    self._store_memory(key, value, created)
+                    self._count('hits')
+                    self._count('disk_hits')
+                return value
+        return None
+
+    def set(self, key, value):
+        """Store a JSON-serialisable value under key in every tier"""
+        created = time.time()
+        with self._lock:
+            self._store_memory(key, value, created)
+            self._count('stores')
+        if self.disk is not None:
+            self.disk.set(key, value, created)
+
+    def get_or_compute(self, key, compute, should_store=None, timeout=None, retry_on=()):
+        """
+        Return (value, source) where source is 'memory', 'disk', 'coalesced' or 'computed'
+        should_store(value) decides whether a freshly computed value is cached. A request that
+        coalesces onto an in-flight computation waits at most `timeout` seconds (then TimeoutError);
+        if the leader fails with one of `retry_on` (e.g. its own deadline passed) it computes instead
+        """
+        while True:
+            with self._lock:
+                value = self._lookup_memory(key)
+                if value is not None:
+                    self._count('hits')
+                    self._count('memory_hits')
+                    return value, 'memory'
+
+                future = self._inflight.get(key)
+                leader = future is None
+                if leader:
+                    future = Future()
+                    self._inflight[key] = future
+                else:
+                    self._count('coalesced')
+
+            if leader:
+                break
+            try:
+                return future.result(timeout), 'coalesced'
+            except FutureTimeoutError:
+                raise TimeoutError('Timed out waiting for an identical in-flight request') from None
+            except retry_on:
+                # The leader's failure was its own; look again and lead or follow a new leader
+                continue
+
+        try:
+            value, source = self._load_or_compute(key, compute, should_store)
+        except Exception as e:
+            self._release(key, future)
+            future.set_exception(e)
+            raise
+        self._release(key, future)
+        future.set_result(value)
+        return value, source
+
+    def _load_or_compute(self, key, compute, should_store):
+        if self.disk is not None:
+            value, created = self.disk.get(key, self.ttl)
+            if value is not None:
+                with self._lock:
+                    self._store_memory(key, value, created)
+                    self._count('hits')
+                    self._count('disk_hits')
+                return value, 'disk'
+
+        with self._lock:
+            self._count('misses')
+        value = compute()
+        if should_store is None or should_store(value):
+            self.set(key, value)
+        return value, 'computed'
+
+    def _release(self, key, future):
+        """Drop the in-flight marker before resolving it, so retrying followers find no stale leader"""
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def stats(self):
+        """Return hit/miss/eviction counters and tier sizes"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['memory_entries'] = len(self._entries)
+            stats['max_entries'] = self.max_entries
+            stats['inflight'] = len(self._inflight)
+        # Coalesced requests were served without running the pipeline, so they count as hits
+        served = stats['hits'] + stats['coalesced']
+        lookups = served + stats['misses']
+        stats['hit_rate'] = served / lookups if lookups else 0.0
+        stats['ttl_seconds'] = self.ttl
+        stats['disk_enabled'] = self.disk is not None
+        stats['disk_entries'] = self.disk.count() if self.disk is not None else 0
+        return stats
@@ -0,0 +1,48 @@
+"""
+Gunicorn Configuration for Multi-Worker Serving
+The app is preloaded in the master so workers fork with imports (and a TFLite/ONNX model) already in memory
+"""
+
+import os
+import subprocess
+
+wsgi_app = 'wsgi:app'
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))  # concurrent requests feed the micro-batcher
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))  # covers per-worker model loading
+preload_app = True
+
+# create_app() sizes TensorFlow / TFLite / ONNX thread pools from the worker count
+os.environ['WEB_CONCURRENCY'] = str(workers)
+# Workers only queue jobs; one dispatcher process (started in when_ready) runs them
+os.environ['JOBS_DISPATCHER'] = 'external'
+
+
+def when_ready(server):
+    """Start the single job dispatcher, with its own model-loading process pool, next to the workers"""
+    import app as backend
+    from jobs import start_dispatcher_process
+
+    server.job_dispatcher = start_dispatcher_process(backend.job_store_options(), backend.job_runner_options())
+    server.log.info(f"Job dispatcher started (pid {server.job_dispatcher.pid})")
+
+
+def on_exit(server):
+    """Stop the job dispatcher; claimed items are re-queued when the next one starts"""
+    process = getattr(server, 'job_dispatcher', None)
+    if process is not None and process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def post_fork(server, worker):
+    """Finish loading in the worker: the Keras model and MTCNN need a TF runtime started after fork"""
+    import app as backend
+
+    backend.init_models()
+    server.log.info(f"Worker {worker.pid} ready, startup timings: {backend.startup_timings}")
@@ -0,0 +1,442 @@
+"""
+Asynchronous Batch Job Subsystem
+Durable SQLite job queue with a background process pool, so large batches never hold an HTTP worker
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _boot_id():
+    """Identifier of the current boot (Linux), so owners from before a reboot count as gone"""
+    try:
+        with open('/proc/sys/kernel/random/boot_id') as f:
+            return f.read().strip()
+    except OSError:
+        return ''
+
+
+def process_owner():
+    """Owner tag recorded on claimed items: '<boot id>:<pid>'"""
+    return f"{_boot_id()}:{os.getpid()}"
+
+
+def owner_alive(owner):
+    """False when the process that claimed an item no longer exists (a pid reused since is treated as alive)"""
+    boot_id, _, pid = (owner or '').rpartition(':')
+    if not pid.isdigit():
+        return True
+    if boot_id != _boot_id():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class JobStore:
+    """SQLite-backed store for jobs and their per-file items"""
+
+    def __init__(self, db_path, files_dir):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        os.makedirs(files_dir, exist_ok=True)
+        self.db_path = db_path
+        self.files_dir = files_dir
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                created REAL NOT NULL,
+                updated REAL NOT NULL,
+                total INTEGER NOT NULL,
+                completed INTEGER NOT NULL DEFAULT 0,
+                failed INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS job_items (
+                job_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                filename TEXT NOT NULL,
+                path TEXT,
+                status TEXT NOT NULL,
+                claimed_at REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                PRIMARY KEY (job_id, idx)
+            );
+            CREATE INDEX IF NOT EXISTS job_items_status ON job_items (status, job_id, idx);
+        ''')
+        # Queues created before claims recorded their owner
+        columns = [row['name'] for row in self._conn.execute('PRAGMA table_info(job_items)')]
+        if 'owner' not in columns:
+            self._conn.execute('ALTER TABLE job_items ADD COLUMN owner TEXT')
+        self._conn.commit()
+
+    def create_job(self, files):
+        """
+        Persist uploaded files and queue one item per file
+        files is an iterable of (filename, file-like or None, error message or None)
+        """
+        job_id = uuid.uuid4().hex
+        job_dir = os.path.join(self.files_dir, job_id)
+        os.makedirs(job_dir, exist_ok=True)
+        now = time.time()
+
+        rows = []
+        for idx, (filename, stream, error) in enumerate(files):
+            if error:
+                rows.append((job_id, idx, filename, None, 'done', None,
+                             json.dumps({'filename': filename, 'error': error})))
+                continue
+            path = os.path.join(job_dir, f"{idx:06d}")
+            with open(path, 'wb') as out:
+                while True:
+                    chunk = stream.read(1024 * 1024)
+                    if not chunk:
+                        break
+                    out.write(chunk)
+            rows.append((job_id, idx, filename, path, 'pending', None, None))
+
+        failed = sum(1 for row in rows if row[4] == 'done')
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO jobs (id, created, updated, total, completed, failed) VALUES (?, ?, ?, ?, ?, ?)',
+                (job_id, now, now, len(rows), failed, failed)
+            )
+            self._conn.executemany(
+                'INSERT INTO job_items (job_id, idx, filename, path, status, claimed_at, result) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                rows
+            )
+            self._conn.commit()
+        return job_id
+
+    def claim(self, limit, lease_seconds, max_attempts=3):
+        """
+        Atomically claim pending items (and items whose lease expired), oldest job first
+        Items that already failed max_attempts times are finished with an error instead
+        """
+        now = time.time()
+        owner = process_owner()
+        with self._lock:
+            cursor = self._conn.execute('BEGIN IMMEDIATE')
+            rows = cursor.execute(
+                'SELECT job_id, idx, filename, path, attempts FROM job_items '
+                'WHERE status = ? OR (status = ? AND claimed_at < ?) '
+                'ORDER BY rowid LIMIT ?',
+                ('pending', 'running', now - lease_seconds, limit)
+            ).fetchall()
+            claimed = [row for row in rows if row['attempts'] < max_attempts]
+            exhausted = [row for row in rows if row['attempts'] >= max_attempts]
+            cursor.executemany(
+                'UPDATE job_items SET status = ?, claimed_at = ?, owner = ?, attempts = attempts + 1 '
+                'WHERE job_id = ? AND idx = ?',
+                [('running', now, owner, row['job_id'], row['idx']) for row in claimed]
+            )
+            self._conn.commit()
+
+        if exhausted:
+            self.complete([
+                (row['job_id'], row['idx'],
+                 {'filename': row['filename'], 'error': f'Processing failed after {max_attempts} attempts'})
+                for row in exhausted
+            ])
+        return [(row['job_id'], row['idx'], row['filename'], row['path']) for row in claimed]
+
+    def requeue_orphans(self):
+        """
+        Return running items whose owning process is gone to the queue without waiting for their lease
+        Returns the number of items re-queued
+        """
+        with self._lock:
+            cursor = self._conn.execute('BEGIN IMMEDIATE')
+            owners = [row['owner'] for row in cursor.execute(
+                'SELECT DISTINCT owner FROM job_items WHERE status = ? AND owner IS NOT NULL', ('running',)
+            )]
+            requeued = 0
+            for owner in owners:
+                if not owner_alive(owner):
+                    requeued += cursor.execute(
+                        'UPDATE job_items SET status = ?, claimed_at = NULL, owner = NULL WHERE status = ? AND owner = ?',
+                        ('pending', 'running', owner)
+                    ).rowcount
+            self._conn.commit()
+        return requeued
+
+    def release(self, items):
+        """Return claimed items to the queue (e.g. after a worker crash)"""
+        with self._lock:
+            self._conn.executemany(
+                'UPDATE job_items SET status = ?, claimed_at = NULL, owner = NULL WHERE job_id = ? AND idx = ?',
+                [('pending', job_id, idx) for job_id, idx, _, _ in items]
+            )
+            self._conn.commit()
+
+    def complete(self, results):
+        """Store results for (job_id, idx, result) tuples and update job progress"""
+        now = time.time()
+        with self._lock:
+            for job_id, idx, result in results:
+                # The spooled upload is no longer needed once its result is stored
+                row = self._conn.execute(
+                    'SELECT path FROM job_items WHERE job_id = ? AND idx = ?', (job_id, idx)
+                ).fetchone()
+                if row is not None and row['path'] and os.path.exists(row['path']):
+                    os.remove(row['path'])
+
+                updated = self._conn.execute(
+                    'UPDATE job_items SET status = ?, result = ?, path = NULL '
+                    'WHERE job_id = ? AND idx = ? AND status != ?',
+                    ('done', json.dumps(result), job_id, idx, 'done')
+                ).rowcount
+                if updated:
+                    self._conn.execute(
+                        'UPDATE jobs SET completed = completed + 1, failed = failed + ?, updated = ? WHERE id = ?',
+                        (1 if 'error' in result else 0, now, job_id)
+                    )
+            self._conn.commit()
+
+    def get_job(self, job_id):
+        """Return job status and progress, or None if unknown"""
+        with self._lock:
+            job = self._conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            if job is None:
+                return None
+            running = self._conn.execute(
+                'SELECT COUNT(*) FROM job_items WHERE job_id = ? AND status = ?', (job_id, 'running')
+            ).fetchone()[0]
+
+        total, completed = job['total'], job['completed']
+        if completed >= total:
+            status = 'completed'
+        elif completed or running:
+            status = 'running'
+        else:
+            status = 'queued'
+
+        return {
+            'job_id': job_id,
+            'status': status,
+            'progress': {
+                'total': total,
+                'completed': completed,
+                'failed': job['failed'],
+                'percent': round(completed / total * 100, 1) if total else 100.0
+            },
+            'created': job['created'],
+            'updated': job['updated']
+        }
+
+    def get_results(self, job_id, offset=0, limit=100):
+        """Finished item results in upload order, paginated"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT result FROM job_items WHERE job_id = ? AND status = ? ORDER BY idx LIMIT ? OFFSET ?',
+                (job_id, 'done', limit, offset)
+            ).fetchall()
+        return [json.loads(row['result']) for row in rows]
+
+    def pending_count(self):
+        with self._lock:
+            return self._conn.execute(
+                'SELECT COUNT(*) FROM job_items WHERE status != ?', ('done',)
+            ).fetchone()[0]
+
+
+# --- Worker process side -------------------------------------------------------
+
+_pipeline = None
+
+
+def _init_worker():
+    """Load the model and face detector once per worker process"""
+    global _pipeline
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    import app as pipeline
+
+    # Each worker scores whole chunks itself; the request-level batcher is not needed
+    pipeline.app.config['MICRO_BATCHING'] = False
+    # A job worker is already one of JOBS_WORKERS processes; it holds its own model rather than a worker pool
+    pipeline.app.config['INFERENCE_WORKERS'] = 0
+    pipeline.init_models()
+    _pipeline = pipeline
+
+
+def _process_chunk(items):
+    """Run decode, detection and one batched forward pass over a chunk of job items"""
+    def prepare(item):
+        _, _, filename, path = item
+        try:
+            with open(path, 'rb') as f:
+                return _pipeline.prepare_batch_item(filename, f)
+        except Exception as e:
+            return {'filename': filename, 'error': str(e)}
+
+    prepared = list(_pipeline.get_batch_pool().map(prepare, items))
+    _pipeline.complete_batch_results(prepared)
+    return [(job_id, idx, result) for (job_id, idx, _, _), result in zip(items, prepared)]
+
+
+# --- Dispatcher ----------------------------------------------------------------
+
+class JobRunner:
+    """
+    Dispatcher thread that feeds claimed items to a process pool
+
+    Item state lives in SQLite, so after a restart the job resumes where it
+    stopped: items claimed by a process that no longer exists are re-queued at
+    start, and items of a live but stuck owner once their lease expires.
+    """
+
+    def __init__(self, store, workers=2, chunk_size=16, lease_seconds=300, max_attempts=3, poll_interval=1.0):
+        self.store = store
+        self.workers = max(1, int(workers))
+        self.chunk_size = max(1, int(chunk_size))
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+
+        self._pool = None
+        self._thread = None
+        self._running = False
+        self._slots = threading.Semaphore(self.workers)
+        self._wakeup = threading.Event()
+
+    def start(self):
+        if self._running:
+            return self
+        self._running = True
+        orphans = self.store.requeue_orphans()
+        if orphans:
+            logger.info(f"🔄 Re-queued {orphans} job items claimed by a process that exited")
+        self._pool = self._new_pool()
+        self._thread = threading.Thread(target=self._run, name='job-dispatcher', daemon=True)
+        self._thread.start()
+        logger.info(f"✅ Job runner started ({self.workers} worker processes, chunk size {self.chunk_size})")
+        return self
+
+    def _new_pool(self):
+        # spawn keeps the parent's TensorFlow state out of the children
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker
+        )
+
+    def stop(self):
+        self._running = False
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def notify(self):
+        """Wake the dispatcher after new work was queued"""
+        self._wakeup.set()
+
+    def _run(self):
+        while self._running:
+            self._slots.acquire()
+            if not self._running:
+                break
+            items = self.store.claim(self.chunk_size, self.lease_seconds, self.max_attempts)
+            if not items:
+                self._slots.release()
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            try:
+                future = self._pool.submit(_process_chunk, items)
+            except BrokenProcessPool:
+                self._pool = self._new_pool()
+                future = self._pool.submit(_process_chunk, items)
+            except RuntimeError as e:
+                # Interpreter shutdown: leave the items for the next start
+                logger.error(f"❌ Job dispatcher stopping: {str(e)}")
+                self.store.release(items)
+                self._slots.release()
+                break
+            future.add_done_callback(lambda f, claimed=items: self._finish(f, claimed))
+
+    def _finish(self, future, items):
+        try:
+            self.store.complete(future.result())
+        except Exception as e:
+            # The items go back to the queue and count one failed attempt
+            logger.error(f"❌ Job chunk failed: {str(e)}")
+            self.store.release(items)
+            if isinstance(e, BrokenProcessPool) and self._running:
+                self._pool = self._new_pool()
+        finally:
+            self._slots.release()
+            self._wakeup.set()
+
+
+# --- Dedicated dispatcher process --------------------------------------------
+
+def start_dispatcher_process(store_options, runner_options):
+    """
+    Start the job dispatcher (and its model-loading pool) in a process of its own
+    Used by gunicorn.conf.py so all HTTP workers share one dispatcher instead of starting one each
+    """
+    command = [sys.executable, os.path.join(BACKEND_DIR, 'jobs.py'),
+               '--db-path', store_options['db_path'], '--files-dir', store_options['files_dir']]
+    for name, value in runner_options.items():
+        command += [f"--{name.replace('_', '-')}", str(value)]
+    # A plain subprocess: forked HTTP workers must not inherit it as a multiprocessing child
+    return subprocess.Popen(command)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run the job dispatcher until SIGTERM')
+    parser.add_argument('--db-path', required=True)
+    parser.add_argument('--files-dir', required=True)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--chunk-size', type=int, default=16)
+    parser.add_argument('--lease-seconds', type=float, default=300)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+    runner = JobRunner(JobStore(args.db_path, args.files_dir), workers=args.workers, chunk_size=args.chunk_size,
+                       lease_seconds=args.lease_seconds).start()
+    pending = runner.store.pending_count()
+    if pending:
+        logger.info(f"🔄 Resuming {pending} unfinished job items")
+    try:
+        stopped.wait()
+    except KeyboardInterrupt:
+        pass
+    runner.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Streaming Multipart Parser
+Reads a multipart/form-data body in fixed-size chunks and hands over each part as soon as it is complete, spooling file parts to disk past a memory threshold
+"""
+
+import tempfile
+
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData
+
+
+class UploadPart:
+    """One file part of a multipart body, readable from .stream; close() frees its memory or temporary file"""
+
+    def __init__(self, name, filename, content_type, spool_max_memory):
+        self.name = name
+        self.filename = filename
+        self.content_type = content_type
+        self.size = 0
+        self.stream = tempfile.SpooledTemporaryFile(max_size=spool_max_memory)
+
+    @property
+    def in_memory(self):
+        """True while the part is held in memory (it has not rolled over to a temporary file)"""
+        return not getattr(self.stream, '_rolled', True)
+
+    def write(self, data):
+        self.stream.write(data)
+        self.size += len(data)
+
+    def close(self):
+        self.stream.close()
+
+
+def iter_multipart(stream, boundary, chunk_size=64 * 1024, spool_max_memory=1024 * 1024, max_field_size=None):
+    """
+    Yield the parts of a multipart body in order while it is being read
+
+    Form fields are yielded as (name, value) tuples and file parts as UploadPart
+    objects positioned at their first byte. At most one chunk of the body and
+    spool_max_memory bytes of the current part are held in memory; the caller
+    owns every UploadPart it receives and must close it. Raises ValueError for
+    a malformed or truncated body.
+    """
+    if isinstance(boundary, str):
+        boundary = boundary.encode('latin-1')
+    decoder = MultipartDecoder(boundary, max_form_memory_size=max_field_size)
+    part, field, field_data = None, None, []
+
+    try:
+        while True:
+            chunk = stream.read(chunk_size)
+            # An empty read is the end of the body
+            decoder.receive_data(chunk or None)
+            event = decoder.next_event()
+            while not isinstance(event, (NeedData, Epilogue)):
+                if isinstance(event, File):
+                    part = UploadPart(event.name, event.filename, event.headers.get('Content-Type'), spool_max_memory)
+                elif isinstance(event, Field):
+                    field, field_data = event, []
+                elif isinstance(event, Data):
+                    if part is not None:
+                        part.write(event.data)
+                        if not event.more_data:
+                            part.stream.seek(0)
+                            completed, part = part, None
+                            yield completed
+                    else:
+                        field_data.append(event.data)
+                        if not event.more_data:
+                            yield field.name, b''.join(field_data).decode('utf-8', 'replace')
+                            field, field_data = None, []
+                event = decoder.next_event()
+
+            if isinstance(event, Epilogue):
+                return
+            if not chunk:
+                raise ValueError('Incomplete multipart body')
+    finally:
+        # A part still being received when the body ends or the caller stops reading
+        if part is not None:
+            part.close()
@@ -0,0 +1,102 @@
+"""
+Perceptual-Hash Near-Duplicate Index
+64-bit DCT hashes of face crops searched with vectorized Hamming distance
+"""
+
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+# Number of set bits for every byte value, used to popcount XOR-ed hashes
+POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def perceptual_hash(image, min_bits=8):
+    """
+    Compute a 64-bit DCT perceptual hash of a PIL image or RGB array
+    Returns None for flat, low-texture crops whose hash would collide with unrelated images
+    """
+    img_array = np.asarray(image)
+    if img_array.ndim == 3:
+        img_array = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
+
+    small = cv2.resize(img_array, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low_freq = cv2.dct(small)[:8, :8].flatten()
+
+    # Compare against the median of the AC coefficients so the DC term does not dominate
+    bits = low_freq > np.median(low_freq[1:])
+    if not min_bits <= int(bits.sum()) <= 64 - min_bits:
+        return None
+    return np.uint64(int(np.packbits(bits).view('>u8')[0]))
+
+
+def hamming_distances(hashes, query):
+    """Vectorized Hamming distance between a uint64 array and one hash"""
+    xor = np.bitwise_xor(hashes, np.uint64(query))
+    return POPCOUNT_TABLE[xor.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+class PerceptualHashIndex:
+    """
+    Compact array-backed store of face-crop hashes and their predictions
+
+    Hashes live in one preallocated uint64 array; once max_entries is reached
+    the oldest slot is overwritten, so memory stays bounded.
+    """
+
+    def __init__(self, max_distance=6, max_entries=100000):
+        self.max_distance = int(max_distance)
+        self.max_entries = max(1, int(max_entries))
+
+        self._hashes = np.zeros(self.max_entries, dtype=np.uint64)
+        self._values = [None] * self.max_entries
+        self._size = 0
+        self._next = 0
+        self._lock = threading.Lock()
+
+        self._lookups = 0
+        self._hits = 0
+        self._lookup_time = 0.0
+
+    def lookup(self, hash_value):
+        """Return the stored value of the nearest hash within max_distance, or None"""
+        start = time.perf_counter()
+        with self._lock:
+            value = None
+            if self._size:
+                distances = hamming_distances(self._hashes[:self._size], hash_value)
+                nearest = int(np.argmin(distances))
+                if distances[nearest] <= self.max_distance:
+                    value = self._values[nearest]
+
+            self._lookups += 1
+            if value is not None:
+                self._hits += 1
+            self._lookup_time += time.perf_counter() - start
+        return value
+
+    def add(self, hash_value, value):
+        """Store a hash and its prediction, overwriting the oldest slot when full"""
+        with self._lock:
+            slot = self._next
+            self._hashes[slot] = hash_value
+            self._values[slot] = value
+            self._next = (slot + 1) % self.max_entries
+            self._size = min(self._size + 1, self.max_entries)
+
+    def stats(self):
+        """Return index size, lookup latency and hit rate"""
+        with self._lock:
+            return {
+                'entries': self._size,
+                'max_entries': self.max_entries,
+                'index_bytes': int(self._hashes.nbytes),
+                'max_distance': self.max_distance,
+                'lookups': self._lookups,
+                'hits': self._hits,
+                'hit_rate': self._hits / self._lookups if self._lookups else 0.0,
+                'avg_lookup_ms': (self._lookup_time / self._lookups * 1000.0) if self._lookups else 0.0
+            }
@@ -0,0 +1,176 @@
+"""
+Compact Response Encoding
+Face-crop response modes, a content-addressed crop store and optional MessagePack/CBOR bodies
+"""
+
+import hashlib
+import io
+import os
+import re
+import threading
+
+from PIL import Image
+
+
+CROP_MODES = ('inline', 'url', 'none')
+BINARY_FORMATS = {
+    'msgpack': 'application/msgpack',
+    'cbor': 'application/cbor'
+}
+DIGEST_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+def encode_crop_jpeg(image, max_size=0, quality=75):
+    """JPEG bytes of a face crop, downscaled so its long edge is at most max_size (0 = native)"""
+    if max_size and max(image.size) > max_size:
+        image = image.copy()
+        image.thumbnail((max_size, max_size), Image.BILINEAR)
+    buffered = io.BytesIO()
+    image.save(buffered, format='JPEG', quality=quality)
+    return buffered.getvalue()
+
+
+class CropStore:
+    """
+    Content-addressed JPEG store behind /api/crops/<digest>.jpg
+
+    Crops are named by the hash of their bytes, so identical crops are
+    written once and their URLs can be cached forever by clients. The
+    oldest files are pruned once max_files is exceeded.
+    """
+
+    def __init__(self, directory, max_files=10000, prune_every=256):
+        # Absolute, so send_file (which resolves relative paths against the app root) finds what put() wrote
+        self.directory = os.path.abspath(directory)
+        os.makedirs(self.directory, exist_ok=True)
+        self.max_files = max_files
+        self.prune_every = prune_every
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def path_for(self, digest):
+        """File path for a digest, or None if the digest is malformed"""
+        if not DIGEST_PATTERN.match(digest):
+            return None
+        return os.path.join(self.directory, digest[:2], f"{digest}.jpg")
+
+    def put(self, jpeg_bytes):
+        """Store crop bytes (no-op if already present) and return their digest"""
+        digest = hashlib.sha256(jpeg_bytes).hexdigest()[:32]
+        path = self.path_for(digest)
+        if os.path.exists(path):
+            # Refresh the age of crops that keep being served
+            os.utime(path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(jpeg_bytes)
+            os.replace(temp_path, path)
+
+            with self._lock:
+                self._writes += 1
+                prune = self._writes % self.prune_every == 0
+            if prune:
+                self.prune()
+        return digest
+
+    def touch(self, digest):
+        """Refresh the age of a stored crop; False if it is missing (pruned) or the digest is malformed"""
+        path = self.path_for(digest)
+        if path is None:
+            return False
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def prune(self):
+        """Delete the least recently stored crops beyond max_files"""
+        files = []
+        for root, _, names in os.walk(self.directory):
+            files.extend(os.path.join(root, name) for name in names if name.endswith('.jpg'))
+        excess = len(files) - self.max_files
+        if excess <= 0:
+            return 0
+        files.sort(key=lambda path: os.path.getmtime(path))
+        for path in files[:excess]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        return excess
+
+
+def negotiate_format(requested, accept_header):
+    """'json', 'msgpack' or 'cbor' from an explicit ?format= or the Accept header"""
+    if requested:
+        return requested.lower()
+    for name, mimetype in BINARY_FORMATS.items():
+        if mimetype in accept_header:
+            return name
+    return 'json'
+
+
+def serialize(payload, fmt):
+    """Encode a payload as MessagePack or CBOR; raises ImportError if the codec is not installed"""
+    if fmt == 'msgpack':
+        import msgpack
+        return msgpack.packb(payload, use_bin_type=True)
+    if fmt == 'cbor':
+        import cbor2
+        return cbor2.dumps(payload)
+    raise ValueError(f"Unknown response format '{fmt}'. Choose from: json, {', '.join(BINARY_FORMATS)}")
+
+
+class ResponseStats:
+    """Crop encode cost and response body sizes, per crop mode / body format / endpoint"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._crops = {}
+        self._bodies = {}
+        self._endpoints = {}
+
+    @staticmethod
+    def _add(table, key, seconds, nbytes):
+        entry = table.setdefault(key, {'count': 0, 'encode_seconds': 0.0, 'bytes': 0})
+        entry['count'] += 1
+        entry['encode_seconds'] += seconds
+        entry['bytes'] += nbytes
+
+    def record_crop(self, mode, seconds, nbytes):
+        with self._lock:
+            self._add(self._crops, mode, seconds, nbytes)
+
+    def record_body(self, fmt, seconds, nbytes):
+        with self._lock:
+            self._add(self._bodies, fmt, seconds, nbytes)
+
+    def record_response(self, endpoint, nbytes):
+        with self._lock:
+            self._add(self._endpoints, endpoint, 0.0, nbytes)
+
+    def stats(self):
+        """Totals plus per-item averages (encode ms, bytes)"""
+        def summarize(table, with_encode=True):
+            summary = {}
+            for key, entry in table.items():
+                count = entry['count']
+                summary[key] = {
+                    'count': count,
+                    'bytes_total': entry['bytes'],
+                    'avg_bytes': entry['bytes'] / count
+                }
+                if with_encode:
+                    summary[key]['encode_ms_total'] = entry['encode_seconds'] * 1000.0
+                    summary[key]['avg_encode_ms'] = entry['encode_seconds'] * 1000.0 / count
+            return summary
+
+        with self._lock:
+            return {
+                'crops': summarize(self._crops),
+                'binary_bodies': summarize(self._bodies),
+                'bytes_sent': summarize(self._endpoints, with_encode=False)
+            }
@@ -0,0 +1,8 @@
+"""
+WSGI Entry Point
+Used by gunicorn (see gunicorn.conf.py): gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+from app import create_app
+
+app = create_app()
@@ -0,0 +1,111 @@
+"""
+Image Decode Benchmark
+Full-resolution decode from request bytes vs reduced-resolution JPEG decode from the stream, on large phone-sized photos
+"""
+
+import argparse
+import io
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+from PIL import Image
+
+from common import high_water_rss_mb, save_results, time_calls
+from image_decode import decode_image
+
+PHONE_SIZES = ((4032, 3024), (4000, 3000), (3024, 4032), (8160, 6120))
+
+
+def synthetic_photo(path, width, height, orientation=6, seed=0):
+    """Write a textured JPEG with an EXIF orientation tag, like a portrait shot from a phone"""
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 255, (height // 16, width // 16, 3), dtype=np.uint8)
+    image = Image.fromarray(small).resize((width, height), Image.BILINEAR)
+    exif = Image.Exif()
+    exif[0x0112] = orientation
+    image.save(path, format='JPEG', quality=92, exif=exif.tobytes())
+
+
+def decode_full(path):
+    """The previous path: read the upload into bytes, wrap it and decode at native resolution"""
+    with open(path, 'rb') as f:
+        image_bytes = f.read()
+    image = Image.open(io.BytesIO(image_bytes))
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    image.load()
+    return image
+
+
+def decode_reduced(path, min_side):
+    with open(path, 'rb') as f:
+        return decode_image(f, min_side=min_side)
+
+
+def peak_rss_mb(variant, path, min_side):
+    """Peak RSS of a fresh process that decodes the photo once with the given variant"""
+    output = subprocess.check_output(
+        [sys.executable, os.path.abspath(__file__), '--measure-rss', variant, path, str(min_side)]
+    )
+    return float(output.decode().strip().splitlines()[-1])
+
+
+def measure_rss(variant, path, min_side):
+    # VmHWM is not inherited from the parent process, unlike ru_maxrss after fork/exec
+    baseline = high_water_rss_mb()
+    image = decode_full(path) if variant == 'full' else decode_reduced(path, min_side)
+    peak = high_water_rss_mb()
+    del image
+    # Report the peak growth caused by the decode
+    print(peak - baseline)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--min-side', type=int, default=768, help='DECODE_MIN_SIDE used for the reduced decode')
+    parser.add_argument('--repeats', type=int, default=10)
+    parser.add_argument('--output', default=None, help='JSON output path')
+    parser.add_argument('--measure-rss', nargs=3, metavar=('VARIANT', 'PATH', 'MIN_SIDE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure_rss:
+        variant, path, min_side = args.measure_rss
+        measure_rss(variant, path, int(min_side))
+        return
+
+    results = {'min_side': args.min_side, 'photos': {}}
+    print(f"{'photo':>10} | {'full p50':>9} | {'reduced p50':>11} | {'speedup':>7} | "
+          f"{'full RSS':>9} | {'reduced RSS':>11} | {'decoded size':>12}")
+    print('-' * 88)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for width, height in PHONE_SIZES:
+            path = os.path.join(tmp, f"photo_{width}x{height}.jpg")
+            synthetic_photo(path, width, height)
+
+            full = time_calls(lambda: decode_full(path), repeats=args.repeats, warmup=1)
+            reduced = time_calls(lambda: decode_reduced(path, args.min_side), repeats=args.repeats, warmup=1)
+            decoded = decode_reduced(path, args.min_side)
+            entry = {
+                'file_mb': os.path.getsize(path) / 1e6,
+                'full_decode': full,
+                'reduced_decode': reduced,
+                'speedup_p50': full['p50_ms'] / reduced['p50_ms'],
+                'full_peak_rss_mb': peak_rss_mb('full', path, args.min_side),
+                'reduced_peak_rss_mb': peak_rss_mb('reduced', path, args.min_side),
+                'decoded_size': list(decoded.size),
+                'decode_reduction': decoded.info['decode_reduction']
+            }
+            results['photos'][f"{width}x{height}"] = entry
+            print(f"{width}x{height:<5} | {full['p50_ms']:>6.1f} ms | {reduced['p50_ms']:>8.1f} ms | "
+                  f"{entry['speedup_p50']:>6.1f}x | {entry['full_peak_rss_mb']:>6.1f} MB | "
+                  f"{entry['reduced_peak_rss_mb']:>8.1f} MB | {decoded.size[0]:>5}x{decoded.size[1]:<6}")
+
+    save_results('decode', results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Inference Session Latency Benchmark
+Compares model.predict() against the compiled InferenceSession for small batch sizes
+"""
+
+import argparse
+
+import numpy as np
+
+from common import IMG_SIZE, load_model_or_standin, save_results, time_calls
+from inference_session import InferenceSession
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--batch-sizes', default='1,2,4,8,16', help='Comma-separated batch sizes')
+    parser.add_argument('--repeats', type=int, default=50)
+    parser.add_argument('--output', default=None, help='JSON output path')
+    args = parser.parse_args()
+
+    model, model_kind = load_model_or_standin()
+    session = InferenceSession(model, img_size=IMG_SIZE)
+    print(f"Session warm-up: {session.warmup_seconds:.2f}s (buckets {list(session.buckets)})\n")
+
+    rng = np.random.default_rng(0)
+    results = {'model': model_kind, 'warmup_seconds': session.warmup_seconds, 'batch_sizes': {}}
+
+    print(f"{'batch':>5} | {'model.predict p50':>18} | {'session p50':>12} | {'speedup':>7}")
+    print('-' * 52)
+    for batch_size in [int(b) for b in args.batch_sizes.split(',')]:
+        batch = rng.random((batch_size, IMG_SIZE, IMG_SIZE, 3), dtype=np.float32)
+
+        before = time_calls(lambda: model.predict(batch, verbose=0), repeats=args.repeats)
+        after = time_calls(lambda: session.predict(batch), repeats=args.repeats)
+
+        # Both paths must agree on the scores
+        max_diff = float(np.abs(model.predict(batch, verbose=0)[:, 0] - session.predict(batch)).max())
+        speedup = before['p50_ms'] / after['p50_ms']
+
+        results['batch_sizes'][str(batch_size)] = {
+            'model_predict': before,
+            'inference_session': after,
+            'speedup_p50': speedup,
+            'max_abs_score_diff': max_diff
+        }
+        print(f"{batch_size:>5} | {before['p50_ms']:>15.2f} ms | {after['p50_ms']:>9.2f} ms | {speedup:>6.1f}x")
+
+    save_results('inference_session', results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""
+Training Input Pipeline Benchmark
+Steps per second of ImageDataGenerator.flow_from_directory vs the tf.data pipeline (uncached, cached, TFRecord shards), input-only and inside model.fit
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+from tensorflow import keras
+
+from common import IMG_SIZE, build_standin_model, save_results
+from training_data import AUGMENTATION, build_dataset, write_tfrecord_shards
+
+
+def synthetic_dataset(directory, count, size=(640, 640), seed=0):
+    """Class-folder dataset of textured JPEGs, sized like face crops cut from phone photos"""
+    rng = np.random.default_rng(seed)
+    for class_name in ('fake', 'real'):
+        os.makedirs(os.path.join(directory, class_name), exist_ok=True)
+    width, height = size
+    for i in range(count):
+        small = rng.integers(0, 255, (height // 8, width // 8, 3), dtype=np.uint8)
+        image = Image.fromarray(small).resize((width, height), Image.BILINEAR)
+        image.save(os.path.join(directory, ('fake', 'real')[i % 2], f"{i:05d}.jpg"), quality=90)
+
+
+def image_data_generator(directory, batch_size):
+    """The notebook's current training input"""
+    from tensorflow.keras.preprocessing.image import ImageDataGenerator
+
+    datagen = ImageDataGenerator(
+        rescale=1./255,
+        rotation_range=AUGMENTATION['rotation_range'],
+        width_shift_range=AUGMENTATION['width_shift_range'],
+        height_shift_range=AUGMENTATION['height_shift_range'],
+        shear_range=AUGMENTATION['shear_range'],
+        zoom_range=AUGMENTATION['zoom_range'],
+        horizontal_flip=AUGMENTATION['horizontal_flip'],
+        brightness_range=list(AUGMENTATION['brightness_range']),
+        fill_mode='nearest'
+    )
+    return datagen.flow_from_directory(directory, target_size=(IMG_SIZE, IMG_SIZE), batch_size=batch_size,
+                                       class_mode='binary', shuffle=True, seed=42)
+
+
+def input_steps_per_second(iterator, steps, epochs):
+    """Batches per second when only consuming the input; the first epoch warms caches and is reported apart"""
+    per_epoch = []
+    for _ in range(epochs):
+        start = time.perf_counter()
+        for _ in range(steps):
+            next(iterator)
+        per_epoch.append(steps / (time.perf_counter() - start))
+    return {'first_epoch': per_epoch[0], 'later_epochs': float(np.mean(per_epoch[1:])) if epochs > 1 else None}
+
+
+class EpochTimer(keras.callbacks.Callback):
+    """Wall time of every training epoch"""
+
+    def __init__(self):
+        super().__init__()
+        self.durations = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._start = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        self.durations.append(time.perf_counter() - self._start)
+
+
+def fit_steps_per_second(data, steps, epochs):
+    """Training steps per second of the stand-in model fed by `data`"""
+    model = build_standin_model()
+    model.compile(optimizer='adam', loss='binary_crossentropy', metrics=['accuracy'])
+    timer = EpochTimer()
+    model.fit(data, steps_per_epoch=steps, epochs=epochs, verbose=0, callbacks=[timer])
+    rates = [steps / duration for duration in timer.durations]
+    return {'first_epoch': rates[0], 'later_epochs': float(np.mean(rates[1:])) if epochs > 1 else None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--dataset', default=None, help='Class-folder dataset (default: synthetic 640x640 JPEGs)')
+    parser.add_argument('--images', type=int, default=512, help='Synthetic dataset size')
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--epochs', type=int, default=3, help='Epochs per variant (first one warms caches)')
+    parser.add_argument('--skip-fit', action='store_true', help='Only measure input throughput')
+    parser.add_argument('--output', default=None, help='JSON output path')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = args.dataset
+        if directory is None:
+            directory = os.path.join(tmp, 'train')
+            synthetic_dataset(directory, args.images)
+        shard_dir = os.path.join(tmp, 'shards')
+        start = time.perf_counter()
+        manifest = write_tfrecord_shards(directory, shard_dir, num_shards=8)
+        shard_seconds = time.perf_counter() - start
+
+        count = manifest['count']
+        steps = max(1, count // args.batch_size)
+
+        def tf_data(source, cache):
+            dataset, _ = build_dataset(source, batch_size=args.batch_size, cache=cache)
+            return dataset
+
+        variants = {
+            'image_data_generator': lambda: image_data_generator(directory, args.batch_size),
+            'tf_data': lambda: tf_data(directory, False),
+            'tf_data_cached': lambda: tf_data(directory, True),
+            'tf_data_tfrecord': lambda: tf_data(shard_dir, False)
+        }
+
+        results = {
+            'images': count,
+            'batch_size': args.batch_size,
+            'steps_per_epoch': steps,
+            'epochs': args.epochs,
+            'cpu_count': os.cpu_count(),
+            'tfrecord_write_seconds': shard_seconds,
+            'input_only': {},
+            'fit': {}
+        }
+
+        print(f"{'variant':<22} | {'input 1st':>9} | {'input later':>11} | {'fit 1st':>8} | {'fit later':>9}   (steps/s)")
+        print('-' * 76)
+        for name, make in variants.items():
+            # One iterator across epochs, as model.fit uses; the partial last batch of an
+            # epoch spills into the next, so a tf.data cache is completed by epoch two
+            source = make()
+            iterator = source if name == 'image_data_generator' else iter(source.repeat())
+            results['input_only'][name] = input_steps_per_second(iterator, steps, args.epochs)
+            if not args.skip_fit:
+                data = make() if name == 'image_data_generator' else make().repeat()
+                results['fit'][name] = fit_steps_per_second(data, steps, args.epochs)
+
+            input_rates = results['input_only'][name]
+            fit_rates = results['fit'].get(name, {})
+            print(f"{name:<22} | {input_rates['first_epoch']:>9.2f} | {input_rates['later_epochs'] or 0:>11.2f} | "
+                  f"{fit_rates.get('first_epoch', 0):>8.2f} | {fit_rates.get('later_epochs') or 0:>9.2f}")
+
+        baseline = results['input_only']['image_data_generator']['later_epochs']
+        if baseline:
+            results['input_speedup_vs_image_data_generator'] = {
+                name: rates['later_epochs'] / baseline
+                for name, rates in results['input_only'].items() if rates['later_epochs']
+            }
+
+    save_results('input_pipeline', results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""
+Preprocessing Pipeline Benchmark
+Per-stage timings and buffer allocations of the legacy PIL chain vs the uint8 buffer pipeline, from upload bytes to model input
+"""
+
+import argparse
+import io
+import time
+
+import numpy as np
+from PIL import Image
+
+from common import IMG_SIZE, save_results, summarize
+from preprocessing import BufferPool, normalize_into, resize_into
+
+
+def synthetic_upload(width=1280, height=960, seed=0):
+    """JPEG bytes of a textured RGB image standing in for an uploaded photo"""
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:height, 0:width]
+    base = np.stack([xx * 255 // width, yy * 255 // height, (xx + yy) * 255 // (width + height)], axis=-1)
+    noise = rng.integers(0, 40, (height, width, 3))
+    buffered = io.BytesIO()
+    Image.fromarray(np.clip(base + noise, 0, 255).astype(np.uint8)).save(buffered, format='JPEG', quality=90)
+    return buffered.getvalue()
+
+
+def centered_box(width, height, fraction=0.4):
+    side = int(min(width, height) * fraction)
+    return (width - side) // 2, (height - side) // 2, side, side
+
+
+def legacy_stages(box):
+    """The original chain: every step produces a new image or array"""
+    x, y, w, h = box
+    return [
+        ('decode', lambda data: Image.open(io.BytesIO(data)).convert('RGB')),
+        ('to_array', lambda image: np.array(image)),
+        ('crop', lambda arr: Image.fromarray(arr).crop((x, y, x + w, y + h))),
+        ('resize', lambda face: face.resize((IMG_SIZE, IMG_SIZE))),
+        ('face_to_array', lambda face: np.array(face)),
+        ('astype_float32', lambda arr: arr.astype('float32')),
+        ('divide_255', lambda arr: arr / 255.0),
+        ('expand_dims', lambda arr: np.expand_dims(arr, axis=0)),
+    ]
+
+
+def buffered_stages(box, slot_pool, float_pool, fold_normalization):
+    """uint8 until the model boundary; crop + resize is one OpenCV call into a reused slot"""
+    stages = [
+        ('decode', lambda data: Image.open(io.BytesIO(data)).convert('RGB')),
+        ('to_array', lambda image: np.asarray(image)),
+        ('crop_resize', lambda arr: resize_into(arr, slot_pool.get(1)[0], box=box)),
+    ]
+    if not fold_normalization:
+        stages.append(('normalize', lambda face: normalize_into(face[np.newaxis], float_pool.get(1))))
+    return stages
+
+
+def is_new_buffer(result, reused):
+    """True when a stage result owns memory that is not one of the reused pool buffers"""
+    if isinstance(result, Image.Image):
+        return True
+    if any(np.shares_memory(result, buffer) for buffer in reused):
+        return False
+    return result.base is None or isinstance(result.base, bytes)
+
+
+def run_pipeline(stages, data, reused, repeats):
+    """Time each stage over `repeats` runs and count the buffers it allocates per run"""
+    timings = {name: [] for name, _ in stages}
+    allocations = {name: {'new_buffers': 0, 'bytes': 0} for name, _ in stages}
+
+    for run in range(repeats + 1):
+        value = data
+        for name, stage in stages:
+            start = time.perf_counter()
+            value = stage(value)
+            elapsed = (time.perf_counter() - start) * 1000.0
+            if run == 0:
+                # First run only warms pools and caches
+                continue
+            timings[name].append(elapsed)
+            if run == 1 and is_new_buffer(value, reused()):
+                allocations[name]['new_buffers'] = 1
+                allocations[name]['bytes'] = int(
+                    value.nbytes if isinstance(value, np.ndarray) else len(value.tobytes())
+                )
+
+    stages_report = {
+        name: {**allocations[name], **summarize(timings[name])}
+        for name, _ in stages
+    }
+    total = [sum(values) for values in zip(*timings.values())]
+    return {
+        'stages': stages_report,
+        'total': summarize(total),
+        'new_buffers_per_request': sum(a['new_buffers'] for a in allocations.values()),
+        'bytes_allocated_per_request': sum(a['bytes'] for a in allocations.values())
+    }
+
+
+def print_report(title, report):
+    print(f"\n{title}")
+    print(f"{'stage':<16} {'p50 ms':>8} {'new bufs':>9} {'KB':>9}")
+    print('-' * 46)
+    for name, info in report['stages'].items():
+        print(f"{name:<16} {info['p50_ms']:>8.3f} {info['new_buffers']:>9} {info['bytes'] / 1024:>9.0f}")
+    print(f"{'total':<16} {report['total']['p50_ms']:>8.3f} {report['new_buffers_per_request']:>9} "
+          f"{report['bytes_allocated_per_request'] / 1024:>9.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--image', default=None, help='Image file to use (default: synthetic 1280x960 JPEG)')
+    parser.add_argument('--repeats', type=int, default=50)
+    parser.add_argument('--output', default=None, help='JSON output path')
+    args = parser.parse_args()
+
+    if args.image:
+        with open(args.image, 'rb') as f:
+            data = f.read()
+    else:
+        data = synthetic_upload()
+    width, height = Image.open(io.BytesIO(data)).size
+    box = centered_box(width, height)
+
+    slot_pool = BufferPool((IMG_SIZE, IMG_SIZE, 3), np.uint8)
+    float_pool = BufferPool((IMG_SIZE, IMG_SIZE, 3), np.float32)
+
+    def pool_buffers():
+        return [slot_pool.get(1), float_pool.get(1)]
+
+    results = {
+        'image_size': [width, height],
+        'face_box': list(box),
+        'legacy': run_pipeline(legacy_stages(box), data, lambda: [], args.repeats),
+        'buffered_folded': run_pipeline(buffered_stages(box, slot_pool, float_pool, True),
+                                        data, pool_buffers, args.repeats),
+        'buffered_host_normalize': run_pipeline(buffered_stages(box, slot_pool, float_pool, False),
+                                                data, pool_buffers, args.repeats)
+    }
+
+    print_report('Legacy PIL chain', results['legacy'])
+    print_report('uint8 buffers, /255 folded into the model graph', results['buffered_folded'])
+    print_report('uint8 buffers, /255 on the host into a reused buffer', results['buffered_host_normalize'])
+
+    save_results('preprocessing', results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Per-Stage Pipeline Benchmark
+Microbenchmarks of each request stage in backend/app.py, over a synthetic workload of image sizes and face counts
+"""
+
+import argparse
+
+from common import import_backend_app, load_workload, save_results, time_calls
+
+
+STAGES = ('decode', 'detect_and_crop_face', 'preprocess_image', 'predict_deepfake', 'image_to_base64')
+
+
+def bench_item(backend_app, data, repeats, warmup):
+    """Time every stage on one workload image; later stages reuse the previous stage's output"""
+    image = backend_app.load_image(data)
+    face_image, _, error = backend_app.detect_and_crop_face(image)
+
+    results = {
+        'decode': time_calls(lambda: backend_app.load_image(data), repeats=repeats, warmup=warmup),
+        'detect_and_crop_face': time_calls(lambda: backend_app.detect_and_crop_face(image),
+                                           repeats=repeats, warmup=warmup)
+    }
+    if error:
+        # Stages after detection never run for no-face images
+        return results, False
+
+    results['preprocess_image'] = time_calls(lambda: backend_app.preprocess_image(face_image),
+                                             repeats=repeats, warmup=warmup)
+    results['predict_deepfake'] = time_calls(lambda: backend_app.predict_deepfake(face_image),
+                                             repeats=repeats, warmup=warmup)
+    results['image_to_base64'] = time_calls(lambda: backend_app.image_to_base64(face_image),
+                                            repeats=repeats, warmup=warmup)
+    return results, True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workload', default=None, help='Folder written by create_sample_images.py --workload '
+                                                         '(default: generate one into a temp folder)')
+    parser.add_argument('--face-source', default=None, help='Photo pasted as the faces of a generated workload '
+                                                            '(drawn faces rarely trigger MTCNN)')
+    parser.add_argument('--repeats', type=int, default=10)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--output', default=None, help='JSON output path')
+    args = parser.parse_args()
+
+    backend_app, model_kind = import_backend_app()
+    workload = load_workload(args.workload, face_source=args.face_source)
+
+    results = {
+        'model': model_kind,
+        'backend': backend_app.app.config['INFERENCE_BACKEND'],
+        'decode_min_side': backend_app.app.config['DECODE_MIN_SIDE'],
+        'repeats': args.repeats,
+        'images': {}
+    }
+
+    print(f"{'image':<28} {'faces':>5} " + ' '.join(f"{stage[:14]:>14}" for stage in STAGES))
+    print('-' * (35 + 15 * len(STAGES)))
+    for entry, data in workload:
+        stages, face_found = bench_item(backend_app, data, args.repeats, args.warmup)
+        results['images'][entry['file']] = {**entry, 'face_found': face_found, 'stages': stages}
+        cells = ' '.join(
+            f"{stages[stage]['p50_ms']:>11.2f} ms" if stage in stages else f"{'-':>14}" for stage in STAGES
+        )
+        print(f"{entry['file']:<28} {entry['faces']:>5} {cells}")
+
+    save_results('stages', results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Batch Upload Memory Benchmark
+Peak server RSS for one /api/batch-predict request of large photos at growing batch sizes, with streamed (BATCH_STREAMING) and buffered multipart handling
+"""
+
+import argparse
+import io
+import logging
+import os
+import subprocess
+
+import numpy as np
+from PIL import Image
+
+from common import BACKEND_DIR, configure_backend_env, load_workload, save_results
+from compare_servers import process_tree, server_command, wait_healthy
+from load_test import HttpClient
+
+
+def tree_high_water_mb(root_pid, reset=False):
+    """Sum of VmHWM over the server's process tree in MB; reset=True restarts the high-water marks (Linux)"""
+    total_kb = 0
+    for pid in process_tree(root_pid):
+        try:
+            if reset:
+                with open(f"/proc/{pid}/clear_refs", 'w') as f:
+                    f.write('5')
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith('VmHWM:'):
+                        total_kb += int(line.split()[1])
+        except OSError:
+            continue
+    return total_kb / 1024.0
+
+
+def large_photo(source, megapixels, quality):
+    """JPEG bytes of `source` upscaled to roughly `megapixels`, with sensor noise so it compresses like a camera photo"""
+    image = Image.open(io.BytesIO(source)).convert('RGB')
+    scale = (megapixels * 1e6 / (image.width * image.height)) ** 0.5
+    image = image.resize((int(image.width * scale), int(image.height * scale)), Image.BICUBIC)
+    noise = np.random.default_rng(0).normal(0, 6, (image.height, image.width, 3))
+    image = Image.fromarray(np.clip(np.asarray(image) + noise, 0, 255).astype(np.uint8))
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=quality)
+    return buffer.getvalue()
+
+
+def run_mode(streaming, port, photo, batch_sizes, args):
+    """Start a server with streaming on or off and measure each batch size"""
+    env = dict(os.environ, BATCH_STREAMING='true' if streaming else 'false')
+    process = subprocess.Popen(server_command('gunicorn', port, 1), cwd=BACKEND_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=None if args.verbose else subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    rows = {}
+    try:
+        wait_healthy(url, process, args.startup_timeout)
+        client = HttpClient(url)
+        # Warm every pipeline stage once so the measurements see only per-request memory
+        client.post('/api/batch-predict?crop=none', {'files': [(io.BytesIO(photo), 'warm.jpg')]})
+        for size in batch_sizes:
+            samples = []
+            for _ in range(args.repeats):
+                baseline = tree_high_water_mb(process.pid, reset=True)
+                files = [(io.BytesIO(photo), f"photo{i}.jpg") for i in range(size)]
+                response = client.post('/api/batch-predict?crop=none', {'files': files})
+                if response.status_code != 200:
+                    raise RuntimeError(f"Batch of {size} answered {response.status_code}")
+                samples.append(tree_high_water_mb(process.pid) - baseline)
+            rows[str(size)] = {'peak_rss_growth_mb': max(samples), 'samples_mb': samples,
+                               'upload_mb': size * len(photo) / (1024 * 1024)}
+            print(f"{'streamed' if streaming else 'buffered':<9} | {size:>5} | {size * len(photo) / 2 ** 20:>9.1f} | "
+                  f"{max(samples):>10.1f}")
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--batch-sizes', default='1,2,4,8', help='Comma-separated files per request')
+    parser.add_argument('--megapixels', type=float, default=4.0, help='Size of every uploaded photo')
+    parser.add_argument('--quality', type=int, default=92, help='JPEG quality of the uploaded photos')
+    parser.add_argument('--repeats', type=int, default=3, help='Requests per batch size (the largest peak is kept)')
+    parser.add_argument('--workload', default=None, help='Folder written by create_sample_images.py --workload')
+    parser.add_argument('--face-source', default=None, help='Photo pasted as the faces of a generated workload')
+    parser.add_argument('--port', type=int, default=5081, help='Buffered mode uses the next port')
+    parser.add_argument('--startup-timeout', type=int, default=180)
+    parser.add_argument('--verbose', action='store_true', help='Show server logs')
+    parser.add_argument('--output', default=None, help='JSON output path')
+    args = parser.parse_args()
+    batch_sizes = [int(size) for size in args.batch_sizes.split(',') if size.strip()]
+
+    model_kind = configure_backend_env()
+    os.environ['WEB_CONCURRENCY'] = '1'
+    logging.getLogger('app').setLevel(logging.ERROR)
+    photo = large_photo(load_workload(args.workload, face_source=args.face_source)[0][1], args.megapixels,
+                        args.quality)
+
+    print(f"{'mode':<9} | {'files':>5} | {'upload MB':>9} | {'peak +MB':>10}")
+    print('-' * 44)
+    results = {
+        'model': model_kind,
+        'photo_mb': len(photo) / (1024 * 1024),
+        'megapixels': args.megapixels,
+        'batch_predict_workers': int(os.environ.get('BATCH_PREDICT_WORKERS', min(8, os.cpu_count() or 1))),
+        'upload_spool_max_memory': int(os.environ.get('UPLOAD_SPOOL_MAX_MEMORY', 1024 * 1024)),
+        'streamed': run_mode(True, args.port, photo, batch_sizes, args),
+        'buffered': run_mode(False, args.port + 1, photo, batch_sizes, args)
+    }
+    save_results('upload_memory', results, args.output)
+
+
+if __name__ == '__main__':
+    main()
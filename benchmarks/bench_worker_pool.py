@@ -0,0 +1,134 @@
+"""
+Inference Worker Pool Scaling Benchmark
+Faces per second of the in-process model against 1..N core-pinned worker processes fed through shared memory, with scaling efficiency and per-worker RSS
+"""
+
+import argparse
+import os
+import threading
+import time
+
+import numpy as np
+
+from common import IMG_SIZE, configure_backend_env, save_results
+from compare_servers import tree_usage
+from backends import BACKENDS, default_model_path, load_backend
+from worker_pool import InferenceWorkerPool, available_cores, parse_core_list
+
+
+def measure(predictor, batch, callers, duration):
+    """Faces per second with `callers` threads calling predictor.predict(batch) back to back for `duration` seconds"""
+    predictor.predict(batch)
+    counts = [0] * callers
+    stop = threading.Event()
+
+    def caller(index):
+        while not stop.is_set():
+            predictor.predict(batch)
+            counts[index] += len(batch)
+
+    threads = [threading.Thread(target=caller, args=(i,), daemon=True) for i in range(callers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return sum(counts) / elapsed, sum(counts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--backend', choices=BACKENDS, default='keras')
+    parser.add_argument('--model', default=None, help='Model artifact (default: the backend default or the stand-in)')
+    parser.add_argument('--workers', default=None,
+                        help='Comma-separated worker counts (default: 1, 2, 4, ... up to the available cores)')
+    parser.add_argument('--cores', default=None, help='Cores shared out among the workers, e.g. 0-15')
+    parser.add_argument('--batch-size', type=int, default=32, help='Faces per predict() call')
+    parser.add_argument('--callers', type=int, default=0,
+                        help='Concurrent predict() callers (0 = two per worker, like the micro-batcher threads)')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per measurement')
+    parser.add_argument('--output', default=None, help='JSON output path')
+    args = parser.parse_args()
+
+    model_kind = configure_backend_env()
+    if args.model:
+        model_path = args.model
+    elif args.backend == 'keras':
+        model_path = os.environ.get('INFERENCE_MODEL_PATH') or default_model_path('keras')
+    else:
+        model_path = default_model_path(args.backend)
+    cores = parse_core_list(args.cores) or available_cores()
+    if args.workers:
+        levels = [int(level) for level in args.workers.split(',') if level.strip()]
+    else:
+        levels = [1]
+        while levels[-1] * 2 <= len(cores):
+            levels.append(levels[-1] * 2)
+        if levels[-1] != len(cores):
+            levels.append(len(cores))
+
+    rng = np.random.default_rng(0)
+    batch = rng.integers(0, 256, (args.batch_size, IMG_SIZE, IMG_SIZE, 3), dtype=np.uint8)
+
+    # Baseline: the model in this process with every core for its intra-op threads
+    baseline = load_backend(args.backend, model_path, num_threads=len(cores))
+    reference = np.asarray(baseline.predict(batch)).reshape(-1)
+    callers = args.callers or 2
+    baseline_rate, _ = measure(baseline, batch, callers, args.duration)
+    del baseline
+
+    results = {
+        'model': model_kind,
+        'backend': args.backend,
+        'batch_size': args.batch_size,
+        'cores': cores,
+        'cpu_count': os.cpu_count(),
+        'in_process': {'faces_per_second': baseline_rate, 'callers': callers},
+        'pools': {}
+    }
+    print(f"{'workers':>7} | {'callers':>7} | {'faces/s':>8} | {'vs 1 worker':>11} | {'efficiency':>10} | "
+          f"{'vs in-proc':>10} | {'RSS/worker':>10}")
+    print('-' * 82)
+    print(f"{'in-proc':>7} | {callers:>7} | {baseline_rate:>8.1f} | {'':>11} | {'':>10} | {1.0:>9.2f}x | {'':>10}")
+
+    single_rate = None
+    for workers in levels:
+        pool = InferenceWorkerPool(args.backend, model_path, workers=workers, cores=cores,
+                                   max_batch=args.batch_size, img_size=IMG_SIZE).start()
+        try:
+            max_diff = float(np.abs(pool.predict(batch) - reference).max())
+            level_callers = args.callers or 2 * workers
+            rate, faces = measure(pool, batch, level_callers, args.duration)
+            stats = pool.stats()
+            worker_rss = [tree_usage(worker['pid'])[0] for worker in stats['per_worker']]
+        finally:
+            pool.close()
+
+        single_rate = single_rate or rate
+        speedup = rate / single_rate
+        results['pools'][str(workers)] = {
+            'callers': level_callers,
+            'core_sets': pool.core_sets,
+            'start_seconds': pool.warmup_seconds,
+            'faces': faces,
+            'faces_per_second': rate,
+            'speedup_vs_1_worker': speedup,
+            'scaling_efficiency': speedup / workers,
+            'speedup_vs_in_process': rate / baseline_rate,
+            'max_abs_score_diff': max_diff,
+            'worker_rss_mb': worker_rss,
+            'ring_mb_per_worker': stats['ring_mb_per_worker'],
+            'faces_per_worker': [worker['faces'] for worker in stats['per_worker']],
+            'busy_seconds_per_worker': [worker['busy_seconds'] for worker in stats['per_worker']]
+        }
+        print(f"{workers:>7} | {level_callers:>7} | {rate:>8.1f} | {speedup:>10.2f}x | {speedup / workers:>9.0%} | "
+              f"{rate / baseline_rate:>9.2f}x | {np.mean(worker_rss):>7.0f} MB")
+
+    save_results('worker_pool', results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""
+Shared Benchmark Helpers
+Model loading with an offline stand-in, timing utilities and JSON result output
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_DIR = os.path.join(ROOT_DIR, 'model')
+BACKEND_DIR = os.path.join(ROOT_DIR, 'backend')
+MODEL_PATH = os.path.join(MODEL_DIR, 'saved_models', 'deepfake_detector_efficientnet.h5')
+RESULTS_DIR = os.path.join(ROOT_DIR, 'benchmarks', 'results')
+IMG_SIZE = 224
+
+# Make model/ importable for the shared inference modules
+if MODEL_DIR not in sys.path:
+    sys.path.insert(0, MODEL_DIR)
+
+# Make create_sample_images.py importable for workload generation
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+
+def build_standin_model(img_size=IMG_SIZE, seed=42):
+    """Small randomly initialized CNN with the same input/output contract as the real model"""
+    import tensorflow as tf
+    from tensorflow.keras import layers, models
+
+    tf.random.set_seed(seed)
+    return models.Sequential([
+        layers.Input(shape=(img_size, img_size, 3)),
+        layers.Conv2D(16, 3, strides=2, activation='relu'),
+        layers.Conv2D(32, 3, strides=2, activation='relu'),
+        layers.Conv2D(64, 3, strides=2, activation='relu'),
+        layers.GlobalAveragePooling2D(),
+        layers.Dense(64, activation='relu'),
+        layers.Dense(1, activation='sigmoid')
+    ])
+
+
+def load_model_or_standin(model_path=MODEL_PATH):
+    """Load the trained .h5 model, falling back to the stand-in so benchmarks run offline"""
+    from tensorflow import keras
+
+    if os.path.exists(model_path):
+        print(f"✅ Using trained model: {model_path}")
+        return keras.models.load_model(model_path), 'trained'
+    print(f"⚠️ Model not found at {model_path}. Using randomly initialized stand-in model.")
+    return build_standin_model(), 'standin'
+
+
+def configure_backend_env(cache=False):
+    """
+    Point the backend at a servable model through the environment, running offline if needed
+    Without the trained .h5 a stand-in model is saved to a temp file and served instead.
+    The prediction cache and near-duplicate index are off unless `cache` is set, so
+    repeated workload images measure the pipeline rather than cache hits.
+    """
+    model_kind = 'trained'
+    if not os.environ.get('INFERENCE_MODEL_PATH') and not os.path.exists(MODEL_PATH):
+        standin_path = os.path.join(tempfile.gettempdir(), 'deepfake_standin_model.h5')
+        if not os.path.exists(standin_path):
+            build_standin_model().save(standin_path)
+        os.environ['INFERENCE_MODEL_PATH'] = standin_path
+        model_kind = 'standin'
+        print(f"⚠️ Model not found at {MODEL_PATH}. Using randomly initialized stand-in model.")
+    if not cache:
+        os.environ.setdefault('PREDICTION_CACHE', 'false')
+        os.environ.setdefault('PHASH_INDEX', 'false')
+    else:
+        # The index is off by default in the backend
+        os.environ.setdefault('PHASH_INDEX', 'true')
+    return model_kind
+
+
+def import_backend_app(cache=False):
+    """Import backend/app.py with models loaded (environment as in configure_backend_env)"""
+    model_kind = configure_backend_env(cache=cache)
+
+    # The app resolves its relative data directories (uploads/, crops/) against the backend folder
+    os.chdir(BACKEND_DIR)
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    import app as backend_app
+
+    backend_app.init_models()
+    return backend_app, model_kind
+
+
+def load_workload(workload_dir=None, **kwargs):
+    """
+    Return [(manifest entry, image bytes)] for a workload folder
+    A fresh synthetic workload is generated into a temp folder when none is given
+    """
+    from create_sample_images import create_workload
+
+    if workload_dir is None:
+        workload_dir = tempfile.mkdtemp(prefix='deepfake_workload_')
+        create_workload(workload_dir, **kwargs)
+    with open(os.path.join(workload_dir, 'manifest.json')) as f:
+        manifest = json.load(f)
+    items = []
+    for entry in manifest:
+        with open(os.path.join(workload_dir, entry['file']), 'rb') as f:
+            items.append((entry, f.read()))
+    return items
+
+
+def high_water_rss_mb():
+    """Peak resident set size of this process in MB (VmHWM on Linux, ru_maxrss elsewhere)"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, KB on Linux
+    return peak / (1024.0 * 1024.0) if sys.platform == 'darwin' else peak / 1024.0
+
+
+def time_calls(fn, repeats=50, warmup=3):
+    """Call fn repeatedly and return per-call latency statistics in milliseconds"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return summarize(samples)
+
+
+def summarize(samples_ms):
+    """Mean and percentile summary of latency samples in milliseconds"""
+    samples = np.asarray(samples_ms, dtype=np.float64)
+    if samples.size == 0:
+        return {'count': 0}
+    return {
+        'count': int(samples.size),
+        'mean_ms': float(samples.mean()),
+        'p50_ms': float(np.percentile(samples, 50)),
+        'p95_ms': float(np.percentile(samples, 95)),
+        'p99_ms': float(np.percentile(samples, 99)),
+        'min_ms': float(samples.min()),
+        'max_ms': float(samples.max())
+    }
+
+
+def git_commit():
+    """Current commit hash so results can be compared across commits"""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return 'unknown'
+
+
+def save_results(name, results, output=None):
+    """Write benchmark results as JSON tagged with commit, host and timestamp"""
+    payload = {
+        'benchmark': name,
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'results': results
+    }
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{name}-{payload['commit']}.json")
+    with open(output, 'w') as f:
+        json.dump(payload, f, indent=2)
+    print(f"📁 Results saved to {output}")
+    return output
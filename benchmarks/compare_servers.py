@@ -0,0 +1,254 @@
+"""
+Server Comparison
+Runs the HTTP load test against gunicorn (gthread, gunicorn.conf.py) and uvicorn (asgi:app) with optional slow-upload clients, and reports throughput, tail latency, server RSS and CPU
+"""
+
+import argparse
+import logging
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+from common import BACKEND_DIR, configure_backend_env, load_workload, save_results
+from load_test import run_level
+
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+
+def server_command(server, port, workers):
+    """Command line that serves the app on 127.0.0.1:port"""
+    if server == 'gunicorn':
+        return [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f"127.0.0.1:{port}",
+                '--workers', str(workers)]
+    return [sys.executable, '-m', 'uvicorn', 'asgi:app', '--host', '127.0.0.1', '--port', str(port),
+            '--workers', str(workers), '--no-access-log']
+
+
+def wait_healthy(url, process, timeout):
+    """Poll /api/health until the server answers (models loaded)"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            with urllib.request.urlopen(f"{url}/api/health", timeout=5) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            pass
+        time.sleep(1)
+    raise RuntimeError(f"Server at {url} not healthy after {timeout}s")
+
+
+def process_tree(root_pid):
+    """PIDs of root_pid and all its descendants (Linux /proc)"""
+    parents = {}
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat") as f:
+                # The command name may contain spaces; fields after it are fixed
+                fields = f.read().rsplit(')', 1)[1].split()
+            parents.setdefault(int(fields[1]), []).append(int(name))
+        except (OSError, IndexError):
+            continue
+    pids, stack = [], [root_pid]
+    while stack:
+        pid = stack.pop()
+        pids.append(pid)
+        stack.extend(parents.get(pid, []))
+    return pids
+
+
+def tree_usage(root_pid):
+    """(RSS in MB, CPU seconds) summed over the server's process tree"""
+    rss_kb, ticks = 0, 0
+    for pid in process_tree(root_pid):
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            ticks += int(fields[11]) + int(fields[12])
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        rss_kb += int(line.split()[1])
+        except (OSError, IndexError):
+            continue
+    return rss_kb / 1024.0, ticks / CLOCK_TICKS
+
+
+class UsageSampler:
+    """Samples the server tree's RSS in the background; reports the peak and CPU seconds used"""
+
+    def __init__(self, root_pid, interval=0.2):
+        self.root_pid = root_pid
+        self.interval = interval
+        self.peak_rss_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_rss_mb = max(self.peak_rss_mb, tree_usage(self.root_pid)[0])
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._cpu_start = tree_usage(self.root_pid)[1]
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        rss, cpu = tree_usage(self.root_pid)
+        self.peak_rss_mb = max(self.peak_rss_mb, rss)
+        self.cpu_seconds = cpu - self._cpu_start
+
+
+class SlowUploaders:
+    """
+    Clients that upload an image at a few hundred bytes per second and reconnect when done
+    Each holds a server connection (and, for a threaded server, a thread) for the whole upload
+    """
+
+    def __init__(self, port, count, body, rate):
+        self.port = port
+        self.count = count
+        self.body = body
+        self.rate = rate
+        self.completed = 0
+        self._stop = threading.Event()
+        self._threads = [threading.Thread(target=self._run, daemon=True) for _ in range(count)]
+
+    def _upload(self):
+        boundary = 'slowuploadboundary'
+        body = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"slow.jpg\"\r\n"
+                f"Content-Type: image/jpeg\r\n\r\n").encode() + self.body + f"\r\n--{boundary}--\r\n".encode()
+        with socket.create_connection(('127.0.0.1', self.port), timeout=60) as sock:
+            sock.sendall((f"POST /api/predict?crop=none HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n"
+                          f"Content-Type: multipart/form-data; boundary={boundary}\r\n"
+                          f"Content-Length: {len(body)}\r\n\r\n").encode())
+            step = max(1, self.rate // 10)
+            for offset in range(0, len(body), step):
+                if self._stop.is_set():
+                    return
+                sock.sendall(body[offset:offset + step])
+                time.sleep(0.1)
+            sock.recv(65536)
+            self.completed += 1
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._upload()
+            except OSError:
+                time.sleep(0.1)
+
+    def __enter__(self):
+        for thread in self._threads:
+            thread.start()
+        # Let every slow client get its connection accepted before measuring
+        time.sleep(1.0 if self.count else 0)
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+
+
+def run_server(server, port, workers, workload, args):
+    """Start one server, run every concurrency level against it and stop it"""
+    url = f"http://127.0.0.1:{port}"
+    process = subprocess.Popen(server_command(server, port, workers), cwd=BACKEND_DIR,
+                               stdout=subprocess.DEVNULL, stderr=None if args.verbose else subprocess.DEVNULL)
+    levels = []
+    try:
+        wait_healthy(url, process, args.startup_timeout)
+        idle_rss, _ = tree_usage(process.pid)
+        run_level(None, workload, 'predict', 1, 2, 0, 1, url=url)
+        for concurrency in args.levels:
+            with SlowUploaders(port, args.slow_clients, workload[0][1], args.slow_rate) as slow, \
+                    UsageSampler(process.pid) as usage:
+                level = run_level(None, workload, args.endpoint, concurrency, args.requests, args.duration,
+                                  args.batch_size, url=url)
+            level.pop('peak_rss_mb')
+            level.pop('peak_rss_growth_mb')
+            level.pop('peak_rss_reset')
+            level.update({
+                'slow_clients': args.slow_clients,
+                'slow_uploads_completed': slow.completed,
+                'server_peak_rss_mb': usage.peak_rss_mb,
+                'server_cpu_seconds': usage.cpu_seconds,
+                'server_cpu_per_request_ms': usage.cpu_seconds * 1000.0 / level['requests'] if level['requests'] else None
+            })
+            levels.append(level)
+            latency = level['latency']
+            print(f"{server:<8} | {concurrency:>4} | {level['requests']:>5} | {level['errors']:>6} | "
+                  f"{level['requests_per_second']:>7.1f} | {latency['p50_ms']:>8.1f} | {latency['p99_ms']:>8.1f} | "
+                  f"{usage.peak_rss_mb:>6.0f} MB | {usage.cpu_seconds:>7.1f}")
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    return {'command': ' '.join(server_command(server, port, workers)), 'idle_rss_mb': idle_rss, 'levels': levels}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--servers', default='gunicorn,uvicorn', help='Comma-separated: gunicorn, uvicorn')
+    parser.add_argument('--workers', type=int, default=1, help='Server processes for both servers')
+    parser.add_argument('--endpoint', choices=('predict', 'batch-predict'), default='predict')
+    parser.add_argument('--concurrency', default='1,4,16', help='Comma-separated concurrency levels')
+    parser.add_argument('--requests', type=int, default=64, help='Requests per concurrency level')
+    parser.add_argument('--duration', type=float, default=0,
+                        help='Seconds per concurrency level (overrides --requests when set)')
+    parser.add_argument('--batch-size', type=int, default=4, help='Images per /api/batch-predict request')
+    parser.add_argument('--slow-clients', type=int, default=0,
+                        help='Concurrent slow uploads running alongside every level')
+    parser.add_argument('--slow-rate', type=int, default=2000, help='Bytes per second of each slow upload')
+    parser.add_argument('--workload', default=None, help='Folder written by create_sample_images.py --workload')
+    parser.add_argument('--face-source', default=None, help='Photo pasted as the faces of a generated workload')
+    parser.add_argument('--port', type=int, default=5071, help='First port; each server gets the next one')
+    parser.add_argument('--startup-timeout', type=int, default=180)
+    parser.add_argument('--verbose', action='store_true', help='Show server logs')
+    parser.add_argument('--output', default=None, help='JSON output path')
+    args = parser.parse_args()
+    args.levels = [int(level) for level in args.concurrency.split(',') if level.strip()]
+
+    model_kind = configure_backend_env()
+    # Servers inherit the environment; the same worker count sizes both servers' thread pools
+    os.environ['WEB_CONCURRENCY'] = str(args.workers)
+    workload = load_workload(args.workload, face_source=args.face_source)
+    logging.getLogger('app').setLevel(logging.ERROR)
+
+    results = {
+        'model': model_kind,
+        'endpoint': args.endpoint,
+        'workers': args.workers,
+        'gunicorn_threads': int(os.environ.get('GUNICORN_THREADS', 4)),
+        'asgi_threads': int(os.environ.get('ASGI_THREADS', 0)) or max(4, os.cpu_count() or 1),
+        'slow_clients': args.slow_clients,
+        'slow_rate': args.slow_rate,
+        'cpu_count': os.cpu_count(),
+        'servers': {}
+    }
+
+    print(f"{'server':<8} | {'conc':>4} | {'reqs':>5} | {'errors':>6} | {'req/s':>7} | {'p50 ms':>8} | "
+          f"{'p99 ms':>8} | {'peak RSS':>9} | {'CPU s':>7}")
+    print('-' * 88)
+    for offset, server in enumerate(name.strip() for name in args.servers.split(',') if name.strip()):
+        results['servers'][server] = run_server(server, args.port + offset, args.workers, workload, args)
+
+    save_results('server_comparison', results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+"""
+Load Test
+Drives the Flask app through test clients (or a running server over HTTP with --url) at configurable concurrency and reports throughput, latency percentiles and peak RSS
+"""
+
+import argparse
+import http.client
+import io
+import itertools
+import logging
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit
+
+from common import high_water_rss_mb, import_backend_app, load_workload, save_results, summarize
+
+
+SHED_STATUSES = (429, 503, 504)
+
+
+def reset_peak_rss():
+    """Reset VmHWM so each concurrency level reports its own peak (Linux only; no-op elsewhere)"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+class HttpResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class HttpClient:
+    """
+    Keep-alive HTTP client with the test client's post() signature, so make_request can drive a real server
+    Multipart bodies are built in memory; the connection is reopened after a server-side close
+    """
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.connection = None
+
+    def post(self, path, data, content_type='multipart/form-data', headers=None):
+        boundary = uuid.uuid4().hex
+        body = io.BytesIO()
+        for field, values in data.items():
+            for stream, filename in values if isinstance(values, list) else [values]:
+                body.write(f"--{boundary}\r\nContent-Disposition: form-data; name=\"{field}\"; "
+                           f"filename=\"{filename}\"\r\nContent-Type: application/octet-stream\r\n\r\n".encode())
+                body.write(stream.read())
+                body.write(b'\r\n')
+        body.write(f"--{boundary}--\r\n".encode())
+        headers = {**(headers or {}), 'Content-Type': f"{content_type}; boundary={boundary}"}
+
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=300)
+            try:
+                self.connection.request('POST', path, body=body.getvalue(), headers=headers)
+                response = self.connection.getresponse()
+                response.read()
+                if response.will_close:
+                    self.close()
+                return HttpResponse(response.status)
+            except (http.client.RemoteDisconnected, ConnectionError):
+                self.close()
+                if attempt:
+                    raise
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def make_request(client, endpoint, items, batch_size, deadline_ms=None):
+    """POST one request and return its status code"""
+    headers = {'X-Request-Timeout-Ms': str(deadline_ms)} if deadline_ms else {}
+    if endpoint == 'predict':
+        entry, data = next(items)
+        payload = {'file': (io.BytesIO(data), entry['file'])}
+        return client.post('/api/predict?crop=none', data=payload, content_type='multipart/form-data',
+                           headers=headers).status_code
+
+    files = []
+    for _ in range(batch_size):
+        entry, data = next(items)
+        files.append((io.BytesIO(data), entry['file']))
+    response = client.post('/api/batch-predict?crop=none', data={'files': files},
+                           content_type='multipart/form-data', headers=headers)
+    return response.status_code
+
+
+def run_level(flask_app, workload, endpoint, concurrency, total_requests, duration, batch_size, url=None,
+              deadline_ms=None):
+    """
+    Run one concurrency level until total_requests are sent or duration seconds pass
+    With url, requests go over HTTP to that server and flask_app is unused; peak RSS is then this process's only
+    """
+    latencies = []
+    answered = []
+    statuses = {}
+    lock = threading.Lock()
+    counter = itertools.count()
+    deadline = time.perf_counter() + duration if duration else None
+
+    def worker(worker_index):
+        client = HttpClient(url) if url else flask_app.test_client()
+        # Each worker walks the workload from a different offset
+        items = itertools.islice(itertools.cycle(workload), worker_index, None)
+        while True:
+            if deadline is not None:
+                if time.perf_counter() >= deadline:
+                    break
+            elif next(counter) >= total_requests:
+                break
+            start = time.perf_counter()
+            try:
+                status = make_request(client, endpoint, items, batch_size, deadline_ms)
+            except Exception:
+                status = 'exception'
+            elapsed = (time.perf_counter() - start) * 1000.0
+            with lock:
+                latencies.append(elapsed)
+                if status not in SHED_STATUSES:
+                    answered.append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+        if url:
+            client.close()
+
+    rss_reset = reset_peak_rss()
+    rss_before = high_water_rss_mb()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    completed = len(latencies)
+    # Load shedding (429 / 503 / 504) is expected under overload and reported apart from server errors
+    shed = sum(count for status, count in statuses.items() if status in SHED_STATUSES)
+    # No-face images are answered with 400, so other 4xx are reported apart from server errors
+    rejected = sum(count for status, count in statuses.items()
+                   if status != 'exception' and status not in SHED_STATUSES and 400 <= status < 500)
+    errors = sum(count for status, count in statuses.items()
+                 if status == 'exception' or (status >= 500 and status not in SHED_STATUSES))
+    images = completed * (batch_size if endpoint == 'batch-predict' else 1)
+    return {
+        'concurrency': concurrency,
+        'requests': completed,
+        'rejected': rejected,
+        'shed': shed,
+        'errors': errors,
+        'status_codes': {str(status): count for status, count in statuses.items()},
+        'wall_seconds': wall,
+        'requests_per_second': completed / wall if wall else 0.0,
+        # Shed requests come back at once and the client retries, so goodput is the rate that matters under overload
+        'answered_per_second': len(answered) / wall if wall else 0.0,
+        'images_per_second': images / wall if wall else 0.0,
+        'latency': summarize(latencies),
+        'answered_latency': summarize(answered),
+        'peak_rss_mb': high_water_rss_mb(),
+        'peak_rss_growth_mb': high_water_rss_mb() - rss_before,
+        'peak_rss_reset': rss_reset
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--endpoint', choices=('predict', 'batch-predict'), default='predict')
+    parser.add_argument('--concurrency', default='1,2,4,8', help='Comma-separated concurrency levels')
+    parser.add_argument('--requests', type=int, default=64, help='Requests per concurrency level')
+    parser.add_argument('--duration', type=float, default=0,
+                        help='Seconds per concurrency level (overrides --requests when set)')
+    parser.add_argument('--batch-size', type=int, default=4, help='Images per /api/batch-predict request')
+    parser.add_argument('--workload', default=None, help='Folder written by create_sample_images.py --workload '
+                                                         '(default: generate one into a temp folder)')
+    parser.add_argument('--url', default=None, help='Load a running server instead (e.g. http://127.0.0.1:5000)')
+    parser.add_argument('--face-source', default=None, help='Photo pasted as the faces of a generated workload')
+    parser.add_argument('--deadline-ms', type=float, default=None, help='X-Request-Timeout-Ms sent with every request')
+    parser.add_argument('--cache', action='store_true', help='Enable the prediction cache and pHash index')
+    parser.add_argument('--verbose', action='store_true', help='Keep the per-request app log lines')
+    parser.add_argument('--output', default=None, help='JSON output path')
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(',') if level.strip()]
+    if args.url:
+        flask_app, model_kind, backend = None, 'server', None
+    else:
+        backend_app, model_kind = import_backend_app(cache=args.cache)
+        flask_app, backend = backend_app.app, backend_app.app.config['INFERENCE_BACKEND']
+    workload = load_workload(args.workload, face_source=args.face_source)
+    if not args.verbose:
+        logging.getLogger('app').setLevel(logging.ERROR)
+
+    # Warm up detector, model and buffer pools outside the measured runs
+    run_level(flask_app, workload, args.endpoint, 1, 2, 0, args.batch_size, url=args.url)
+
+    results = {
+        'model': model_kind,
+        'backend': backend,
+        'url': args.url,
+        'endpoint': args.endpoint,
+        'batch_size': args.batch_size if args.endpoint == 'batch-predict' else 1,
+        'workload_images': len(workload),
+        'cache': args.cache,
+        'deadline_ms': args.deadline_ms,
+        'levels': []
+    }
+
+    print(f"{'conc':>4} | {'reqs':>5} | {'4xx':>5} | {'shed':>5} | {'errors':>6} | {'req/s':>7} | {'img/s':>7} | "
+          f"{'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8} | {'peak RSS':>9}")
+    print('-' * 104)
+    for concurrency in levels:
+        level = run_level(flask_app, workload, args.endpoint, concurrency,
+                          args.requests, args.duration, args.batch_size, url=args.url, deadline_ms=args.deadline_ms)
+        results['levels'].append(level)
+        latency = level['latency']
+        print(f"{concurrency:>4} | {level['requests']:>5} | {level['rejected']:>5} | {level['shed']:>5} | "
+              f"{level['errors']:>6} | "
+              f"{level['requests_per_second']:>7.1f} | {level['images_per_second']:>7.1f} | "
+              f"{latency['p50_ms']:>8.1f} | {latency['p95_ms']:>8.1f} | {latency['p99_ms']:>8.1f} | "
+              f"{level['peak_rss_mb']:>6.0f} MB")
+
+    save_results('load_test', results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,18 @@
 """
 Sample Image Generator for Deepfake Detection Testing
-Creates simple synthetic images for testing the detection system
+Creates simple synthetic images for testing the detection system, and varied workloads for the benchmarks
 """
 
 from PIL import Image, ImageDraw, ImageFont
+import argparse
+import json
 import os
 import random
 
+# Workload defaults: phone-sized photos down to thumbnails, zero to several faces
+WORKLOAD_SIZES = [(320, 240), (640, 480), (1280, 960), (1920, 1080), (4032, 3024)]
+WORKLOAD_FACE_COUNTS = [0, 1, 2, 4]
+
 def create_sample_images():
     """Generate sample images for testing"""
 
@@ -69,5 +75,102 @@ def create_sample_images():
     print("📁 Check the test_images/ folder for generated images")
     print("🧪 Use these images to test your deepfake detection model")
 
+def draw_face(draw, box, skin=(220, 190, 160)):
+    """Draw the simple face from create_sample_images() scaled into box (x0, y0, x1, y1)"""
+    x0, y0, x1, y1 = box
+    w, h = x1 - x0, y1 - y0
+
+    def point(fx, fy):
+        return (x0 + fx * w, y0 + fy * h)
+
+    draw.ellipse([x0, y0, x1, y1], fill=skin)
+    draw.ellipse([*point(0.26, 0.38), *point(0.38, 0.51)], fill=(255, 255, 255))
+    draw.ellipse([*point(0.62, 0.38), *point(0.74, 0.51)], fill=(255, 255, 255))
+    draw.ellipse([*point(0.29, 0.42), *point(0.35, 0.48)], fill=(0, 0, 0))
+    draw.ellipse([*point(0.65, 0.42), *point(0.71, 0.48)], fill=(0, 0, 0))
+    draw.polygon([point(0.5, 0.58), point(0.47, 0.71), point(0.53, 0.71)], fill=(200, 170, 140))
+    draw.arc([*point(0.38, 0.74), *point(0.62, 0.86)], start=0, end=180, fill=(150, 50, 50),
+             width=max(1, int(w / 100)))
+
+
+def create_workload(output_dir, sizes=None, face_counts=None, per_combination=2, face_source=None, seed=42):
+    """
+    Generate a synthetic benchmark workload: every (size, face count) combination, per_combination times
+    face_source is an optional photo whose pixels are pasted as faces (real faces make MTCNN fire);
+    otherwise drawn faces are used. Writes manifest.json next to the images and returns its entries.
+    """
+    sizes = sizes or WORKLOAD_SIZES
+    face_counts = WORKLOAD_FACE_COUNTS if face_counts is None else face_counts
+    rng = random.Random(seed)
+    source = Image.open(face_source).convert('RGB') if face_source else None
+    os.makedirs(output_dir, exist_ok=True)
+
+    manifest = []
+    for width, height in sizes:
+        for faces in face_counts:
+            for index in range(per_combination):
+                background = tuple(rng.randint(60, 200) for _ in range(3))
+                img = Image.new('RGB', (width, height), color=background)
+                draw = ImageDraw.Draw(img)
+
+                # Texture so JPEG sizes and decode times resemble photos rather than flat fills
+                for _ in range(40):
+                    x, y = rng.randrange(width), rng.randrange(height)
+                    r = rng.randint(2, max(3, min(width, height) // 10))
+                    draw.ellipse([x - r, y - r, x + r, y + r], fill=tuple(rng.randint(0, 255) for _ in range(3)))
+
+                # Faces sit side by side, each up to a third of the short edge
+                boxes = []
+                side = max(16, min(height // 3, width // max(1, faces) - 8))
+                for slot in range(faces):
+                    x0 = slot * (width // max(1, faces)) + rng.randint(0, max(0, width // max(1, faces) - side))
+                    y0 = rng.randint(0, height - side)
+                    box = (x0, y0, x0 + side, y0 + side)
+                    if source is not None:
+                        img.paste(source.resize((side, side)), box[:2])
+                    else:
+                        draw_face(draw, box)
+                    boxes.append(list(box))
+
+                filename = f"workload_{width}x{height}_{faces}faces_{index}.jpg"
+                img.save(os.path.join(output_dir, filename), quality=90)
+                manifest.append({
+                    'file': filename,
+                    'width': width,
+                    'height': height,
+                    'faces': faces,
+                    'face_boxes': boxes
+                })
+
+    with open(os.path.join(output_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    print(f"✅ Created {len(manifest)} workload images in {output_dir}")
+    return manifest
+
+
+def parse_sizes(value):
+    return [tuple(int(v) for v in size.lower().split('x')) for size in value.split(',')]
+
+
 if __name__ == "__main__":
-    create_sample_images()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workload', metavar='DIR', help='Generate a benchmark workload into DIR instead')
+    parser.add_argument('--sizes', type=parse_sizes, default=None,
+                        help='Comma-separated WxH sizes (default: 320x240 ... 4032x3024)')
+    parser.add_argument('--faces', default=None, help='Comma-separated face counts (default: 0,1,2,4)')
+    parser.add_argument('--per-combination', type=int, default=2)
+    parser.add_argument('--face-source', default=None, help='Photo pasted in as each face')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    if args.workload:
+        create_workload(
+            args.workload,
+            sizes=args.sizes,
+            face_counts=[int(v) for v in args.faces.split(',')] if args.faces else None,
+            per_combination=args.per_combination,
+            face_source=args.face_source,
+            seed=args.seed
+        )
+    else:
+        create_sample_images()
\ No newline at end of file
@@ -0,0 +1,182 @@
+"""
+Archive Input
+Iterates the image members of a ZIP or TAR (plain, gzip, bz2 or xz) archive in archive order as bytes, without extracting anything to disk
+"""
+
+import os
+import shutil
+import tarfile
+import tempfile
+import zipfile
+
+from folder_inference import IMAGE_EXTENSIONS
+
+ARCHIVE_EXTENSIONS = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+ZIP_MAGIC = (b'PK\x03\x04', b'PK\x05\x06')
+
+
+def is_archive_path(path):
+    """True for file names with a ZIP or TAR extension"""
+    return path.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+class _Prefixed:
+    """Read-only stream that returns already consumed `head` bytes before the rest of `stream`"""
+
+    def __init__(self, head, stream):
+        self._head = head
+        self._stream = stream
+
+    def read(self, size=-1):
+        if not self._head:
+            return self._stream.read(size)
+        if size is None or size < 0:
+            data, self._head = self._head + self._stream.read(), b''
+            return data
+        data, self._head = self._head[:size], self._head[size:]
+        if len(data) < size:
+            data += self._stream.read(size - len(data))
+        return data
+
+
+class ArchiveReader:
+    """
+    Iterate (name, data, error) for the image members of an archive
+
+    The source is a path or a binary stream. TAR archives (compressed or not)
+    are read strictly front to back, so a TAR stream is processed while it is
+    still arriving. ZIP keeps its index at the end of the file, so a ZIP
+    stream is first copied into a spooled temporary file (kept in memory up to
+    spool_max_memory bytes); members are then read straight out of it. Only
+    one member's bytes are held at a time.
+
+    Directories, links and files without an image extension are skipped and
+    counted in `skipped`. Members larger than max_member_size bytes are
+    yielded with an error instead of data. Raises ValueError when the source
+    is not a readable ZIP or TAR archive.
+    """
+
+    def __init__(self, source, extensions=IMAGE_EXTENSIONS, max_member_size=None, max_members=None,
+                 spool_max_memory=8 * 1024 * 1024):
+        self.extensions = tuple(extensions)
+        self.max_member_size = max_member_size
+        self.max_members = max_members
+        self.spool_max_memory = spool_max_memory
+        self.skipped = 0
+        self.members = 0
+        self.kind = None
+
+        self._owned = []
+        if isinstance(source, (str, os.PathLike)):
+            source = open(source, 'rb')
+            self._owned.append(source)
+        head = source.read(4)
+        self.kind = 'zip' if head in ZIP_MAGIC else 'tar'
+        if self.kind == 'zip' and getattr(source, 'seekable', lambda: False)():
+            source.seek(-len(head), os.SEEK_CUR)
+            self._stream = source
+        else:
+            self._stream = _Prefixed(head, source)
+            if self.kind == 'zip':
+                self._stream = self._spool(self._stream)
+        try:
+            self._archive = self._open()
+        except ValueError:
+            self.close()
+            raise
+
+    def _spool(self, stream):
+        spool = tempfile.SpooledTemporaryFile(max_size=self.spool_max_memory)
+        self._owned.append(spool)
+        shutil.copyfileobj(stream, spool, 1024 * 1024)
+        spool.seek(0)
+        return spool
+
+    def _wanted(self, name):
+        basename = os.path.basename(name)
+        # Skip macOS resource forks (__MACOSX/, ._name) that carry an image extension
+        if name.startswith('__MACOSX/') or basename.startswith('._'):
+            return False
+        return os.path.splitext(basename)[1].lower() in self.extensions
+
+    def _too_large(self, size):
+        if self.max_member_size and size > self.max_member_size:
+            return f"Member larger than {self.max_member_size} bytes"
+        return None
+
+    def _read_limited(self, f, name):
+        """Member bytes, or an error when the real size exceeds the limit (sizes in headers can lie)"""
+        limit = self.max_member_size
+        data = f.read(limit + 1) if limit else f.read()
+        if limit and len(data) > limit:
+            return name, None, self._too_large(len(data))
+        return name, data, None
+
+    def _count(self):
+        self.members += 1
+        if self.max_members and self.members > self.max_members:
+            raise ValueError(f"Archive has more than {self.max_members} images")
+
+    def _open(self):
+        if self.kind == 'zip':
+            try:
+                return zipfile.ZipFile(self._stream)
+            except zipfile.BadZipFile as e:
+                raise ValueError(f"Not a readable ZIP archive: {str(e)}") from None
+        try:
+            return tarfile.open(fileobj=self._stream, mode='r|*')
+        except tarfile.TarError as e:
+            raise ValueError(f"Not a ZIP or TAR archive: {str(e)}") from None
+
+    def _iter_zip(self):
+        for info in self._archive.infolist():
+            if info.is_dir() or not self._wanted(info.filename):
+                self.skipped += not info.is_dir()
+                continue
+            self._count()
+            error = self._too_large(info.file_size)
+            if error:
+                yield info.filename, None, error
+                continue
+            try:
+                with self._archive.open(info) as f:
+                    item = self._read_limited(f, info.filename)
+            except (RuntimeError, NotImplementedError, zipfile.BadZipFile, OSError) as e:
+                # Encrypted, unsupported compression or corrupt member
+                item = info.filename, None, str(e)
+            yield item
+
+    def _iter_tar(self):
+        members = iter(self._archive)
+        while True:
+            try:
+                member = next(members, None)
+                if member is None:
+                    return
+                if not member.isfile() or not self._wanted(member.name):
+                    self.skipped += member.isfile()
+                    continue
+                self._count()
+                error = self._too_large(member.size)
+                item = (member.name, None, error) if error else \
+                    self._read_limited(self._archive.extractfile(member), member.name)
+            except (tarfile.TarError, EOFError, OSError) as e:
+                raise ValueError(f"Truncated or corrupt TAR archive: {str(e)}") from None
+            yield item
+
+    def __iter__(self):
+        return self._iter_zip() if self.kind == 'zip' else self._iter_tar()
+
+    def close(self):
+        if getattr(self, '_archive', None) is not None:
+            self._archive.close()
+            self._archive = None
+        for f in self._owned:
+            f.close()
+        self._owned = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
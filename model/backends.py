@@ -0,0 +1,140 @@
+"""
+Pluggable Inference Backends for the Deepfake Detection Model
+Keras (compiled InferenceSession), TFLite and ONNX Runtime behind one predict() interface
+"""
+
+import os
+import threading
+
+import numpy as np
+
+from preprocessing import BufferPool, as_float_input
+
+
+IMG_SIZE = 224
+SAVED_MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'saved_models')
+KERAS_MODEL_NAME = 'deepfake_detector_efficientnet.h5'
+BACKENDS = ('keras', 'tflite', 'onnx')
+
+# Artifact names written by export_model.py
+ARTIFACT_NAMES = {
+    ('tflite', 'float16'): 'deepfake_detector_fp16.tflite',
+    ('tflite', 'int8'): 'deepfake_detector_int8.tflite',
+    ('onnx', 'float32'): 'deepfake_detector.onnx',
+    ('onnx', 'int8'): 'deepfake_detector_int8.onnx'
+}
+
+
+def default_model_path(backend, precision=None, models_dir=SAVED_MODELS_DIR):
+    """Default artifact location for a backend/precision pair"""
+    if backend == 'keras':
+        return os.path.join(models_dir, KERAS_MODEL_NAME)
+    if precision is None:
+        precision = 'int8' if backend == 'tflite' else 'float32'
+    return os.path.join(models_dir, ARTIFACT_NAMES[(backend, precision)])
+
+
+class TFLiteBackend:
+    """TFLite interpreter; the batch dimension is resized on demand"""
+
+    name = 'tflite'
+
+    def __init__(self, path, num_threads=None):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+
+        self.path = path
+        self._interpreter = Interpreter(model_path=path, num_threads=num_threads)
+        self._interpreter.allocate_tensors()
+        self._input = self._interpreter.get_input_details()[0]
+        self._output = self._interpreter.get_output_details()[0]
+        self._batch_size = int(self._input['shape'][0])
+        # The interpreter holds mutable tensor buffers and is not thread-safe
+        self._lock = threading.Lock()
+        self._float_pool = BufferPool((IMG_SIZE, IMG_SIZE, 3), np.float32)
+
+    def _resize(self, batch_size):
+        if batch_size != self._batch_size:
+            self._interpreter.resize_tensor_input(
+                self._input['index'], [batch_size, IMG_SIZE, IMG_SIZE, 3]
+            )
+            self._interpreter.allocate_tensors()
+            self._input = self._interpreter.get_input_details()[0]
+            self._output = self._interpreter.get_output_details()[0]
+            self._batch_size = batch_size
+
+    def predict(self, batch):
+        """Score a (N, H, W, 3) float32 or uint8 batch and return an (N,) array of raw scores"""
+        with self._lock:
+            batch = as_float_input(batch, self._float_pool)
+            self._resize(len(batch))
+
+            # Fully integer models expect quantized inputs
+            if self._input['dtype'] != np.float32:
+                scale, zero_point = self._input['quantization']
+                batch = np.round(batch / scale + zero_point).astype(self._input['dtype'])
+
+            self._interpreter.set_tensor(self._input['index'], batch)
+            self._interpreter.invoke()
+            output = self._interpreter.get_tensor(self._output['index'])
+
+            if self._output['dtype'] != np.float32:
+                scale, zero_point = self._output['quantization']
+                output = (output.astype(np.float32) - zero_point) * scale
+
+        return output.reshape(len(batch), -1)[:, 0]
+
+
+class OnnxBackend:
+    """ONNX Runtime session on the CPU execution provider"""
+
+    name = 'onnx'
+
+    def __init__(self, path, num_threads=None):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.path = path
+        self._session = ort.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        self._input_name = self._session.get_inputs()[0].name
+        self._float_pool = BufferPool((IMG_SIZE, IMG_SIZE, 3), np.float32)
+
+    def predict(self, batch):
+        """Score a (N, H, W, 3) float32 or uint8 batch and return an (N,) array of raw scores"""
+        batch = as_float_input(batch, self._float_pool)
+        output = self._session.run(None, {self._input_name: batch})[0]
+        return np.asarray(output).reshape(len(batch), -1)[:, 0]
+
+
+def load_backend(backend='keras', path=None, img_size=IMG_SIZE, buckets=None, num_threads=None,
+                 fold_normalization=False):
+    """
+    Load a model for inference with the chosen backend
+    Every backend returns an object with predict(batch) -> (N,) raw scores
+    fold_normalization (Keras only) moves the uint8 -> [0, 1] scaling into the traced graph
+    """
+    backend = backend.lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}'. Choose from: {', '.join(BACKENDS)}")
+
+    path = path or default_model_path(backend)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Model artifact not found: {path}")
+
+    if backend == 'tflite':
+        return TFLiteBackend(path, num_threads=num_threads)
+    if backend == 'onnx':
+        return OnnxBackend(path, num_threads=num_threads)
+
+    from tensorflow import keras
+    from inference_session import DEFAULT_BUCKETS, InferenceSession
+
+    session = InferenceSession(keras.models.load_model(path), img_size=img_size, buckets=buckets or DEFAULT_BUCKETS,
+                               fold_normalization=fold_normalization)
+    session.path = path
+    return session
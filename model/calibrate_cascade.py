@@ -0,0 +1,141 @@
+"""
+Cascade Band Calibration
+Scores labelled face crops with the cheap and expensive models, picks the uncertainty band that meets an accuracy target with the fewest escalations, and reports the per-face cost
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+from PIL import Image
+
+from backends import BACKENDS, SAVED_MODELS_DIR, default_model_path, load_backend
+from cascade import DEFAULT_BAND, band_table, calibrate_band
+from face_store import FaceStore, is_face_store
+from preprocessing import IMG_SIZE, resize_into
+
+CHEAP_MODEL_NAME = 'deepfake_detector_cheap.h5'
+CALIBRATION_NAME = 'cascade_calibration.json'
+
+
+def load_labeled_crops(source, limit=None, seed=42):
+    """
+    (uint8 crops, labels, class names) from a FaceStore or a class-folder dataset of face crops
+    A random subset of `limit` crops is taken when the source holds more
+    """
+    images, paths = None, None
+    if is_face_store(source):
+        store = FaceStore(source)
+        images, labels, class_names = store.images, store.labels, store.class_names
+    else:
+        from training_data import list_labeled_files
+
+        paths, labels, class_names = list_labeled_files(source)
+        labels = np.asarray(labels)
+    indices = np.arange(len(labels))
+    if not len(indices):
+        raise FileNotFoundError(f"No labelled images found in {source}")
+
+    if limit and len(indices) > limit:
+        indices = np.sort(np.random.default_rng(seed).choice(len(indices), limit, replace=False))
+
+    crops = np.empty((len(indices), IMG_SIZE, IMG_SIZE, 3), dtype=np.uint8)
+    for slot, index in enumerate(indices):
+        if images is not None:
+            crops[slot] = images[index]
+        else:
+            with Image.open(paths[index]) as img:
+                resize_into(np.asarray(img.convert('RGB')), crops[slot])
+    return crops, labels[indices], class_names
+
+
+def score_all(predictor, crops, batch_size):
+    """Scores for every crop and the model's seconds per face (first batch excluded as warmup)"""
+    scores = np.empty(len(crops), dtype=np.float32)
+    timed_seconds, timed_faces = 0.0, 0
+    for index, start in enumerate(range(0, len(crops), batch_size)):
+        batch = crops[start:start + batch_size]
+        begin = time.perf_counter()
+        scores[start:start + len(batch)] = np.asarray(predictor.predict(batch)).reshape(-1)
+        if index > 0 or len(crops) <= batch_size:
+            timed_seconds += time.perf_counter() - begin
+            timed_faces += len(batch)
+    return scores, timed_seconds / max(1, timed_faces)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('data', help='FaceStore (extract_faces.py) or class-folder dataset of face crops, '
+                                     'e.g. ../dataset/faces/validation')
+    parser.add_argument('--cheap', default=os.path.join(SAVED_MODELS_DIR, CHEAP_MODEL_NAME),
+                        help='Cheap first-stage model artifact')
+    parser.add_argument('--cheap-backend', choices=BACKENDS, default='keras')
+    parser.add_argument('--expensive', default=None, help='Expensive model artifact (default: the trained .h5)')
+    parser.add_argument('--expensive-backend', choices=BACKENDS, default='keras')
+    parser.add_argument('--target-accuracy', type=float, default=None,
+                        help='Accuracy the cascade must reach (default: expensive accuracy - --max-accuracy-drop)')
+    parser.add_argument('--max-accuracy-drop', type=float, default=0.005,
+                        help='Accuracy the cascade may lose against the expensive model alone')
+    parser.add_argument('--step', type=float, default=0.01, help='Grid step for the band edges')
+    parser.add_argument('--limit', type=int, default=None, help='Calibrate on a random subset of this many crops')
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--output', default=os.path.join(SAVED_MODELS_DIR, CALIBRATION_NAME), help='JSON output path')
+    args = parser.parse_args()
+
+    crops, labels, class_names = load_labeled_crops(args.data, args.limit)
+    if class_names != ['fake', 'real']:
+        print(f"⚠️ Expected classes ['fake', 'real'] (label 1 = real), found {class_names}")
+    print(f"📁 {len(crops)} labelled face crops from {args.data}")
+
+    expensive_path = args.expensive or default_model_path(args.expensive_backend)
+    cheap = load_backend(args.cheap_backend, args.cheap)
+    expensive = load_backend(args.expensive_backend, expensive_path)
+    cheap_scores, cheap_cost = score_all(cheap, crops, args.batch_size)
+    expensive_scores, expensive_cost = score_all(expensive, crops, args.batch_size)
+
+    result = calibrate_band(cheap_scores, expensive_scores, labels, target_accuracy=args.target_accuracy,
+                            max_accuracy_drop=args.max_accuracy_drop, step=args.step)
+    escalation = result['escalation_rate']
+    # Batches of escalated faces are smaller than the cheap model's, so this is a lower bound on the real cost
+    cascade_cost = cheap_cost + escalation * expensive_cost
+    result.update({
+        'cheap_model': os.path.abspath(args.cheap),
+        'cheap_backend': args.cheap_backend,
+        'expensive_model': os.path.abspath(expensive_path),
+        'expensive_backend': args.expensive_backend,
+        'data': os.path.abspath(args.data),
+        'cheap_ms_per_face': cheap_cost * 1000.0,
+        'expensive_ms_per_face': expensive_cost * 1000.0,
+        'cascade_ms_per_face': cascade_cost * 1000.0,
+        'speedup_vs_expensive': expensive_cost / cascade_cost if cascade_cost else None,
+        'bands': band_table(cheap_scores, expensive_scores, labels,
+                            [DEFAULT_BAND, (0.2, 0.8), (0.1, 0.9), tuple(result['band'])])
+    })
+
+    print(f"\n{'band':>12} | {'accuracy':>8} | {'escalated':>9}")
+    print('-' * 36)
+    for row in result['bands']:
+        print(f"{row['band'][0]:>5.2f}-{row['band'][1]:<6.2f} | {row['accuracy']:>8.4f} | {row['escalation_rate']:>8.1%}")
+    print(f"\nCheap accuracy {result['cheap_accuracy']:.4f}, expensive {result['expensive_accuracy']:.4f}, "
+          f"target {result['target_accuracy']:.4f}")
+    if result['met_target']:
+        print(f"✅ Band {result['band'][0]:.2f}-{result['band'][1]:.2f}: accuracy {result['accuracy']:.4f}, "
+              f"{escalation:.1%} of faces escalated")
+    else:
+        print("⚠️ No band meets the target; every face would be escalated")
+    print(f"⏱️ {cheap_cost * 1000:.2f} ms cheap + {escalation:.1%} x {expensive_cost * 1000:.2f} ms expensive "
+          f"= {cascade_cost * 1000:.2f} ms per face ({result['speedup_vs_expensive']:.2f}x vs expensive only)")
+    print(f"\nServe it with:\n  CASCADE=true\n  CASCADE_CHEAP_MODEL_PATH={os.path.abspath(args.cheap)}\n"
+          f"  CASCADE_CHEAP_BACKEND={args.cheap_backend}\n"
+          f"  CASCADE_BAND_LOW={result['band'][0]:.2f}\n  CASCADE_BAND_HIGH={result['band'][1]:.2f}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"📁 Calibration saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
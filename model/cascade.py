@@ -0,0 +1,176 @@
+"""
+Early-Exit Model Cascade
+A cheap model scores every face; only faces whose score falls inside an uncertainty band around 0.5 are re-scored by the expensive model
+"""
+
+import threading
+import time
+
+import numpy as np
+
+
+DEFAULT_BAND = (0.3, 0.7)
+
+
+def escalation_mask(scores, band):
+    """True where a cheap score is inside the (low, high) band, inclusive, and needs the expensive model"""
+    low, high = band
+    scores = np.asarray(scores)
+    return (scores >= low) & (scores <= high)
+
+
+def cascade_scores(cheap_scores, expensive_scores, band):
+    """Scores the cascade would return, given both models' scores for the same faces"""
+    return np.where(escalation_mask(cheap_scores, band), expensive_scores, cheap_scores)
+
+
+class CascadeSession:
+    """
+    Two predictors behind the same predict(batch) -> (N,) raw scores interface
+
+    The whole batch goes through the cheap model. The faces it is unsure about
+    are gathered into one contiguous sub-batch for a single forward pass of the
+    expensive model, and their scores replace the cheap ones. Timings per stage
+    feed stats(): escalation rate and average model seconds per face.
+    """
+
+    name = 'cascade'
+
+    def __init__(self, cheap, expensive, band=DEFAULT_BAND):
+        low, high = float(band[0]), float(band[1])
+        if not 0.0 <= low <= high <= 1.0:
+            raise ValueError(f"Cascade band must satisfy 0 <= low <= high <= 1, got ({low}, {high})")
+        self.cheap = cheap
+        self.expensive = expensive
+        self.band = (low, high)
+        self.path = getattr(expensive, 'path', None)
+        self.warmup_seconds = getattr(expensive, 'warmup_seconds', None)
+
+        self._stats_lock = threading.Lock()
+        self._faces = 0
+        self._escalated = 0
+        self._expensive_calls = 0
+        self._cheap_seconds = 0.0
+        self._expensive_seconds = 0.0
+
+    def predict_with_stages(self, batch):
+        """Raw scores plus a boolean array marking the faces scored by the expensive model"""
+        batch = np.asarray(batch)
+        if batch.ndim == 3:
+            batch = batch[np.newaxis]
+        start = time.perf_counter()
+        scores = np.array(self.cheap.predict(batch), dtype=np.float32).reshape(-1)
+        cheap_seconds = time.perf_counter() - start
+
+        escalated = escalation_mask(scores, self.band)
+        expensive_seconds = 0.0
+        if escalated.any():
+            start = time.perf_counter()
+            # Fancy indexing gathers the uncertain faces into one batch for a single forward pass
+            scores[escalated] = np.asarray(self.expensive.predict(batch[escalated])).reshape(-1)
+            expensive_seconds = time.perf_counter() - start
+
+        with self._stats_lock:
+            self._faces += len(batch)
+            self._escalated += int(escalated.sum())
+            self._expensive_calls += int(escalated.any())
+            self._cheap_seconds += cheap_seconds
+            self._expensive_seconds += expensive_seconds
+        return scores, escalated
+
+    def predict(self, batch):
+        """Score a (N, H, W, 3) batch and return an (N,) array of raw scores"""
+        return self.predict_with_stages(batch)[0]
+
+    def stats(self):
+        """Escalation rate and model seconds per face (cheap stage, expensive stage per escalated face, overall)"""
+        with self._stats_lock:
+            faces, escalated = self._faces, self._escalated
+            return {
+                'band': list(self.band),
+                'cheap_backend': getattr(self.cheap, 'name', type(self.cheap).__name__),
+                'expensive_backend': getattr(self.expensive, 'name', type(self.expensive).__name__),
+                'faces': faces,
+                'escalated': escalated,
+                'escalation_rate': escalated / faces if faces else 0.0,
+                'expensive_calls': self._expensive_calls,
+                'avg_escalated_per_call': escalated / self._expensive_calls if self._expensive_calls else 0.0,
+                'cheap_ms_per_face': self._cheap_seconds * 1000.0 / faces if faces else 0.0,
+                'expensive_ms_per_escalated_face': (self._expensive_seconds * 1000.0 / escalated
+                                                    if escalated else 0.0),
+                'avg_ms_per_face': (self._cheap_seconds + self._expensive_seconds) * 1000.0 / faces if faces else 0.0
+            }
+
+
+def calibrate_band(cheap_scores, expensive_scores, labels, target_accuracy=None, max_accuracy_drop=0.005,
+                   step=0.01):
+    """
+    Narrowest-escalation band whose cascade accuracy meets the target
+
+    The target is target_accuracy if given, else the expensive model's own
+    accuracy minus max_accuracy_drop. Every (low, high) pair on a grid with
+    low <= 0.5 <= high is tried; among those meeting the target the one
+    escalating the fewest faces wins (ties go to higher accuracy, then to
+    the wider band). If none
+    does, the band is (0, 1): every face is escalated.
+    """
+    cheap_scores = np.asarray(cheap_scores, dtype=np.float64)
+    expensive_scores = np.asarray(expensive_scores, dtype=np.float64)
+    labels = np.asarray(labels).astype(bool)
+    count = len(labels)
+    if count == 0:
+        raise ValueError("Calibration needs at least one labelled face")
+
+    cheap_correct = (cheap_scores >= 0.5) == labels
+    expensive_correct = (expensive_scores >= 0.5) == labels
+    expensive_accuracy = float(expensive_correct.mean())
+    target = expensive_accuracy - max_accuracy_drop if target_accuracy is None else float(target_accuracy)
+
+    lows = np.round(np.arange(0.0, 0.5 + step / 2, step), 6)
+    highs = np.round(np.arange(0.5, 1.0 + step / 2, step), 6)
+    best = None
+    for low in lows:
+        # One row per high: memory stays at len(highs) x faces whatever the grid
+        escalated = (cheap_scores[None, :] >= low) & (cheap_scores[None, :] <= highs[:, None])
+        accuracy = np.where(escalated, expensive_correct[None, :], cheap_correct[None, :]).mean(axis=1)
+        escalation_rate = escalated.mean(axis=1)
+        for high, band_accuracy, band_escalation in zip(highs, accuracy, escalation_rate):
+            if band_accuracy < target - 1e-12:
+                continue
+            # Fewest escalations first, then highest accuracy, then the widest (most cautious) band
+            key = (band_escalation, -band_accuracy, low - high)
+            if best is None or key < best[0]:
+                best = (key, (float(low), float(high)), float(band_accuracy), float(band_escalation))
+
+    if best is not None:
+        _, band, band_accuracy, band_escalation = best
+        met = True
+    else:
+        band, met = (0.0, 1.0), False
+        band_accuracy, band_escalation = expensive_accuracy, 1.0
+
+    return {
+        'band': list(band),
+        'met_target': met,
+        'target_accuracy': target,
+        'accuracy': band_accuracy,
+        'escalation_rate': band_escalation,
+        'cheap_accuracy': float(cheap_correct.mean()),
+        'expensive_accuracy': expensive_accuracy,
+        'faces': count
+    }
+
+
+def band_table(cheap_scores, expensive_scores, labels, bands):
+    """Accuracy and escalation rate of the cascade for each band in `bands`"""
+    labels = np.asarray(labels).astype(bool)
+    rows = []
+    for band in bands:
+        escalated = escalation_mask(cheap_scores, band)
+        scores = cascade_scores(cheap_scores, expensive_scores, band)
+        rows.append({
+            'band': [float(band[0]), float(band[1])],
+            'accuracy': float(((scores >= 0.5) == labels).mean()),
+            'escalation_rate': float(escalated.mean())
+        })
+    return rows
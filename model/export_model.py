@@ -0,0 +1,211 @@
+"""
+Quantized Model Export for CPU Serving
+Converts the Keras .h5 model into float16/INT8 TFLite and ONNX artifacts and reports parity, latency and memory
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+from backends import IMG_SIZE, SAVED_MODELS_DIR, default_model_path, load_backend
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def load_face_crops(folder, limit, seed=42):
+    """Load up to `limit` face crops (recursively) as a normalized float32 array"""
+    paths = []
+    for root, _, files in os.walk(folder):
+        paths.extend(os.path.join(root, f) for f in files if f.lower().endswith(IMAGE_EXTENSIONS))
+    if not paths:
+        raise FileNotFoundError(f"No images found in {folder}")
+
+    rng = np.random.default_rng(seed)
+    paths = sorted(paths)
+    if len(paths) > limit:
+        paths = [paths[i] for i in sorted(rng.choice(len(paths), limit, replace=False))]
+
+    crops = np.empty((len(paths), IMG_SIZE, IMG_SIZE, 3), dtype=np.float32)
+    for i, path in enumerate(paths):
+        img = Image.open(path).convert('RGB').resize((IMG_SIZE, IMG_SIZE))
+        crops[i] = np.asarray(img, dtype=np.float32) / 255.0
+    return crops
+
+
+def export_tflite(model, output_path, precision, calibration):
+    """Convert to TFLite with float16 weights or INT8 post-training quantization"""
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+    if precision == 'float16':
+        converter.target_spec.supported_types = [tf.float16]
+    else:
+        # Calibrate activation ranges on real face crops; inputs/outputs stay float32
+        def representative_dataset():
+            for sample in calibration:
+                yield [sample[np.newaxis]]
+
+        converter.representative_dataset = representative_dataset
+
+    with open(output_path, 'wb') as f:
+        f.write(converter.convert())
+    return output_path
+
+
+def export_onnx(model, output_path, precision, calibration, opset=13):
+    """Convert to ONNX with tf2onnx, then optionally apply static INT8 quantization"""
+    import tensorflow as tf
+    import tf2onnx
+
+    fp32_path = default_model_path('onnx', 'float32', os.path.dirname(output_path))
+    signature = (tf.TensorSpec((None, IMG_SIZE, IMG_SIZE, 3), tf.float32, name='input'),)
+    forward = tf.function(lambda x: model(x, training=False))
+    tf2onnx.convert.from_function(forward, input_signature=signature, opset=opset, output_path=fp32_path)
+    if precision == 'float32':
+        return fp32_path
+
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, quantize_static
+
+    class FaceCropReader(CalibrationDataReader):
+        def __init__(self):
+            self._samples = iter(calibration)
+
+        def get_next(self):
+            sample = next(self._samples, None)
+            return None if sample is None else {'input': sample[np.newaxis]}
+
+    quantize_static(fp32_path, output_path, FaceCropReader(), quant_format=QuantFormat.QDQ)
+    return output_path
+
+
+def peak_rss_mb(backend, path):
+    """Peak RSS of a fresh process that loads the backend and scores one sample"""
+    script = (
+        'import sys, resource, numpy as np; sys.path.insert(0, sys.argv[3]);'
+        'from backends import load_backend;'
+        'b = load_backend(sys.argv[1], sys.argv[2]);'
+        'b.predict(np.zeros((1, 224, 224, 3), np.float32));'
+        'print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)'
+    )
+    try:
+        output = subprocess.check_output(
+            [sys.executable, '-c', script, backend, path, os.path.dirname(os.path.abspath(__file__))],
+            stderr=subprocess.DEVNULL
+        )
+        return int(output.decode().strip().splitlines()[-1]) / 1024.0
+    except Exception:
+        return None
+
+
+def latency_ms(predictor, sample, repeats):
+    """Median single-sample latency in milliseconds"""
+    predictor.predict(sample)
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        predictor.predict(sample)
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return float(np.median(samples))
+
+
+def parity_report(reference_scores, scores):
+    """Agreement of a converted model with the Keras raw_score"""
+    diff = np.abs(reference_scores - scores)
+    return {
+        'label_agreement': float(np.mean((reference_scores >= 0.5) == (scores >= 0.5))),
+        'max_abs_diff': float(diff.max()),
+        'mean_abs_diff': float(diff.mean())
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--model', default=default_model_path('keras'), help='Keras .h5 model to export')
+    parser.add_argument('--calibration-dir', default='../dataset/validation',
+                        help='Folder of face crops used for INT8 calibration and parity checks')
+    parser.add_argument('--num-samples', type=int, default=200, help='Number of calibration crops')
+    parser.add_argument('--formats', default='tflite-float16,tflite-int8',
+                        help='Comma-separated targets: tflite-float16, tflite-int8, onnx-float32, onnx-int8')
+    parser.add_argument('--output-dir', default=SAVED_MODELS_DIR)
+    parser.add_argument('--repeats', type=int, default=30, help='Latency repetitions per backend')
+    args = parser.parse_args()
+
+    from tensorflow import keras
+
+    print(f"\n{'='*60}\nExporting {args.model}\n{'='*60}\n")
+    model = keras.models.load_model(args.model)
+
+    try:
+        samples = load_face_crops(args.calibration_dir, args.num_samples)
+        print(f"✅ Loaded {len(samples)} face crops from {args.calibration_dir}")
+    except FileNotFoundError as e:
+        print(f"⚠️ {e}. Falling back to random calibration tensors (quantization quality will suffer).")
+        samples = np.random.default_rng(0).random((args.num_samples, IMG_SIZE, IMG_SIZE, 3), dtype=np.float32)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    keras_backend = load_backend('keras', args.model)
+    reference = keras_backend.predict(samples)
+
+    report = {
+        'source_model': args.model,
+        'num_samples': int(len(samples)),
+        'artifacts': {
+            'keras': {
+                'path': args.model,
+                'size_mb': os.path.getsize(args.model) / 1e6,
+                'latency_ms_batch1': latency_ms(keras_backend, samples[:1], args.repeats),
+                'peak_rss_mb': peak_rss_mb('keras', args.model)
+            }
+        }
+    }
+
+    for target in [t.strip() for t in args.formats.split(',') if t.strip()]:
+        backend, precision = target.split('-')
+        output_path = default_model_path(backend, precision, args.output_dir)
+        print(f"🔄 Exporting {target} → {output_path}")
+
+        try:
+            if backend == 'tflite':
+                export_tflite(model, output_path, precision, samples)
+            else:
+                export_onnx(model, output_path, precision, samples)
+        except ImportError as e:
+            print(f"❌ Skipping {target}: missing dependency ({e})")
+            continue
+        except Exception as e:
+            print(f"❌ Export of {target} failed: {e}")
+            continue
+
+        predictor = load_backend(backend, output_path)
+        report['artifacts'][target] = {
+            'path': output_path,
+            'size_mb': os.path.getsize(output_path) / 1e6,
+            'latency_ms_batch1': latency_ms(predictor, samples[:1], args.repeats),
+            'peak_rss_mb': peak_rss_mb(backend, output_path),
+            **parity_report(reference, predictor.predict(samples))
+        }
+
+    print(f"\n{'artifact':<15} {'size MB':>8} {'p50 ms':>8} {'RSS MB':>8} {'agree':>7} {'max |Δ|':>8}")
+    print('-' * 60)
+    for name, info in report['artifacts'].items():
+        rss = f"{info['peak_rss_mb']:.0f}" if info['peak_rss_mb'] else 'n/a'
+        agree = f"{info['label_agreement'] * 100:.1f}%" if 'label_agreement' in info else 'ref'
+        max_diff = f"{info['max_abs_diff']:.4f}" if 'max_abs_diff' in info else '-'
+        print(f"{name:<15} {info['size_mb']:>8.1f} {info['latency_ms_batch1']:>8.2f} {rss:>8} {agree:>7} {max_diff:>8}")
+
+    report_path = os.path.join(args.output_dir, 'export_report.json')
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n📁 Parity report saved to {report_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""
+Offline Face Crop Extraction
+Runs the serving pipeline's decode + detect_and_crop_face + preprocess once per dataset image, in parallel worker processes, into a resumable memory-mapped FaceStore
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from face_store import FaceStore
+from folder_inference import Progress
+from preprocessing import IMG_SIZE
+
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+
+
+# --- Worker process side -------------------------------------------------------
+
+_pipeline = None
+
+
+def _init_worker():
+    """Import the backend pipeline and load only the face detector (the model is not needed)"""
+    global _pipeline
+    backend_dir = os.path.abspath(BACKEND_DIR)
+    if backend_dir not in sys.path:
+        sys.path.insert(0, backend_dir)
+    # app.py creates its upload folder relative to the working directory
+    os.chdir(backend_dir)
+    import app as pipeline
+
+    pipeline.load_face_detector()
+    _pipeline = pipeline
+
+
+def _extract_chunk(items):
+    """Decode, detect and crop a chunk of (relative path, absolute path, label); crops come back as uint8 arrays"""
+    import numpy as np
+
+    results = []
+    for relative_path, path, label in items:
+        entry = {'path': relative_path, 'label': label}
+        try:
+            with open(path, 'rb') as f:
+                image = _pipeline.load_image(f)
+            face_image, detection_info, error = _pipeline.detect_and_crop_face(image)
+            if error or face_image is None:
+                results.append(({**entry, 'error': error or 'Face detection failed'}, None))
+                continue
+            crop = _pipeline.preprocess_image(face_image, out=np.empty((IMG_SIZE, IMG_SIZE, 3), dtype=np.uint8))
+            results.append(({**entry, **detection_info}, crop))
+        except Exception as e:
+            results.append(({**entry, 'error': str(e)}, None))
+    return results
+
+
+# --- Parent process --------------------------------------------------------------
+
+def extract_faces(directory, store_dir, workers=None, chunk_size=16, prefetch=2, resume=True):
+    """
+    Extract the best face of every image under a class-folder dataset into a FaceStore
+
+    Workers are spawned processes, each with its own MTCNN; their TensorFlow thread
+    pools are sized as if they were WEB_CONCURRENCY server workers. Results are
+    appended in walk order after every chunk, and with resume the images already
+    in the store's index (including no-face ones) are skipped.
+    """
+    from training_data import list_labeled_files
+
+    workers = workers or max(1, min(8, os.cpu_count() or 1))
+    paths, labels, class_names = list_labeled_files(directory)
+
+    if not resume and os.path.isdir(store_dir):
+        for name in os.listdir(store_dir):
+            os.remove(os.path.join(store_dir, name))
+    store = FaceStore.create(store_dir, class_names, img_size=IMG_SIZE, settings={
+        'source': os.path.abspath(directory),
+        'detection_max_side': int(os.environ.get('DETECTION_MAX_SIDE', 1024)),
+        'decode_min_side': int(os.environ.get('DECODE_MIN_SIDE', 768)),
+        'crop': 'best face, 20px padding, area resize (backend detect_and_crop_face + preprocess_image)'
+    })
+    done = store.completed()
+    todo = [
+        (os.path.relpath(path, directory), os.path.abspath(path), label)
+        for path, label in zip(paths, labels)
+        if os.path.relpath(path, directory) not in done
+    ]
+    print(f"📁 {len(paths)} images in {directory}: {len(done)} already extracted, {len(todo)} to go")
+
+    # Each spawned worker divides the cores between all of them
+    os.environ.setdefault('WEB_CONCURRENCY', str(workers))
+    chunks = [todo[i:i + chunk_size] for i in range(0, len(todo), chunk_size)]
+    tracker = Progress(labels=('crops', 'resumed', 'no face'))
+    counts = {'stored': 0, 'failed': 0}
+    start = time.perf_counter()
+
+    def collect(future):
+        results = future.result()
+        store.append(results)
+        for _, crop in results:
+            counts['stored' if crop is not None else 'failed'] += 1
+        tracker.update(counts['stored'], len(done), counts['failed'])
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker) as executor:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(executor.submit(_extract_chunk, chunk))
+                # Bounded prefetch keeps at most workers * prefetch chunks of crops in memory
+                if len(pending) >= workers * prefetch:
+                    collect(pending.popleft())
+            while pending:
+                collect(pending.popleft())
+    finally:
+        tracker.update(counts['stored'], len(done), counts['failed'], final=True)
+        store.close()
+
+    summary = {**store.summary(), 'seconds': time.perf_counter() - start}
+    print(f"✅ {summary['stored']} crops in {store_dir} ({summary['skipped']} images without a face), "
+          f"per class: {summary['per_class']}")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('directory', help='Dataset folder with one subfolder per class (e.g. ../dataset/train)')
+    parser.add_argument('store_dir', help='Output folder for crops.u8, index.jsonl and meta.json')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: cores, max 8)')
+    parser.add_argument('--chunk-size', type=int, default=16, help='Images per worker task')
+    parser.add_argument('--no-resume', action='store_true', help='Start the store over instead of appending to it')
+    args = parser.parse_args()
+
+    extract_faces(args.directory, args.store_dir, workers=args.workers, chunk_size=args.chunk_size,
+                  resume=not args.no_resume)
+
+
+if __name__ == '__main__':
+    main()
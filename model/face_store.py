@@ -0,0 +1,162 @@
+"""
+Memory-Mapped Face Crop Store
+Fixed-size uint8 face crops in one growable memmap file plus an append-only JSONL index of labels and detection metadata
+"""
+
+import json
+import os
+
+import numpy as np
+
+from folder_inference import truncate_partial_line
+from preprocessing import IMG_SIZE
+
+
+CROPS_FILE = 'crops.u8'
+INDEX_FILE = 'index.jsonl'
+META_FILE = 'meta.json'
+GROW_ROWS = 4096
+
+
+def is_face_store(path):
+    return os.path.exists(os.path.join(path, META_FILE))
+
+
+class FaceStore:
+    """
+    Crops live at crops.u8[slot] as (img_size, img_size, 3) uint8 rows; index.jsonl has one
+    entry per source image, with slot -1 for images where no face was stored
+
+    Crops are written to the memmap and flushed before their index entries are
+    appended, so after a crash every indexed slot holds a complete crop and
+    unindexed rows past the end are simply overwritten on resume.
+    """
+
+    def __init__(self, directory, mode='r'):
+        self.directory = directory
+        self.mode = mode
+        with open(os.path.join(directory, META_FILE)) as f:
+            self.meta = json.load(f)
+        self.img_size = self.meta['img_size']
+        self.row_shape = (self.img_size, self.img_size, 3)
+        self.class_names = self.meta['class_names']
+
+        index_path = os.path.join(directory, INDEX_FILE)
+        if mode != 'r' and os.path.exists(index_path):
+            truncate_partial_line(index_path)
+        self.entries = []
+        if os.path.exists(index_path):
+            with open(index_path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        self.entries.append(json.loads(line))
+                    except ValueError:
+                        continue
+        self.stored = [entry for entry in self.entries if entry['slot'] >= 0]
+        self.count = len(self.stored)
+
+        self._crops = None
+        self._index_file = open(index_path, 'a', encoding='utf-8') if mode != 'r' else None
+
+    @classmethod
+    def create(cls, directory, class_names, img_size=IMG_SIZE, settings=None):
+        """Create an empty store (or open an existing one for appending)"""
+        os.makedirs(directory, exist_ok=True)
+        meta_path = os.path.join(directory, META_FILE)
+        if not os.path.exists(meta_path):
+            meta = {
+                'img_size': img_size,
+                'dtype': 'uint8',
+                'class_names': list(class_names),
+                'settings': settings or {}
+            }
+            with open(meta_path, 'w') as f:
+                json.dump(meta, f, indent=2)
+            open(os.path.join(directory, CROPS_FILE), 'wb').close()
+        store = cls(directory, mode='r+')
+        if store.class_names != list(class_names) or store.img_size != img_size:
+            raise ValueError(f"{directory} holds a store with classes {store.class_names} at {store.img_size}px, "
+                             f"not {list(class_names)} at {img_size}px")
+        return store
+
+    @property
+    def row_bytes(self):
+        return int(np.prod(self.row_shape))
+
+    def _capacity(self):
+        return os.path.getsize(os.path.join(self.directory, CROPS_FILE)) // self.row_bytes
+
+    def _map(self, rows):
+        path = os.path.join(self.directory, CROPS_FILE)
+        if rows == 0:
+            return np.zeros((0,) + self.row_shape, dtype=np.uint8)
+        return np.memmap(path, dtype=np.uint8, mode='r' if self.mode == 'r' else 'r+', shape=(rows,) + self.row_shape)
+
+    @property
+    def images(self):
+        """(count, img_size, img_size, 3) uint8 memmap of the stored crops (pages load lazily)"""
+        if self._crops is None or len(self._crops) < self.count:
+            self._crops = self._map(self.count if self.mode == 'r' else self._capacity())
+        return self._crops[:self.count]
+
+    @property
+    def labels(self):
+        """Label per stored crop, aligned with images"""
+        return np.array([entry['label'] for entry in self.stored], dtype=np.int64)
+
+    def completed(self):
+        """Relative source paths already in the index (stored or recorded as failed)"""
+        return {entry['path'] for entry in self.entries}
+
+    def append(self, items):
+        """
+        Add (entry, crop or None) pairs; entry needs 'path' and 'label' plus any metadata
+        Crops are flushed to disk before the index entries that point at them are written
+        """
+        crops = [crop for _, crop in items if crop is not None]
+        needed = self.count + len(crops)
+        if needed > self._capacity():
+            # Grow the file in large steps so appends do not remap on every call
+            rows = max(needed, self._capacity() + GROW_ROWS)
+            with open(os.path.join(self.directory, CROPS_FILE), 'r+b') as f:
+                f.truncate(rows * self.row_bytes)
+            self._crops = None
+        if crops:
+            mapped = self._map(self._capacity())
+            mapped[self.count:needed] = np.stack(crops)
+            mapped.flush()
+            self._crops = mapped
+
+        lines = []
+        for entry, crop in items:
+            if crop is not None:
+                entry = {**entry, 'slot': self.count}
+                self.count += 1
+                self.stored.append(entry)
+            else:
+                entry = {**entry, 'slot': -1}
+            self.entries.append(entry)
+            lines.append(json.dumps(entry) + '\n')
+        self._index_file.write(''.join(lines))
+        self._index_file.flush()
+        os.fsync(self._index_file.fileno())
+
+    def close(self):
+        """Trim the preallocated tail and close the index"""
+        if self._index_file is not None:
+            self._crops = None
+            with open(os.path.join(self.directory, CROPS_FILE), 'r+b') as f:
+                f.truncate(self.count * self.row_bytes)
+            self._index_file.close()
+            self._index_file = None
+
+    def summary(self):
+        """Counts per class and of images without a stored crop"""
+        per_class = {name: 0 for name in self.class_names}
+        for entry in self.stored:
+            per_class[self.class_names[entry['label']]] += 1
+        return {
+            'stored': self.count,
+            'skipped': len(self.entries) - self.count,
+            'per_class': per_class
+        }
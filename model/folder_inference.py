@@ -0,0 +1,365 @@
+"""
+Streaming Folder Inference
+Walks an image tree recursively, decodes in parallel with bounded prefetch, scores in batches and appends results to a resumable CSV/JSONL/Parquet output
+"""
+
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+
+from image_decode import decode_image
+from preprocessing import IMG_SIZE, BufferPool, resize_into
+
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+OUTPUT_FORMATS = ('csv', 'jsonl', 'parquet')
+RESULT_FIELDS = ('path', 'result', 'confidence', 'raw_score', 'fake_probability', 'real_probability', 'error')
+
+
+def iter_image_files(root, extensions=IMAGE_EXTENSIONS):
+    """
+    Yield paths relative to root for every image below it, depth first in sorted order
+    Uses os.scandir so no directory listing beyond the current one is held in memory
+    """
+    stack = ['']
+    while stack:
+        relative_dir = stack.pop()
+        try:
+            with os.scandir(os.path.join(root, relative_dir)) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError as e:
+            print(f"\n⚠️ Skipping unreadable folder {relative_dir or root}: {str(e)}", file=sys.stderr)
+            continue
+
+        subdirs = []
+        for entry in entries:
+            relative_path = os.path.join(relative_dir, entry.name)
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(relative_path)
+            elif os.path.splitext(entry.name)[1].lower() in extensions:
+                yield relative_path
+        # Reversed so subfolders are visited in sorted order
+        stack.extend(reversed(subdirs))
+
+
+def output_format_for(path, fmt=None):
+    """Output format from an explicit name or the file extension (default csv)"""
+    fmt = (fmt or os.path.splitext(path.rstrip('/'))[1].lstrip('.') or 'csv').lower()
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format '{fmt}'. Choose from: {', '.join(OUTPUT_FORMATS)}")
+    return fmt
+
+
+def score_to_result(path, score):
+    """Result row for one raw model score (score < 0.5 means fake)"""
+    score = float(score)
+    return {
+        'path': path,
+        'result': 'FAKE' if score < 0.5 else 'REAL',
+        'confidence': (1 - score) * 100 if score < 0.5 else score * 100,
+        'raw_score': score,
+        'fake_probability': (1 - score) * 100,
+        'real_probability': score * 100,
+        'error': ''
+    }
+
+
+def error_result(path, message):
+    """Result row for a file that could not be decoded; it is recorded so a resume does not retry it"""
+    return {**{field: None for field in RESULT_FIELDS}, 'path': path, 'error': message}
+
+
+def truncate_partial_line(path):
+    """Drop a trailing line cut off by a crash so appended rows start on a fresh line"""
+    with open(path, 'rb+') as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size == 0:
+            return
+        # Scan back from the end in blocks for the last newline
+        position = size
+        while position > 0:
+            step = min(65536, position)
+            f.seek(position - step)
+            block = f.read(step)
+            index = block.rfind(b'\n')
+            if index != -1:
+                end = position - step + index + 1
+                if end != size:
+                    f.truncate(end)
+                return
+            position -= step
+        f.truncate(0)
+
+
+class CsvResultWriter:
+    """Appends result rows to a CSV file, flushed after every batch"""
+
+    def __init__(self, path):
+        self.path = path
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        if exists:
+            truncate_partial_line(path)
+        self._file = open(path, 'a', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=RESULT_FIELDS)
+        if not exists:
+            self._writer.writeheader()
+
+    @staticmethod
+    def completed(path):
+        """Paths already present in an existing output"""
+        if not os.path.exists(path):
+            return set()
+        with open(path, newline='', encoding='utf-8') as f:
+            return {row['path'] for row in csv.DictReader(f) if row.get('path')}
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+        self._file.flush()
+
+    def close(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+
+
+class JsonlResultWriter:
+    """Appends one JSON object per line, flushed after every batch"""
+
+    def __init__(self, path):
+        self.path = path
+        if os.path.exists(path):
+            truncate_partial_line(path)
+        self._file = open(path, 'a', encoding='utf-8')
+
+    @staticmethod
+    def completed(path):
+        if not os.path.exists(path):
+            return set()
+        done = set()
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    done.add(json.loads(line)['path'])
+                except (ValueError, KeyError, TypeError):
+                    # A torn final line is truncated when the writer reopens the file
+                    continue
+        return done
+
+    def write(self, rows):
+        self._file.write(''.join(json.dumps(row) + '\n' for row in rows))
+        self._file.flush()
+
+    def close(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+
+
+class ParquetResultWriter:
+    """
+    Writes rows as numbered part files inside an output folder (requires pyarrow)
+
+    Parquet files cannot be appended to, so rows are buffered and written as a
+    new part every rows_per_part rows; a crash loses at most the unwritten
+    buffer, which a resume then scores again.
+    """
+
+    def __init__(self, path, rows_per_part=10000):
+        self._require_pyarrow()
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.rows_per_part = rows_per_part
+        self._rows = []
+        self._next_part = len(self._part_files(path))
+
+    @staticmethod
+    def _require_pyarrow():
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ImportError("Parquet output requires pyarrow (pip install pyarrow)") from None
+
+    @staticmethod
+    def _part_files(path):
+        if not os.path.isdir(path):
+            return []
+        return sorted(name for name in os.listdir(path) if name.startswith('part-') and name.endswith('.parquet'))
+
+    @classmethod
+    def completed(cls, path):
+        cls._require_pyarrow()
+        import pyarrow.parquet as pq
+
+        done = set()
+        for name in cls._part_files(path):
+            done.update(pq.read_table(os.path.join(path, name), columns=['path']).column('path').to_pylist())
+        return done
+
+    def _write_part(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        # Explicit schema so a part holding only error rows still has float score columns
+        schema = pa.schema([
+            (field, pa.string() if field in ('path', 'result', 'error') else pa.float64())
+            for field in RESULT_FIELDS
+        ])
+        table = pa.Table.from_pylist(self._rows, schema=schema)
+        final_path = os.path.join(self.path, f"part-{self._next_part:05d}.parquet")
+        # Parts appear atomically, so a crash mid-write never leaves an unreadable file
+        pq.write_table(table, final_path + '.tmp')
+        os.replace(final_path + '.tmp', final_path)
+        self._next_part += 1
+        self._rows = []
+
+    def write(self, rows):
+        self._rows.extend(rows)
+        if len(self._rows) >= self.rows_per_part:
+            self._write_part()
+
+    def close(self):
+        if self._rows:
+            self._write_part()
+
+
+RESULT_WRITERS = {
+    'csv': CsvResultWriter,
+    'jsonl': JsonlResultWriter,
+    'parquet': ParquetResultWriter
+}
+
+
+def load_for_model(path, img_size=IMG_SIZE, min_side=None):
+    """Decode an image file (reduced JPEG decode when larger than needed) and resize it to a uint8 model input"""
+    image = decode_image(path, min_side=min_side or img_size)
+    return resize_into(np.asarray(image), np.empty((img_size, img_size, 3), dtype=np.uint8))
+
+
+class Progress:
+    """Single carriage-return progress line on stderr, redrawn at most every `interval` seconds"""
+
+    def __init__(self, interval=0.5, stream=sys.stderr, labels=('scored', 'resumed', 'errors')):
+        self.interval = interval
+        self.stream = stream
+        self.labels = labels
+        self.start = time.perf_counter()
+        self._last = 0.0
+
+    def update(self, scored, skipped, errors, final=False):
+        now = time.perf_counter()
+        if not final and now - self._last < self.interval:
+            return
+        self._last = now
+        elapsed = now - self.start
+        rate = scored / elapsed if elapsed > 0 else 0.0
+        minutes, seconds = divmod(int(elapsed), 60)
+        self.stream.write(f"\r⏳ {scored:,} {self.labels[0]} | {skipped:,} {self.labels[1]} | {errors:,} {self.labels[2]} | "
+                          f"{rate:,.1f} img/s | {minutes:02d}:{seconds:02d} elapsed")
+        if final:
+            self.stream.write('\n')
+        self.stream.flush()
+
+
+def run_folder_inference(session, root, output_path=None, output_format=None, batch_size=32, workers=None,
+                         prefetch=4, resume=True, img_size=IMG_SIZE, on_result=None, progress=True, members=None):
+    """
+    Score every image under root with bounded memory and return summary counts
+
+    Decoding runs on `workers` threads with at most workers * prefetch images
+    in flight; the calling thread gathers them into uint8 batches for
+    session.predict while the workers keep decoding. Rows are appended to
+    output_path after every batch, and with resume the paths already in
+    the output are skipped, so an interrupted run continues where it stopped.
+    on_result(row) is called for every row, in walk order. `members`, an
+    iterable of (path, bytes, error) such as an ArchiveReader, is scored
+    instead of the files under root.
+    """
+    workers = workers or min(8, os.cpu_count() or 1)
+    writer = None
+    done = set()
+    if output_path:
+        fmt = output_format_for(output_path, output_format)
+        writer_cls = RESULT_WRITERS[fmt]
+        if resume:
+            done = writer_cls.completed(output_path)
+        elif fmt == 'parquet':
+            for name in ParquetResultWriter._part_files(output_path):
+                os.remove(os.path.join(output_path, name))
+        elif os.path.exists(output_path):
+            os.remove(output_path)
+        writer = writer_cls(output_path)
+
+    summary = {'scored': 0, 'skipped': len(done), 'errors': 0, 'real': 0, 'fake': 0, 'confidence_sum': 0.0}
+    batch_pool = BufferPool((img_size, img_size, 3), np.uint8)
+    tracker = Progress() if progress else None
+    pending = deque()
+    batch_paths = []
+
+    def emit(rows):
+        if writer is not None:
+            writer.write(rows)
+        for row in rows:
+            if row['error']:
+                summary['errors'] += 1
+            else:
+                summary['scored'] += 1
+                summary['real' if row['result'] == 'REAL' else 'fake'] += 1
+                summary['confidence_sum'] += row['confidence']
+            if on_result is not None:
+                on_result(row)
+
+    def flush_batch(batch):
+        scores = session.predict(batch[:len(batch_paths)])
+        emit([score_to_result(path, score) for path, score in zip(batch_paths, scores)])
+        batch_paths.clear()
+
+    def collect(path, future):
+        """Move one decoded image into the current batch, running the model when the batch is full"""
+        try:
+            pixels = future.result()
+        except Exception as e:
+            emit([error_result(path, str(e))])
+            return
+        batch = batch_pool.get(batch_size)
+        batch[len(batch_paths)] = pixels
+        batch_paths.append(path)
+        if len(batch_paths) == batch_size:
+            flush_batch(batch)
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='folder-decode') as executor:
+            if members is None:
+                members = ((path, os.path.join(root, path), None) for path in iter_image_files(root))
+            for path, source, error in members:
+                if path in done:
+                    continue
+                if error:
+                    # Queued as a failed decode so its row keeps its place in the output order
+                    failed = Future()
+                    failed.set_exception(ValueError(error))
+                    pending.append((path, failed))
+                else:
+                    pending.append((path, executor.submit(load_for_model, source, img_size)))
+                # Bounded prefetch: wait for the oldest decode before queueing more
+                if len(pending) >= workers * prefetch:
+                    collect(*pending.popleft())
+                if tracker is not None:
+                    tracker.update(summary['scored'], summary['skipped'], summary['errors'])
+            while pending:
+                collect(*pending.popleft())
+            if batch_paths:
+                flush_batch(batch_pool.get(batch_size))
+    finally:
+        if writer is not None:
+            writer.close()
+        if tracker is not None:
+            tracker.update(summary['scored'], summary['skipped'], summary['errors'], final=True)
+
+    return summary
@@ -0,0 +1,83 @@
+"""
+Reduced-Resolution Image Decoding
+Decodes uploads straight from a stream, using libjpeg DCT scaling when the pipeline does not need full resolution
+"""
+
+import io
+
+from PIL import Image, UnidentifiedImageError
+
+
+# libjpeg can scale by 1/2, 1/4 and 1/8 while decoding
+JPEG_REDUCTIONS = (8, 4, 2)
+
+# EXIF orientation tag value -> transpose that brings the image upright
+EXIF_ORIENTATION_TAG = 0x0112
+ORIENTATION_TRANSPOSES = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90
+}
+
+
+def reduction_factor(width, height, min_side):
+    """Largest JPEG reduction that keeps the long edge at or above min_side (1 = full resolution)"""
+    if not min_side:
+        return 1
+    long_edge = max(width, height)
+    for factor in JPEG_REDUCTIONS:
+        if long_edge // factor >= min_side:
+            return factor
+    return 1
+
+
+def exif_orientation(image):
+    """Orientation value from the EXIF header (1 when absent); reading it does not decode pixels"""
+    try:
+        return int(image.getexif().get(EXIF_ORIENTATION_TAG, 1))
+    except Exception:
+        return 1
+
+
+def decode_image(source, min_side=None):
+    """
+    Decode bytes, a path or a binary stream into an upright RGB PIL image
+
+    JPEGs whose long edge is at least twice min_side are decoded at 1/2, 1/4
+    or 1/8 scale inside libjpeg, so the full-resolution bitmap never exists.
+    The applied factor is kept in image.info['decode_reduction'] so callers
+    can map coordinates back to the original resolution. Raises ValueError
+    when the data is not an image PIL can read.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    try:
+        image = Image.open(source)
+    except UnidentifiedImageError:
+        # PIL's message embeds the repr of the stream object
+        raise ValueError('Invalid image file') from None
+    orientation = exif_orientation(image)
+
+    full_width = image.width
+    if image.format == 'JPEG':
+        factor = reduction_factor(image.width, image.height, min_side)
+        if factor > 1:
+            image.draft('RGB', (-(-image.width // factor), -(-image.height // factor)))
+    reduction = full_width / image.width
+
+    # Decode now, while the source stream is still open
+    image.load()
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    # Rotating after the reduced decode only touches the small bitmap
+    transpose = ORIENTATION_TRANSPOSES.get(orientation)
+    if transpose is not None:
+        image = image.transpose(transpose)
+
+    image.info['decode_reduction'] = reduction
+    return image
@@ -5,31 +5,60 @@ Use this script to test the trained model on individual images
 
 import os
 import sys
+import argparse
 import numpy as np
 from PIL import Image
-import tensorflow as tf
-from tensorflow import keras
 import cv2
+from backends import default_model_path, load_backend
+from video_analysis import VIDEO_EXTENSIONS, analyze_video, video_info
+from folder_inference import OUTPUT_FORMATS, run_folder_inference
+from archive_input import ArchiveReader, is_archive_path
+from worker_pool import InferenceWorkerPool, parse_core_list
 
 # Configuration
 MODEL_PATH = './saved_models/deepfake_detector_efficientnet.h5'
 IMG_SIZE = 224
 
-def load_model_for_inference():
-    """Load the trained model"""
-    if not os.path.exists(MODEL_PATH):
-        print(f"❌ Model not found at: {MODEL_PATH}")
+# Inference backend: keras, tflite or onnx (artifacts from export_model.py)
+INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'keras').lower()
+INFERENCE_MODEL_PATH = os.environ.get('INFERENCE_MODEL_PATH') or (
+    MODEL_PATH if INFERENCE_BACKEND == 'keras' else default_model_path(INFERENCE_BACKEND)
+)
+
+def load_model_for_inference(inference_workers=0, cores=None, max_batch=32):
+    """
+    Load the trained model with the configured backend (Keras runs in a warmed-up session)
+    With inference_workers > 0 the model is loaded by that many core-pinned worker processes instead
+    """
+    if not os.path.exists(INFERENCE_MODEL_PATH):
+        print(f"❌ Model not found at: {INFERENCE_MODEL_PATH}")
         print("Please train the model first using deepfake_model_training.ipynb")
         return None
     
     try:
-        model = keras.models.load_model(MODEL_PATH)
-        print(f"✅ Model loaded successfully from {MODEL_PATH}")
-        return model
+        if inference_workers > 0:
+            pool = InferenceWorkerPool(INFERENCE_BACKEND, INFERENCE_MODEL_PATH, workers=inference_workers,
+                                       cores=parse_core_list(cores), max_batch=max_batch, img_size=IMG_SIZE).start()
+            print(f"✅ {pool.workers} inference workers loaded {INFERENCE_MODEL_PATH} ({INFERENCE_BACKEND} backend) "
+                  f"in {pool.warmup_seconds:.2f}s, cores {pool.core_sets}")
+            return pool
+        session = load_backend(INFERENCE_BACKEND, INFERENCE_MODEL_PATH, img_size=IMG_SIZE)
+        print(f"✅ Model loaded successfully from {INFERENCE_MODEL_PATH} ({INFERENCE_BACKEND} backend)")
+        if getattr(session, 'warmup_seconds', None) is not None:
+            print(f"✅ Inference session warmed up in {session.warmup_seconds:.2f}s")
+        return session
     except Exception as e:
         print(f"❌ Error loading model: {str(e)}")
         return None
 
+def as_session(model):
+    """Wrap a raw Keras model in a warmed-up InferenceSession; loaded backends are returned unchanged"""
+    # A Keras model can only exist once TensorFlow is imported, so TFLite / ONNX runs never load it
+    if 'tensorflow' not in sys.modules:
+        return model
+    from inference_session import InferenceSession
+    return InferenceSession.wrap(model, img_size=IMG_SIZE)
+
 def preprocess_image(image_path):
     """Load and preprocess image for model input"""
     try:
@@ -69,8 +98,9 @@ def predict_image(model, image_path, verbose=True):
     if img_array is None:
         return None
     
-    # Predict
-    prediction = model.predict(img_array, verbose=0)[0][0]
+    # Predict (accepts a raw Keras model or any loaded backend)
+    session = as_session(model)
+    prediction = float(session.predict(img_array)[0])
     
     # Interpret result
     if prediction < 0.5:
@@ -99,89 +129,233 @@ def predict_image(model, image_path, verbose=True):
         'real_probability': prediction * 100
     }
 
-def batch_predict(model, image_folder):
-    """Predict on all images in a folder"""
+def load_video_face_detector():
+    """Return a detect(rgb_frame) function backed by MTCNN, or the Haar cascade if MTCNN is unavailable"""
+    try:
+        from mtcnn import MTCNN
+        detector = MTCNN()
+        return detector.detect_faces
+    except Exception as e:
+        print(f"⚠️ MTCNN unavailable ({str(e)}), using Haar cascade")
+    
+    cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    
+    def detect(frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+        return [{'box': [x, y, w, h], 'confidence': 0.99} for x, y, w, h in cascade.detectMultiScale(gray, 1.3, 5)]
+    
+    return detect
+
+def predict_video(model, video_path, sample_fps=2.0, segment_seconds=2.0, verbose=True):
+    """Stream a video, track the face across sampled frames and score crops in batches"""
+    
+    if not os.path.exists(video_path):
+        print(f"❌ Video not found: {video_path}")
+        return None
+    
+    session = as_session(model)
+    info = video_info(video_path)
+    analysis = analyze_video(
+        video_path,
+        detect_fn=load_video_face_detector(),
+        predict_fn=session.predict,
+        sample_fps=sample_fps,
+        segment_seconds=segment_seconds
+    )
+    
+    if analysis['aggregate'] is None:
+        print(f"❌ No face detected in {analysis['frames_sampled']} sampled frames")
+        return None
+    
+    prediction = analysis['aggregate']['mean_raw_score']
+    result = "FAKE" if prediction < 0.5 else "REAL"
+    confidence = (1 - prediction) * 100 if prediction < 0.5 else prediction * 100
+    
+    if verbose:
+        print(f"\n{'='*60}")
+        print(f"Video: {os.path.basename(video_path)} ({info['frame_count']} frames @ {info['fps']:.1f} fps)")
+        print(f"{'='*60}")
+        for segment in analysis['segments']:
+            label = "FAKE" if segment['mean_raw_score'] < 0.5 else "REAL"
+            print(f"  {segment['start_seconds']:>7.1f}s - {segment['end_seconds']:>7.1f}s → {label:<5} "
+                  f"(score {segment['mean_raw_score']:.3f}, {segment['frames_scored']} frames)")
+        print(f"{'='*60}")
+        print(f"Result: {result}")
+        print(f"Confidence: {confidence:.2f}%")
+        print(f"Fake Frame Ratio: {analysis['aggregate']['fake_frame_ratio'] * 100:.1f}%")
+        print(f"Frames: {analysis['frames_with_face']}/{analysis['frames_sampled']} with face, "
+              f"{analysis['detector_runs']} detector runs")
+        print(f"{'='*60}\n")
+    
+    return {
+        'result': result,
+        'confidence': confidence,
+        'raw_score': prediction,
+        **analysis
+    }
+
+def batch_predict(model, image_folder, output_path=None, output_format=None, batch_size=32, workers=None,
+                  prefetch=4, resume=True):
+    """
+    Predict on all images below a folder (recursively) or inside a ZIP/TAR archive, with parallel decoding
+    and batched inference; archive members are read in memory one by one, never extracted
+    With output_path, rows are appended as they are scored and a rerun resumes where the last one stopped
+    """
     
     if not os.path.exists(image_folder):
         print(f"❌ Folder not found: {image_folder}")
         return
     
-    # Get all image files
-    image_extensions = ['.jpg', '.jpeg', '.png']
-    image_files = [
-        f for f in os.listdir(image_folder)
-        if os.path.splitext(f)[1].lower() in image_extensions
-    ]
-    
-    if not image_files:
-        print(f"No images found in {image_folder}")
-        return
+    archive = None
+    if os.path.isfile(image_folder):
+        try:
+            archive = ArchiveReader(image_folder)
+        except ValueError as e:
+            print(f"❌ {str(e)}")
+            return
     
     print(f"\n{'='*60}")
-    print(f"Batch Prediction on {len(image_files)} images")
+    print(f"Batch Prediction on {image_folder}{f' ({archive.kind.upper()} archive)' if archive else ''}")
+    if output_path:
+        print(f"Writing results to {output_path}{' (resuming)' if resume else ''}")
     print(f"{'='*60}\n")
     
-    results = []
-    for img_file in image_files:
-        img_path = os.path.join(image_folder, img_file)
-        result = predict_image(model, img_path, verbose=False)
-        
-        if result:
-            results.append({
-                'filename': img_file,
-                **result
-            })
-            print(f"✅ {img_file:<30} → {result['result']:<5} ({result['confidence']:.1f}%)")
+    def print_result(row):
+        if row['error']:
+            print(f"❌ {row['path']:<30} → Error: {row['error']}")
         else:
-            print(f"❌ {img_file:<30} → Error")
+            print(f"✅ {row['path']:<30} → {row['result']:<5} ({row['confidence']:.1f}%)")
     
-    # Summary
-    if results:
-        fake_count = sum(1 for r in results if r['result'] == 'FAKE')
-        real_count = sum(1 for r in results if r['result'] == 'REAL')
-        avg_confidence = sum(r['confidence'] for r in results) / len(results)
-        
-        print(f"\n{'='*60}")
-        print(f"Summary:")
-        print(f"  Total: {len(results)}")
-        print(f"  Real: {real_count} ({real_count/len(results)*100:.1f}%)")
-        print(f"  Fake: {fake_count} ({fake_count/len(results)*100:.1f}%)")
-        print(f"  Avg Confidence: {avg_confidence:.2f}%")
-        print(f"{'='*60}\n")
+    session = as_session(model)
+    try:
+        # Per-file lines only without an output file; large runs show a single progress line instead
+        summary = run_folder_inference(
+            session, image_folder,
+            output_path=output_path,
+            output_format=output_format,
+            batch_size=batch_size,
+            workers=workers,
+            prefetch=prefetch,
+            resume=resume,
+            img_size=IMG_SIZE,
+            on_result=None if output_path else print_result,
+            progress=bool(output_path),
+            members=archive
+        )
+    except (ImportError, ValueError) as e:
+        print(f"❌ {str(e)}")
+        return
+    finally:
+        if archive is not None:
+            archive.close()
+    
+    total = summary['real'] + summary['fake']
+    if total == 0 and summary['skipped'] == 0:
+        print(f"No images found in {image_folder}")
+        return summary
     
-    return results
+    # Summary of this run (rows resumed from an earlier run are not re-read)
+    print(f"\n{'='*60}")
+    print(f"Summary:")
+    print(f"  Scored: {total}")
+    if total:
+        print(f"  Real: {summary['real']} ({summary['real']/total*100:.1f}%)")
+        print(f"  Fake: {summary['fake']} ({summary['fake']/total*100:.1f}%)")
+        print(f"  Avg Confidence: {summary['confidence_sum']/total:.2f}%")
+    print(f"  Errors: {summary['errors']}")
+    if archive is not None and archive.skipped:
+        print(f"  Skipped (not images): {archive.skipped}")
+    if summary['skipped']:
+        print(f"  Resumed (already in output): {summary['skipped']}")
+    print(f"{'='*60}\n")
+    
+    return summary
+
+def parse_args():
+    """Command line options"""
+    parser = argparse.ArgumentParser(
+        description="Deepfake Detection - Inference Script",
+        epilog="Examples:\n"
+               "  python inference.py ../test_images/sample.jpg\n"
+               "  python inference.py path/to/video.mp4\n"
+               "  python inference.py ../test_images/ --output results.jsonl\n"
+               "  python inference.py uploads.tar.gz --output results.jsonl",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('path', nargs='?', help='Image, video, folder of images (searched recursively) '
+                                                 'or ZIP/TAR archive of images')
+    parser.add_argument('--output', '-o', default=None,
+                        help='Folder mode: append results to this CSV/JSONL file (or Parquet folder)')
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default=None,
+                        help='Output format (default: from the --output extension, else csv)')
+    parser.add_argument('--batch-size', type=int, default=32, help='Images per model call in folder mode')
+    parser.add_argument('--workers', type=int, default=None, help='Decode threads in folder mode')
+    parser.add_argument('--prefetch', type=int, default=4, help='Decoded images queued per decode thread')
+    parser.add_argument('--no-resume', action='store_true',
+                        help='Start the output over instead of skipping files already in it')
+    parser.add_argument('--inference-workers', type=int, default=0,
+                        help='Run the model in this many core-pinned worker processes (0 = in this process)')
+    parser.add_argument('--cores', default=None,
+                        help='Cores shared out among the inference workers, e.g. 0-15 (default: all available)')
+    return parser.parse_args()
 
 def main():
     """Main function"""
     
+    args = parse_args()
+    
     print("\n" + "="*60)
     print("Deepfake Detection - Inference Script")
     print("="*60 + "\n")
     
-    # Load model
-    model = load_model_for_inference()
-    if model is None:
-        return
-    
     # Check command line arguments
-    if len(sys.argv) < 2:
+    if not args.path:
         print("Usage:")
         print("  Single image:  python inference.py path/to/image.jpg")
-        print("  Batch predict: python inference.py path/to/folder/")
+        print("  Video:         python inference.py path/to/video.mp4")
+        print("  Batch predict: python inference.py path/to/folder/ [--output results.csv]")
+        print("  Archive:       python inference.py path/to/images.zip [--output results.jsonl]")
         print("\nExample:")
         print("  python inference.py ../test_images/sample.jpg")
-        print("  python inference.py ../test_images/")
+        print("  python inference.py ../test_images/ --output results.jsonl")
+        return
+    
+    # Load model
+    model = load_model_for_inference(args.inference_workers, args.cores, max_batch=args.batch_size)
+    if model is None:
         return
     
-    path = sys.argv[1]
+    path = args.path
     
     # Check if it's a file or directory
-    if os.path.isfile(path):
+    if os.path.isfile(path) and os.path.splitext(path)[1].lower().lstrip('.') in VIDEO_EXTENSIONS:
+        # Video prediction
+        predict_video(model, path)
+    elif os.path.isfile(path) and is_archive_path(path):
+        # Batch prediction over the images inside a ZIP/TAR archive
+        batch_predict(
+            model, path,
+            output_path=args.output,
+            output_format=args.format,
+            batch_size=args.batch_size,
+            workers=args.workers,
+            prefetch=args.prefetch,
+            resume=not args.no_resume
+        )
+    elif os.path.isfile(path):
         # Single image prediction
         predict_image(model, path)
     elif os.path.isdir(path):
         # Batch prediction
-        batch_predict(model, path)
+        batch_predict(
+            model, path,
+            output_path=args.output,
+            output_format=args.format,
+            batch_size=args.batch_size,
+            workers=args.workers,
+            prefetch=args.prefetch,
+            resume=not args.no_resume
+        )
     else:
         print(f"❌ Path not found: {path}")
 
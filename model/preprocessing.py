@@ -0,0 +1,70 @@
+"""
+Copy-Free Preprocessing for the Deepfake Detection Model
+Keeps face crops as uint8 until the model boundary and writes them into reusable batch buffers
+"""
+
+import threading
+
+import cv2
+import numpy as np
+
+
+IMG_SIZE = 224
+INV_255 = np.float32(1.0 / 255.0)
+
+
+def resize_into(rgb, out, box=None):
+    """
+    Crop (optional) and resize an RGB uint8 array into `out` with one OpenCV call
+    box is (x, y, w, h) in rgb coordinates; the crop is a view, so nothing is copied before the resize
+    """
+    if box is not None:
+        x, y, w, h = box
+        rgb = rgb[y:y + h, x:x + w]
+    target_h, target_w = out.shape[:2]
+    # Area averaging when shrinking (antialiased like PIL), bicubic when enlarging
+    shrinking = rgb.shape[0] >= target_h and rgb.shape[1] >= target_w
+    interpolation = cv2.INTER_AREA if shrinking else cv2.INTER_CUBIC
+    cv2.resize(rgb, (target_w, target_h), dst=out, interpolation=interpolation)
+    return out
+
+
+def normalize_into(batch, out):
+    """uint8 pixels -> float32 in [0, 1] without temporaries"""
+    return np.multiply(batch, INV_255, out=out, dtype=np.float32)
+
+
+class BufferPool:
+    """
+    Per-thread arrays that grow to the largest batch seen and are then reused
+
+    Callers get views into the same memory on every call, so a buffer must be
+    consumed (e.g. passed to the model) before the same thread asks again.
+    """
+
+    def __init__(self, item_shape=(IMG_SIZE, IMG_SIZE, 3), dtype=np.uint8):
+        self.item_shape = tuple(item_shape)
+        self.dtype = np.dtype(dtype)
+        self._local = threading.local()
+
+    def get(self, n):
+        """(n,) + item_shape view into this thread's buffer"""
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None or len(buffer) < n:
+            capacity = max(n, 2 * len(buffer) if buffer is not None else 1)
+            buffer = np.empty((capacity,) + self.item_shape, dtype=self.dtype)
+            self._local.buffer = buffer
+        return buffer[:n]
+
+
+def as_float_input(batch, pool):
+    """
+    Return batch as normalized float32 for backends without in-graph normalization
+    uint8 batches are normalized into a reused buffer; float32 batches pass through untouched
+    """
+    batch = np.asarray(batch)
+    if batch.ndim == 3:
+        batch = batch[np.newaxis]
+    if batch.dtype == np.uint8:
+        return normalize_into(batch, pool.get(len(batch)))
+    return batch.astype(np.float32, copy=False)
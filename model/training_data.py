@@ -0,0 +1,315 @@
+"""
+tf.data Training Input Pipeline
+Parallel decode, cached uint8 images, batched on-the-fly augmentation matching the notebook's ImageDataGenerator settings, optional TFRecord shards and FaceStore input
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+
+import tensorflow as tf
+
+from face_store import FaceStore, is_face_store
+from folder_inference import iter_image_files
+
+
+IMG_SIZE = 224
+BATCH_SIZE = 32
+SHUFFLE_BUFFER = 2048
+# Extensions flow_from_directory accepts
+DATASET_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.ppm', '.tif', '.tiff')
+SHARD_MANIFEST = 'manifest.json'
+
+# Same ranges as the notebook's ImageDataGenerator
+AUGMENTATION = {
+    'rotation_range': 20.0,          # degrees
+    'width_shift_range': 0.2,        # fraction of width
+    'height_shift_range': 0.2,       # fraction of height
+    'shear_range': 0.2,              # degrees, as in ImageDataGenerator
+    'zoom_range': 0.2,               # independent x/y zoom in [0.8, 1.2]
+    'horizontal_flip': True,
+    'brightness_range': (0.8, 1.2)
+}
+
+
+def list_labeled_files(directory, extensions=DATASET_EXTENSIONS):
+    """
+    (paths, labels, class_names) for a folder of class subfolders, like flow_from_directory
+    Classes are the sorted subfolder names, so fake = 0 and real = 1
+    """
+    class_names = sorted(
+        name for name in os.listdir(directory) if os.path.isdir(os.path.join(directory, name))
+    )
+    paths, labels = [], []
+    for label, class_name in enumerate(class_names):
+        class_dir = os.path.join(directory, class_name)
+        for relative_path in iter_image_files(class_dir, extensions):
+            paths.append(os.path.join(class_dir, relative_path))
+            labels.append(label)
+    return paths, labels, class_names
+
+
+def decode_and_resize(path, img_size=IMG_SIZE):
+    """Read and decode one image file into a (img_size, img_size, 3) uint8 tensor"""
+    image = tf.io.decode_image(tf.io.read_file(path), channels=3, expand_animations=False)
+    # Antialiased bilinear matches the area resize used at serving time when shrinking
+    image = tf.image.resize(image, (img_size, img_size), method='bilinear', antialias=True)
+    return tf.cast(tf.clip_by_value(tf.round(image), 0.0, 255.0), tf.uint8)
+
+
+def random_transforms(seed, batch_size, height, width, settings=AUGMENTATION):
+    """
+    Flattened output -> input projective transforms for a batch, as ImageDataGenerator composes them:
+    rotation, shift, shear and zoom about the image center
+    """
+    def uniform(index, low, high):
+        return tf.random.stateless_uniform([batch_size], seed=seed + index, minval=low, maxval=high)
+
+    height = tf.cast(height, tf.float32)
+    width = tf.cast(width, tf.float32)
+    theta = uniform(1, -settings['rotation_range'], settings['rotation_range']) * (math.pi / 180.0)
+    tx = uniform(2, -settings['width_shift_range'], settings['width_shift_range']) * width
+    ty = uniform(3, -settings['height_shift_range'], settings['height_shift_range']) * height
+    shear = uniform(4, -settings['shear_range'], settings['shear_range']) * (math.pi / 180.0)
+    zx = uniform(5, 1.0 - settings['zoom_range'], 1.0 + settings['zoom_range'])
+    zy = uniform(6, 1.0 - settings['zoom_range'], 1.0 + settings['zoom_range'])
+
+    # [[a0, a1], [a3, a4]] = rotation @ shear @ zoom
+    cos_t, sin_t = tf.cos(theta), tf.sin(theta)
+    a0 = cos_t * zx
+    a1 = (-cos_t * tf.sin(shear) - sin_t * tf.cos(shear)) * zy
+    a3 = sin_t * zx
+    a4 = (-sin_t * tf.sin(shear) + cos_t * tf.cos(shear)) * zy
+
+    # Offsets keep the center fixed before the shift is applied (rotation @ shift, as in Keras)
+    cx, cy = (width - 1.0) / 2.0, (height - 1.0) / 2.0
+    a2 = cx - a0 * cx - a1 * cy + cos_t * tx - sin_t * ty
+    a5 = cy - a3 * cx - a4 * cy + sin_t * tx + cos_t * ty
+    zeros = tf.zeros_like(a0)
+    return tf.stack([a0, a1, a2, a3, a4, a5, zeros, zeros], axis=1)
+
+
+def augment_batch(images, seed, settings=AUGMENTATION):
+    """
+    Augment a uint8 (N, H, W, 3) batch and return float32 pixels in [0, 1]
+    One projective transform per image replaces ImageDataGenerator's per-image scipy calls
+    """
+    shape = tf.shape(images)
+    batch_size, height, width = shape[0], shape[1], shape[2]
+    images = tf.cast(images, tf.float32)
+
+    images = tf.raw_ops.ImageProjectiveTransformV3(
+        images=images,
+        transforms=random_transforms(seed, batch_size, height, width, settings),
+        output_shape=tf.stack([height, width]),
+        fill_value=0.0,
+        interpolation='BILINEAR',
+        fill_mode='NEAREST'
+    )
+
+    if settings['horizontal_flip']:
+        flip = tf.random.stateless_uniform([batch_size], seed=seed + 7) < 0.5
+        images = tf.where(flip[:, tf.newaxis, tf.newaxis, tf.newaxis], tf.reverse(images, axis=[2]), images)
+
+    low, high = settings['brightness_range']
+    brightness = tf.random.stateless_uniform([batch_size], seed=seed + 8, minval=low, maxval=high)
+    # Brightness scales 0-255 pixels and clips before the rescale, as ImageEnhance.Brightness does
+    images = tf.clip_by_value(images * brightness[:, tf.newaxis, tf.newaxis, tf.newaxis], 0.0, 255.0)
+    return images * (1.0 / 255.0)
+
+
+def rescale_batch(images):
+    """uint8 batch -> float32 in [0, 1] (the validation generator's rescale=1./255)"""
+    return tf.cast(images, tf.float32) * (1.0 / 255.0)
+
+
+def _encode_example(image, label, encoding):
+    data = tf.io.encode_jpeg(image, quality=95).numpy() if encoding == 'jpeg' else image.numpy().tobytes()
+    return tf.train.Example(features=tf.train.Features(feature={
+        'image': tf.train.Feature(bytes_list=tf.train.BytesList(value=[data])),
+        'label': tf.train.Feature(int64_list=tf.train.Int64List(value=[int(label)]))
+    })).SerializeToString()
+
+
+def write_tfrecord_shards(directory, output_dir, num_shards=16, img_size=IMG_SIZE, encoding='raw', seed=42):
+    """
+    Decode and resize a class-folder dataset once and write it as TFRecord shards
+    encoding='raw' stores uint8 pixels (no decode cost when training); 'jpeg' re-encodes at quality 95 to save disk.
+    Files are shuffled before sharding so every shard holds a mix of classes.
+    """
+    if encoding not in ('raw', 'jpeg'):
+        raise ValueError(f"Unknown shard encoding '{encoding}'. Choose from: raw, jpeg")
+    paths, labels, class_names = list_labeled_files(directory)
+    if not paths:
+        raise ValueError(f"No images found in {directory}")
+    order = list(range(len(paths)))
+    random.Random(seed).shuffle(order)
+    paths = [paths[i] for i in order]
+    labels = [labels[i] for i in order]
+
+    os.makedirs(output_dir, exist_ok=True)
+    num_shards = max(1, min(num_shards, len(paths)))
+    shard_paths = [os.path.join(output_dir, f"shard-{i:05d}-of-{num_shards:05d}.tfrecord") for i in range(num_shards)]
+    writers = [tf.io.TFRecordWriter(path) for path in shard_paths]
+
+    decoded = tf.data.Dataset.from_tensor_slices((paths, labels)).map(
+        lambda path, label: (decode_and_resize(path, img_size), label),
+        num_parallel_calls=tf.data.AUTOTUNE
+    ).prefetch(tf.data.AUTOTUNE)
+    try:
+        for index, (image, label) in enumerate(decoded):
+            writers[index % num_shards].write(_encode_example(image, label, encoding))
+    finally:
+        for writer in writers:
+            writer.close()
+
+    manifest = {
+        'count': len(paths),
+        'class_names': class_names,
+        'class_counts': {name: labels.count(i) for i, name in enumerate(class_names)},
+        'img_size': img_size,
+        'encoding': encoding,
+        'shards': [os.path.basename(path) for path in shard_paths]
+    }
+    with open(os.path.join(output_dir, SHARD_MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    print(f"✅ Wrote {len(paths)} images to {num_shards} shards in {output_dir}")
+    return manifest
+
+
+def is_shard_dir(path):
+    return os.path.exists(os.path.join(path, SHARD_MANIFEST))
+
+
+def _shard_dataset(shard_dir, training, seed):
+    with open(os.path.join(shard_dir, SHARD_MANIFEST)) as f:
+        manifest = json.load(f)
+    img_size = manifest['img_size']
+    encoding = manifest['encoding']
+    features = {
+        'image': tf.io.FixedLenFeature([], tf.string),
+        'label': tf.io.FixedLenFeature([], tf.int64)
+    }
+
+    def parse(record):
+        example = tf.io.parse_single_example(record, features)
+        if encoding == 'jpeg':
+            image = tf.io.decode_jpeg(example['image'], channels=3)
+        else:
+            image = tf.io.decode_raw(example['image'], tf.uint8)
+        return tf.reshape(image, (img_size, img_size, 3)), tf.cast(example['label'], tf.float32)
+
+    files = tf.data.Dataset.from_tensor_slices([os.path.join(shard_dir, name) for name in manifest['shards']])
+    if training:
+        files = files.shuffle(len(manifest['shards']), seed=seed, reshuffle_each_iteration=True)
+    records = files.interleave(
+        tf.data.TFRecordDataset,
+        cycle_length=min(len(manifest['shards']), 8),
+        num_parallel_calls=tf.data.AUTOTUNE,
+        deterministic=not training
+    )
+    return records.map(parse, num_parallel_calls=tf.data.AUTOTUNE), manifest
+
+
+def _face_store_batches(store_dir, training, batch_size, seed):
+    """Batches gathered straight from a FaceStore memmap: no decode, no resize, no cache needed"""
+    store = FaceStore(store_dir)
+    images, labels = store.images, store.labels.astype('float32')
+    size = store.img_size
+
+    def gather(indices):
+        # Sorted reads walk the memmap forward; the batch is shuffled anyway
+        indices = sorted(indices)
+        return images[indices], labels[indices]
+
+    def load(indices):
+        batch, batch_labels = tf.numpy_function(gather, [indices], (tf.uint8, tf.float32))
+        batch.set_shape((None, size, size, 3))
+        batch_labels.set_shape((None,))
+        return batch, batch_labels
+
+    indices = tf.data.Dataset.range(store.count)
+    if training:
+        # Shuffling indices is free, so the whole store is shuffled every epoch
+        indices = indices.shuffle(max(store.count, 1), seed=seed, reshuffle_each_iteration=True)
+    return indices.batch(batch_size).map(load, num_parallel_calls=tf.data.AUTOTUNE), store.count, store.class_names
+
+
+def build_dataset(source, training=True, batch_size=BATCH_SIZE, img_size=IMG_SIZE, cache=True,
+                  shuffle_buffer=SHUFFLE_BUFFER, seed=42, augment=True):
+    """
+    tf.data pipeline yielding (float32 images in [0, 1], float32 labels) batches for model.fit
+
+    source is a class-folder dataset (decoded in parallel), a folder written by
+    write_tfrecord_shards, or a FaceStore from extract_faces.py (read straight from
+    the memmap). Decoded uint8 images are cached (in memory when cache=True, in a
+    file when cache is a path) so JPEGs are decoded once, not every epoch;
+    augmentation runs per batch after the cache so every epoch sees new
+    transforms. Validation datasets (training=False) keep file order, as
+    flow_from_directory(shuffle=False) does.
+    Returns (dataset, info) where info has count, steps and class_names.
+    """
+    if is_face_store(source):
+        batches, count, class_names = _face_store_batches(source, training, batch_size, seed)
+    else:
+        if is_shard_dir(source):
+            images, manifest = _shard_dataset(source, training, seed)
+            count, class_names = manifest['count'], manifest['class_names']
+        else:
+            paths, labels, class_names = list_labeled_files(source)
+            count = len(paths)
+            images = tf.data.Dataset.from_tensor_slices((paths, tf.constant(labels, tf.float32))).map(
+                lambda path, label: (decode_and_resize(path, img_size), label),
+                num_parallel_calls=tf.data.AUTOTUNE
+            )
+
+        if cache:
+            images = images.cache(cache if isinstance(cache, str) else '')
+        if training:
+            images = images.shuffle(min(shuffle_buffer, max(count, 1)), seed=seed, reshuffle_each_iteration=True)
+        batches = images.batch(batch_size)
+
+    if training and augment:
+        # One stateless seed pair per batch, drawn afresh every epoch
+        seeds = tf.data.Dataset.random(seed=seed, rerandomize_each_iteration=True).batch(2)
+        batches = tf.data.Dataset.zip((batches, seeds)).map(
+            lambda batch, batch_seed: (augment_batch(batch[0], batch_seed), batch[1]),
+            num_parallel_calls=tf.data.AUTOTUNE
+        )
+    else:
+        batches = batches.map(lambda images, labels: (rescale_batch(images), labels),
+                              num_parallel_calls=tf.data.AUTOTUNE)
+
+    info = {'count': count, 'steps': math.ceil(count / batch_size), 'class_names': class_names}
+    return batches.prefetch(tf.data.AUTOTUNE), info
+
+
+def dataset_labels(source):
+    """Labels in the order a training=False dataset yields them (for confusion matrices and ROC curves)"""
+    if is_face_store(source):
+        return FaceStore(source).labels.tolist()
+    if is_shard_dir(source):
+        dataset, _ = _shard_dataset(source, training=False, seed=0)
+        return [int(label) for _, label in dataset.as_numpy_iterator()]
+    return list_labeled_files(source)[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a class-folder dataset as TFRecord shards for training")
+    parser.add_argument('directory', help='Dataset folder with one subfolder per class (e.g. ../dataset/train)')
+    parser.add_argument('output_dir', help='Folder for the shards and manifest.json')
+    parser.add_argument('--shards', type=int, default=16)
+    parser.add_argument('--img-size', type=int, default=IMG_SIZE)
+    parser.add_argument('--encoding', choices=('raw', 'jpeg'), default='raw',
+                        help='raw uint8 pixels (fastest to read) or JPEG quality 95 (smaller)')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    write_tfrecord_shards(args.directory, args.output_dir, num_shards=args.shards, img_size=args.img_size,
+                          encoding=args.encoding, seed=args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+"""
+Streaming Video Deepfake Analysis
+Samples frames with OpenCV, tracks the face between keyframes and scores crops in batches
+"""
+
+import math
+
+import cv2
+import numpy as np
+
+from preprocessing import resize_into
+
+
+IMG_SIZE = 224
+VIDEO_EXTENSIONS = {'mp4', 'avi', 'mov', 'mkv', 'webm', 'm4v'}
+
+
+def iter_sampled_frames(video_path, sample_fps=2.0, max_frames=None):
+    """
+    Stream-decode a video and yield (frame_index, timestamp, RGB frame) at roughly sample_fps
+    Skipped frames are only grabbed, never decoded into arrays
+    """
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        raise ValueError(f"Cannot open video: {video_path}")
+
+    try:
+        native_fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+        step = max(1, int(round(native_fps / sample_fps))) if sample_fps > 0 else 1
+
+        frame_index = 0
+        yielded = 0
+        while capture.grab():
+            if frame_index % step == 0:
+                ok, frame = capture.retrieve()
+                if not ok:
+                    break
+                yield frame_index, frame_index / native_fps, cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                yielded += 1
+                if max_frames and yielded >= max_frames:
+                    break
+            frame_index += 1
+    finally:
+        capture.release()
+
+
+def video_info(video_path):
+    """Basic stream properties read from the container header"""
+    capture = cv2.VideoCapture(video_path)
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS) or 0.0
+        frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        return {
+            'fps': float(fps),
+            'frame_count': frame_count,
+            'duration_seconds': frame_count / fps if fps else None,
+            'width': int(capture.get(cv2.CAP_PROP_FRAME_WIDTH) or 0),
+            'height': int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0)
+        }
+    finally:
+        capture.release()
+
+
+class FaceTracker:
+    """
+    Keeps one face box across frames so the detector only runs on keyframes
+
+    Between keyframes the previous face is located by normalized template
+    matching inside a search window around its last position; a weak match
+    forces a fresh detection.
+    """
+
+    def __init__(self, detect_fn, keyframe_interval=5, search_margin=0.5, min_match=0.6):
+        self.detect_fn = detect_fn
+        self.keyframe_interval = max(1, int(keyframe_interval))
+        self.search_margin = search_margin
+        self.min_match = min_match
+
+        self.box = None
+        self.confidence = None
+        self._template = None
+        self._since_keyframe = 0
+        self.detections_run = 0
+        self.frames_tracked = 0
+
+    def _detect(self, frame):
+        self.detections_run += 1
+        detections = self.detect_fn(frame)
+        if not detections:
+            self.box = None
+            self._template = None
+            return None
+
+        face = max(detections, key=lambda d: d['confidence'])
+        x, y, w, h = [int(v) for v in face['box']]
+        x, y = max(0, x), max(0, y)
+        self.box = (x, y, max(1, w), max(1, h))
+        self.confidence = float(face['confidence'])
+        self._template = cv2.cvtColor(frame[y:y + h, x:x + w], cv2.COLOR_RGB2GRAY)
+        self._since_keyframe = 0
+        return self.box
+
+    def _track(self, frame):
+        x, y, w, h = self.box
+        frame_h, frame_w = frame.shape[:2]
+        mx, my = int(w * self.search_margin), int(h * self.search_margin)
+        x0, y0 = max(0, x - mx), max(0, y - my)
+        x1, y1 = min(frame_w, x + w + mx), min(frame_h, y + h + my)
+
+        window = cv2.cvtColor(frame[y0:y1, x0:x1], cv2.COLOR_RGB2GRAY)
+        if window.shape[0] < self._template.shape[0] or window.shape[1] < self._template.shape[1]:
+            return None
+
+        scores = cv2.matchTemplate(window, self._template, cv2.TM_CCOEFF_NORMED)
+        _, best, _, (bx, by) = cv2.minMaxLoc(scores)
+        if best < self.min_match:
+            return None
+
+        self.box = (x0 + bx, y0 + by, w, h)
+        self.frames_tracked += 1
+        self._since_keyframe += 1
+        return self.box
+
+    def update(self, frame):
+        """Return the face box (x, y, w, h) for this frame, or None if no face is visible"""
+        if self.box is None or self._since_keyframe + 1 >= self.keyframe_interval:
+            return self._detect(frame)
+        return self._track(frame) or self._detect(frame)
+
+
+def crop_face(frame, box, padding=20, img_size=IMG_SIZE, out=None):
+    """Pad the box like the image pipeline does and crop + resize it to the model input in one call"""
+    x, y, w, h = box
+    frame_h, frame_w = frame.shape[:2]
+    x, y = max(0, x - padding), max(0, y - padding)
+    w, h = min(frame_w - x, w + 2 * padding), min(frame_h - y, h + 2 * padding)
+    if out is None:
+        out = np.empty((img_size, img_size, 3), dtype=np.uint8)
+    return resize_into(frame, out, box=(x, y, w, h))
+
+
+class SegmentStats:
+    """Running per-segment score aggregates (constant memory per segment)"""
+
+    def __init__(self, index, seconds):
+        self.index = index
+        self.start = index * seconds
+        self.end = (index + 1) * seconds
+        self.count = 0
+        self.total = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self.fake_frames = 0
+
+    def add(self, score):
+        self.count += 1
+        self.total += score
+        self.minimum = min(self.minimum, score)
+        self.maximum = max(self.maximum, score)
+        if score < 0.5:
+            self.fake_frames += 1
+
+    def as_dict(self):
+        return {
+            'segment': self.index,
+            'start_seconds': round(self.start, 3),
+            'end_seconds': round(self.end, 3),
+            'frames_scored': self.count,
+            'mean_raw_score': self.total / self.count,
+            'min_raw_score': self.minimum,
+            'max_raw_score': self.maximum,
+            'fake_frame_ratio': self.fake_frames / self.count
+        }
+
+
+def analyze_video(video_path, detect_fn, predict_fn, sample_fps=2.0, keyframe_interval=5,
+                  batch_size=16, segment_seconds=2.0, max_frames=None, check=None):
+    """
+    Score a video frame-by-frame without holding more than one batch of crops in memory
+
+    detect_fn(rgb_frame) -> list of {'box': [x, y, w, h], 'confidence': float}
+    predict_fn(uint8 batch) -> (N,) raw scores (0 = FAKE, 1 = REAL); normalization is the predictor's job
+    check(stage), if given, runs before every sampled frame and every batch and may raise to abort
+    Returns per-segment statistics plus a video-level aggregate
+    """
+    tracker = FaceTracker(detect_fn, keyframe_interval=keyframe_interval)
+    buffer = np.empty((batch_size, IMG_SIZE, IMG_SIZE, 3), dtype=np.uint8)
+    pending_segments = []
+    segments = {}
+    frames_sampled = 0
+    frames_with_face = 0
+    total = 0.0
+    fake_frames = 0
+
+    def flush():
+        nonlocal total, fake_frames
+        count = len(pending_segments)
+        if count == 0:
+            return
+        if check is not None:
+            check('video_inference')
+        scores = np.asarray(predict_fn(buffer[:count])).reshape(-1)
+        for segment_index, score in zip(pending_segments, scores):
+            score = float(score)
+            segments[segment_index].add(score)
+            total += score
+            if score < 0.5:
+                fake_frames += 1
+        pending_segments.clear()
+
+    for _, timestamp, frame in iter_sampled_frames(video_path, sample_fps, max_frames):
+        if check is not None:
+            check('video_frame')
+        frames_sampled += 1
+        box = tracker.update(frame)
+        if box is None:
+            continue
+
+        frames_with_face += 1
+        segment_index = int(timestamp // segment_seconds)
+        if segment_index not in segments:
+            segments[segment_index] = SegmentStats(segment_index, segment_seconds)
+
+        crop_face(frame, box, out=buffer[len(pending_segments)])
+        pending_segments.append(segment_index)
+        if len(pending_segments) == batch_size:
+            flush()
+
+    flush()
+
+    aggregate = None
+    if frames_with_face:
+        aggregate = {
+            'mean_raw_score': total / frames_with_face,
+            'min_segment_score': min(s.total / s.count for s in segments.values()),
+            'fake_frame_ratio': fake_frames / frames_with_face
+        }
+
+    return {
+        'frames_sampled': frames_sampled,
+        'frames_with_face': frames_with_face,
+        'detector_runs': tracker.detections_run,
+        'frames_tracked': tracker.frames_tracked,
+        'segments': [segments[i].as_dict() for i in sorted(segments)],
+        'aggregate': aggregate
+    }
@@ -0,0 +1,374 @@
+"""
+Multi-Process Inference Worker Pool
+Model-holding worker processes pinned to core sets, fed uint8 face tensors through shared-memory ring buffers
+"""
+
+import atexit
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from preprocessing import IMG_SIZE
+
+
+def parse_core_list(spec):
+    """'0-3,8,10-11' -> [0, 1, 2, 3, 8, 10, 11]; empty or None -> None"""
+    if not spec:
+        return None
+    cores = set()
+    for part in str(spec).split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            first, last = part.split('-', 1)
+            cores.update(range(int(first), int(last) + 1))
+        else:
+            cores.add(int(part))
+    return sorted(cores)
+
+
+def available_cores():
+    """CPUs this process may run on"""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def core_sets(workers, cores=None):
+    """
+    Split cores into `workers` contiguous, equally sized sets (the first sets get the remainder)
+    With more workers than cores every worker gets one core, shared round-robin
+    """
+    cores = list(cores or available_cores())
+    if workers >= len(cores):
+        return [[cores[i % len(cores)]] for i in range(workers)]
+    size, extra = divmod(len(cores), workers)
+    sets, start = [], 0
+    for i in range(workers):
+        end = start + size + (1 if i < extra else 0)
+        sets.append(cores[start:end])
+        start = end
+    return sets
+
+
+class SharedTensorRing:
+    """
+    Fixed slots of (capacity, H, W, 3) uint8 inputs and (capacity,) float32 scores in one shared-memory block
+
+    The front end owns the ring: it hands slots out in ring order, writes a batch
+    into the slot's input area and gets the slot back once the worker's scores
+    have been read. The worker attaches to the same block by name, so tensors
+    cross the process boundary without pickling or extra copies.
+    """
+
+    def __init__(self, slots, capacity, img_size=IMG_SIZE, name=None):
+        self.slots = slots
+        self.capacity = capacity
+        self.img_size = img_size
+        input_shape = (slots, capacity, img_size, img_size, 3)
+        input_bytes = int(np.prod(input_shape))
+        output_bytes = slots * capacity * 4
+        # Scores start on an 8-byte boundary after the pixels
+        output_offset = (input_bytes + 7) // 8 * 8
+        self.owner = name is None
+        if self.owner:
+            self._shm = shared_memory.SharedMemory(create=True, size=output_offset + output_bytes)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+        self.name = self._shm.name
+        self.inputs = np.ndarray(input_shape, dtype=np.uint8, buffer=self._shm.buf)
+        self.outputs = np.ndarray((slots, capacity), dtype=np.float32, buffer=self._shm.buf, offset=output_offset)
+
+        self._free = list(range(slots))
+        self._available = threading.Condition()
+
+    @property
+    def nbytes(self):
+        return self._shm.size
+
+    def acquire(self):
+        """Next free slot, waiting while every slot is in flight (backpressure)"""
+        with self._available:
+            while not self._free:
+                self._available.wait()
+            return self._free.pop(0)
+
+    def release(self, slot):
+        with self._available:
+            self._free.append(slot)
+            self._available.notify()
+
+    def close(self):
+        """Drop the mapping (and, for the owner, the block itself)"""
+        self.inputs = self.outputs = None
+        self._shm.close()
+        if self.owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+# --- Worker process side -------------------------------------------------------
+
+def _worker_main(conn, ring_name, slots, capacity, img_size, backend, model_path, cores, options):
+    """Pin to the core set, load the model with matching thread counts, then score slots until told to stop"""
+    if cores and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cores)
+    threads = len(cores) if cores else 1
+    # OpenMP / oneDNN pools follow the core set; TensorFlow's are capped before its runtime starts
+    os.environ['OMP_NUM_THREADS'] = str(threads)
+    from backends import load_backend
+
+    start = time.perf_counter()
+    if backend == 'keras':
+        import tensorflow as tf
+
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+    session = load_backend(backend, model_path, img_size=img_size, buckets=options.get('buckets'),
+                           num_threads=threads, fold_normalization=options.get('fold_normalization', False))
+    ring = SharedTensorRing(slots, capacity, img_size, name=ring_name)
+    conn.send(('ready', {'pid': os.getpid(), 'cores': cores, 'threads': threads,
+                         'load_seconds': time.perf_counter() - start}))
+
+    try:
+        while True:
+            message = conn.recv()
+            if message is None:
+                break
+            slot, count = message
+            start = time.perf_counter()
+            try:
+                # The model reads straight from shared memory and the scores are written back into it
+                ring.outputs[slot, :count] = np.asarray(session.predict(ring.inputs[slot, :count])).reshape(-1)
+                conn.send((slot, None, time.perf_counter() - start))
+            except Exception as e:
+                conn.send((slot, f"{type(e).__name__}: {e}", time.perf_counter() - start))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        ring.close()
+
+
+# --- Front end -------------------------------------------------------------------
+
+class _Worker:
+    def __init__(self, index, cores, ring):
+        self.index = index
+        self.cores = cores
+        self.ring = ring
+        self.process = None
+        self.conn = None
+        self.info = {}
+        self.alive = False
+        self.restarts = 0
+        self.pending = {}
+        self.send_lock = threading.Lock()
+        self.batches = 0
+        self.faces = 0
+        self.busy_seconds = 0.0
+
+
+class InferenceWorkerPool:
+    """
+    predict(batch) -> (N,) raw scores, served by `workers` model-holding processes
+
+    Each worker is a spawned process pinned to its own core set, with TensorFlow /
+    TFLite / ONNX Runtime threads matched to the set's size, so workers do not
+    contend for cores or the GIL. Batches are split into chunks of at least
+    min_chunk faces that go to the least loaded workers; concurrent callers (the
+    micro-batcher's dispatch threads, folder inference) keep every worker busy.
+    A worker that dies fails its in-flight batches and is restarted.
+    """
+
+    name = 'worker_pool'
+
+    def __init__(self, backend, model_path, workers=2, cores=None, slots=4, max_batch=32, min_chunk=8,
+                 img_size=IMG_SIZE, buckets=None, fold_normalization=False, start_timeout=300, max_restarts=3):
+        self.backend = backend
+        self.path = model_path
+        self.workers = max(1, int(workers))
+        self.core_sets = core_sets(self.workers, cores)
+        self.slots = max(1, int(slots))
+        self.max_batch = max(1, int(max_batch))
+        self.min_chunk = max(1, int(min_chunk))
+        self.img_size = img_size
+        self.options = {'buckets': buckets, 'fold_normalization': fold_normalization}
+        self.start_timeout = start_timeout
+        self.max_restarts = max_restarts
+        self.warmup_seconds = None
+
+        self._context = multiprocessing.get_context('spawn')
+        self._lock = threading.Lock()
+        self._workers = []
+        self._running = False
+
+    def start(self):
+        """Spawn every worker and wait until all have loaded the model"""
+        start = time.perf_counter()
+        for index, cores in enumerate(self.core_sets):
+            ring = SharedTensorRing(self.slots, self.max_batch, self.img_size)
+            worker = _Worker(index, cores, ring)
+            self._workers.append(worker)
+            self._spawn(worker)
+        self._running = True
+        atexit.register(self.close)
+        for worker in self._workers:
+            self._await_ready(worker)
+        self.warmup_seconds = time.perf_counter() - start
+        return self
+
+    def _spawn(self, worker):
+        parent_conn, child_conn = self._context.Pipe()
+        worker.process = self._context.Process(
+            target=_worker_main,
+            args=(child_conn, worker.ring.name, self.slots, self.max_batch, self.img_size, self.backend,
+                  self.path, worker.cores, self.options),
+            name=f"inference-worker-{worker.index}",
+            daemon=True
+        )
+        worker.process.start()
+        child_conn.close()
+        worker.conn = parent_conn
+
+    def _await_ready(self, worker):
+        if not worker.conn.poll(self.start_timeout):
+            raise RuntimeError(f"Inference worker {worker.index} did not start within {self.start_timeout}s")
+        try:
+            status, worker.info = worker.conn.recv()
+        except EOFError:
+            raise RuntimeError(f"Inference worker {worker.index} exited while loading {self.path}")
+        worker.alive = True
+        threading.Thread(target=self._read_replies, args=(worker,), name=f"inference-worker-{worker.index}-replies",
+                         daemon=True).start()
+
+    def _read_replies(self, worker):
+        """Complete futures as the worker reports slots done; restart the worker if it dies"""
+        conn = worker.conn
+        while True:
+            try:
+                slot, error, seconds = conn.recv()
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                future, count = worker.pending.pop(slot)
+                worker.batches += 1
+                worker.faces += count
+                worker.busy_seconds += seconds
+            if error is None:
+                future.set_result(worker.ring.outputs[slot, :count].copy())
+            else:
+                future.set_exception(RuntimeError(f"Inference worker {worker.index}: {error}"))
+            worker.ring.release(slot)
+
+        with self._lock:
+            worker.alive = False
+            pending, worker.pending = worker.pending, {}
+        for slot, (future, _) in pending.items():
+            future.set_exception(RuntimeError(f"Inference worker {worker.index} exited"))
+            worker.ring.release(slot)
+        if self._running and worker.restarts < self.max_restarts:
+            worker.restarts += 1
+            try:
+                self._spawn(worker)
+                self._await_ready(worker)
+            except RuntimeError:
+                pass
+
+    def _pick_worker(self):
+        with self._lock:
+            alive = [worker for worker in self._workers if worker.alive]
+            if not alive:
+                raise RuntimeError("No inference workers available")
+            return min(alive, key=lambda worker: len(worker.pending))
+
+    def submit(self, batch):
+        """Queue a uint8 batch of at most max_batch faces on the least loaded worker; returns a Future of scores"""
+        count = len(batch)
+        if count > self.max_batch:
+            raise ValueError(f"Batch of {count} exceeds the worker slot capacity of {self.max_batch}")
+        worker = self._pick_worker()
+        slot = worker.ring.acquire()
+        # The one copy on the way in: straight into the shared slot
+        worker.ring.inputs[slot, :count] = batch
+        future = Future()
+        with self._lock:
+            worker.pending[slot] = (future, count)
+        try:
+            with worker.send_lock:
+                worker.conn.send((slot, count))
+        except (OSError, ValueError) as e:
+            with self._lock:
+                entry = worker.pending.pop(slot, None)
+            # The reply reader may already have failed the future and freed the slot when the worker died
+            if entry is not None:
+                worker.ring.release(slot)
+                future.set_exception(RuntimeError(f"Inference worker {worker.index} unavailable: {e}"))
+        return future
+
+    def predict(self, batch):
+        """
+        Score a (N, H, W, 3) batch and return an (N,) array of raw scores
+        Normalized float32 input is mapped back to the uint8 pixels it was made from
+        """
+        batch = np.asarray(batch)
+        if batch.ndim == 3:
+            batch = batch[np.newaxis]
+        if len(batch) == 0:
+            return np.zeros(0, dtype=np.float32)
+        if batch.dtype != np.uint8:
+            batch = np.clip(np.rint(batch * 255.0), 0, 255).astype(np.uint8)
+        chunk = min(self.max_batch, max(self.min_chunk, math.ceil(len(batch) / self.workers)))
+        futures = [self.submit(batch[start:start + chunk]) for start in range(0, len(batch), chunk)]
+        return np.concatenate([future.result() for future in futures])
+
+    def stats(self):
+        """Per-worker pid, cores, batches, faces and busy time, plus ring size"""
+        with self._lock:
+            return {
+                'backend': self.backend,
+                'workers': self.workers,
+                'slots_per_worker': self.slots,
+                'max_batch': self.max_batch,
+                'ring_mb_per_worker': self._workers[0].ring.nbytes / (1024 * 1024) if self._workers else 0.0,
+                'per_worker': [
+                    {
+                        'index': worker.index,
+                        'pid': worker.info.get('pid'),
+                        'cores': worker.cores,
+                        'alive': worker.alive,
+                        'restarts': worker.restarts,
+                        'in_flight': len(worker.pending),
+                        'batches': worker.batches,
+                        'faces': worker.faces,
+                        'busy_seconds': worker.busy_seconds
+                    }
+                    for worker in self._workers
+                ]
+            }
+
+    def close(self):
+        """Stop the workers and free the shared memory (idempotent)"""
+        if not self._running:
+            return
+        self._running = False
+        for worker in self._workers:
+            try:
+                with worker.send_lock:
+                    worker.conn.send(None)
+            except (OSError, ValueError):
+                pass
+        for worker in self._workers:
+            worker.process.join(timeout=10)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            worker.conn.close()
+            worker.ring.close()